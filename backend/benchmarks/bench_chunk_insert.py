@@ -0,0 +1,85 @@
+"""
+Benchmark: ORM row-by-row chunk inserts vs binary COPY (DocumentChunkCopyWriter).
+
+Inserts --chunks synthetic chunks with random 384-d embeddings for a
+throwaway user/document, once per path, and reports rows/s. The
+throwaway rows are deleted afterwards (ON DELETE CASCADE).
+
+Usage (from backend/, needs the database from docker-compose):
+    PYTHONPATH=src poetry run python benchmarks/bench_chunk_insert.py --chunks 5000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from api.database.table_models import DocumentChunk, UploadedPdf, User
+from api.database.bulk import DocumentChunkCopyWriter, document_chunk_record
+from api.config.db import async_session_maker
+
+BATCH = 256
+
+
+async def orm_path(db, document_id, user_id, contents, embeddings):
+    """The original store_chunks_in_db body."""
+    for chunk, vector in zip(contents, embeddings):
+        db.add(DocumentChunk(document_id=document_id, user_id=user_id, content=chunk, embedding=vector.tolist()))
+    await db.commit()
+
+
+async def copy_path(db, document_id, user_id, contents, embeddings):
+    async with DocumentChunkCopyWriter(db) as writer:
+        for start in range(0, len(contents), BATCH):
+            await writer.write([
+                document_chunk_record(document_id, user_id, content, start + i, None, None, None, vector)
+                for i, (content, vector) in enumerate(zip(contents[start:start + BATCH], embeddings[start:start + BATCH]))
+            ])
+    await db.commit()
+
+
+async def run(name, fn, document_id, user_id, contents, embeddings):
+    async with async_session_maker() as db:
+        tracemalloc.start()
+        start = time.perf_counter()
+        await fn(db, document_id, user_id, contents, embeddings)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"{name:<8}{elapsed:>10.3f}{len(contents) / elapsed:>12.0f}{peak / 2**20:>12.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.chunks, 384)).astype(np.float32)
+    contents = [f"Step {i}: unscrew the rear panel and check the drain pump filter. " * 10 for i in range(args.chunks)]
+
+    user_id = uuid.uuid4()
+    documents = {"orm": uuid.uuid4(), "copy": uuid.uuid4()}
+    async with async_session_maker() as db:
+        db.add(User(id=user_id, username=f"bench-{user_id}", password="-"))
+        await db.flush()
+        db.add_all([
+            UploadedPdf(id=doc_id, title=f"bench-{name}.pdf", content=b"", file_size=0, user_id=user_id)
+            for name, doc_id in documents.items()
+        ])
+        await db.commit()
+
+    try:
+        print(f"{'path':<8}{'seconds':>10}{'rows/s':>12}{'peak MiB':>12}")
+        await run("orm", orm_path, documents["orm"], user_id, contents, embeddings)
+        await run("copy", copy_path, documents["copy"], user_id, contents, embeddings)
+    finally:
+        async with async_session_maker() as db:
+            await db.delete(await db.get(User, user_id))
+            await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
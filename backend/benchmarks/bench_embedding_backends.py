@@ -0,0 +1,139 @@
+"""
+Benchmark: PyTorch vs ONNX int8 embedding backend (all-MiniLM-L6-v2, CPU).
+
+Reports for each backend
+- ingest throughput: chunks/s encoding --chunks chunk-sized texts in batches of --batch-size
+- query latency: p50/p95/p99 of encoding one short question at a time
+and, between the two backends,
+- cosine drift: 1 - cos(torch vector, onnx vector) over chunks and questions
+- top-k agreement: share of each question's top-k chunks (by cosine) both backends agree on
+
+Usage (from backend/; exports the ONNX model to EMBEDDING_ONNX_DIR first if needed):
+    PYTHONPATH=src poetry run python benchmarks/bench_embedding_backends.py [--pdf manual.pdf] [--chunks 512]
+
+Without --pdf, synthetic repair-manual text is used. Set --threads to pin
+both backends to the same number of CPU threads.
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from api.config.core import settings
+from api.service.chunking import iter_chunks
+from api.service.model_registry import EMBEDDING_MODEL_ID
+from api.service.onnx_embedding import load_onnx_encoder
+
+QUESTIONS = [
+    "Wie entkalke ich die Maschine?",
+    "How do I replace the drain pump filter?",
+    "Was bedeutet der Fehlercode E15?",
+    "Which screws hold the rear panel?",
+    "Wie reinige ich das Flusensieb?",
+    "The door does not lock, what can I check?",
+    "Welches Werkzeug brauche ich für den Pumpenwechsel?",
+    "How often should the descaling be done?",
+]
+
+
+def synthetic_pages(chunks: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    parts = ["drain pump", "rear panel", "door seal", "heating element", "lint filter", "water inlet valve",
+             "Laugenpumpe", "Rückwand", "Türdichtung", "Heizstab", "Flusensieb", "Zulaufventil"]
+    actions = ["Remove the {n} screws of the {p} and check it for debris.",
+               "Lösen Sie die {n} Schrauben der {p} und prüfen Sie sie auf Verschmutzung.",
+               "If error E{n} is shown, disconnect the mains plug and inspect the {p}.",
+               "Ersetzen Sie die {p}, wenn der Widerstand unter {n} Ohm liegt."]
+    sentences = [rng.choice(actions).format(n=rng.randint(2, 40), p=rng.choice(parts)) for _ in range(chunks * 12)]
+    paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+    return ["\n\n".join(paragraphs[i:i + 8]) for i in range(0, len(paragraphs), 8)]
+
+
+def pdf_pages(path: str) -> list[str]:
+    import fitz  # PyMuPDF
+    with fitz.open(path) as pdf:
+        return [page.get_text() for page in pdf]
+
+
+def throughput(encode, texts, batch_size: int) -> float:
+    start = time.perf_counter()
+    encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def latencies(encode, questions, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for question in questions:
+            start = time.perf_counter()
+            encode([question], batch_size=1, show_progress_bar=False)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Manual to take the chunks from (default: synthetic text)")
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20, help="Passes over the questions for the latency test")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads for both backends (0 = library default)")
+    parser.add_argument("--onnx-dir", default=settings.EMBEDDING_ONNX_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    pages = pdf_pages(args.pdf) if args.pdf else synthetic_pages(args.chunks, args.seed)
+    chunks = [chunk.content for chunk in iter_chunks(pages)][:args.chunks]
+    print(f"{len(chunks)} chunks (mean {statistics.mean(len(c) for c in chunks):.0f} chars), {len(QUESTIONS)} questions")
+
+    backends = {
+        "torch": SentenceTransformer(EMBEDDING_MODEL_ID, device="cpu"),
+        "onnx-int8": load_onnx_encoder(EMBEDDING_MODEL_ID, args.onnx_dir, threads=args.threads),
+    }
+
+    vectors = {}
+    print(f"\n{'backend':<10} {'chunks/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, model in backends.items():
+        model.encode(chunks[:args.batch_size], batch_size=args.batch_size, show_progress_bar=False)  # warm-up
+        rate = throughput(model.encode, chunks, args.batch_size)
+        samples = latencies(model.encode, QUESTIONS, args.rounds)
+        print(f"{name:<10} {rate:>9.1f} {percentile(samples, 0.5):>8.2f} "
+              f"{percentile(samples, 0.95):>8.2f} {percentile(samples, 0.99):>8.2f}")
+        vectors[name] = (
+            normalize(np.asarray(model.encode(chunks, batch_size=args.batch_size, show_progress_bar=False))),
+            normalize(np.asarray(model.encode(QUESTIONS, batch_size=args.batch_size, show_progress_bar=False))),
+        )
+
+    (torch_chunks, torch_questions), (onnx_chunks, onnx_questions) = vectors["torch"], vectors["onnx-int8"]
+    drift = np.concatenate([
+        1 - np.sum(torch_chunks * onnx_chunks, axis=1),
+        1 - np.sum(torch_questions * onnx_questions, axis=1),
+    ])
+    print(f"\ncosine drift (1 - cos): mean {drift.mean():.5f}, p99 {np.percentile(drift, 99):.5f}, max {drift.max():.5f}")
+
+    k = min(args.top_k, len(chunks))
+    torch_top = np.argsort(-(torch_questions @ torch_chunks.T), axis=1)[:, :k]
+    onnx_top = np.argsort(-(onnx_questions @ onnx_chunks.T), axis=1)[:, :k]
+    agreement = statistics.mean(len(set(a) & set(b)) / k for a, b in zip(torch_top, onnx_top))
+    print(f"top-{k} agreement: {agreement:.1%}")
+
+
+if __name__ == "__main__":
+    main()
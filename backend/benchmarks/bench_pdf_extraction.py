@@ -0,0 +1,82 @@
+"""
+Benchmark: serial vs page-parallel PDF text extraction.
+
+Usage (from backend/):
+    PYTHONPATH=src poetry run python benchmarks/bench_pdf_extraction.py [--pdf manual.pdf] [--pages 300]
+
+Without --pdf a synthetic text-only PDF with --pages pages is generated.
+"""
+import argparse
+import os
+import statistics
+import time
+
+import fitz  # PyMuPDF
+
+from api.service.pdf_extraction import PdfTextExtractor, join_pages
+
+
+def make_synthetic_pdf(pages: int) -> bytes:
+    """Build a PDF whose pages are filled with repair-manual-like text."""
+    doc = fitz.open()
+    line = "Step {n}: Remove the {n} screws of the rear panel and check the drain pump for debris. "
+    for p in range(pages):
+        page = doc.new_page()
+        body = "".join(line.format(n=p * 40 + i) for i in range(40))
+        page.insert_textbox(fitz.Rect(36, 36, 559, 806), body, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def serial_concat(file_bytes: bytes) -> str:
+    """The original extraction loop: one thread, `text +=` per page."""
+    text = ""
+    with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
+        for page in pdf:
+            text += page.get_text()
+    return text
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="Path of a PDF to benchmark")
+    parser.add_argument("--pages", type=int, default=300, help="Pages of the synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="*", default=None, help="Worker counts to try")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            file_bytes = f.read()
+    else:
+        file_bytes = make_synthetic_pdf(args.pages)
+
+    worker_counts = args.workers or sorted({2, 4, os.cpu_count() or 1})
+    baseline = timed(lambda: serial_concat(file_bytes), args.repeat)
+    expected = serial_concat(file_bytes)
+    print(f"{'mode':<24}{'median s':>10}{'speedup':>10}")
+    print(f"{'serial (+=)':<24}{baseline:>10.3f}{1.0:>10.2f}")
+
+    for workers in worker_counts:
+        extractor = PdfTextExtractor(workers=workers, min_pages_per_worker=1)
+        try:
+            extractor.extract_pages(file_bytes)  # warm up the process pool
+            assert join_pages(extractor.extract_pages(file_bytes)) == expected
+            elapsed = timed(lambda: join_pages(extractor.extract_pages(file_bytes)), args.repeat)
+        finally:
+            extractor.shutdown()
+        print(f"{f'parallel x{workers}':<24}{elapsed:>10.3f}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
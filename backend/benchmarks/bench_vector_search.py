@@ -0,0 +1,118 @@
+"""
+Benchmark: exact vs ANN (HNSW / IVFFlat) search on a document_chunks-shaped table.
+
+For every table size a scratch table is filled with random unit vectors
+spread over `--documents` documents, the ANN index is built, and each
+query is run exactly (ground truth) and approximately at several
+ef_search / probes values. Reports p50/p95 latency and recall@k, for
+whole-table and per-document (filtered) search.
+
+Usage (from backend/, needs the pgvector database from docker-compose):
+    PYTHONPATH=src poetry run python benchmarks/bench_vector_search.py --sizes 10000 100000 --index hnsw
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import asyncpg
+import numpy as np
+from pgvector.asyncpg import register_vector
+
+from api.config.core import settings
+
+DIM = 384
+TABLE = "bench_document_chunks"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def random_unit_vectors(n: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def fill_table(conn: asyncpg.Connection, size: int, documents: int, rng: np.random.Generator) -> None:
+    await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await conn.execute(f"CREATE TABLE {TABLE} (id bigserial PRIMARY KEY, document_id int NOT NULL, embedding vector({DIM}))")
+    vectors = random_unit_vectors(size, rng)
+    doc_ids = rng.integers(0, documents, size)
+    await conn.copy_records_to_table(
+        TABLE, records=zip(doc_ids.tolist(), vectors), columns=["document_id", "embedding"]
+    )
+    await conn.execute(f"CREATE INDEX ON {TABLE} (document_id)")
+
+
+async def build_index(conn: asyncpg.Connection, index: str, size: int) -> float:
+    start = time.perf_counter()
+    if index == "hnsw":
+        await conn.execute(f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)")
+    else:
+        lists = max(10, size // 1000)
+        await conn.execute(f"CREATE INDEX ON {TABLE} USING ivfflat (embedding vector_l2_ops) WITH (lists = {lists})")
+    await conn.execute(f"ANALYZE {TABLE}")
+    return time.perf_counter() - start
+
+
+async def run_queries(conn, queries, k, document_id, exact: bool, knob: str | None, value: int | None):
+    where = "WHERE document_id = $2" if document_id is not None else ""
+    sql = f"SELECT id FROM {TABLE} {where} ORDER BY embedding <-> $1 LIMIT {k}"
+    latencies, results = [], []
+    async with conn.transaction():
+        if exact:
+            await conn.execute("SET LOCAL enable_indexscan = off")
+        elif knob:
+            await conn.execute(f"SET LOCAL {knob} = {value}")
+        for query in queries:
+            args = (query, document_id) if document_id is not None else (query,)
+            start = time.perf_counter()
+            rows = await conn.fetch(sql, *args)
+            latencies.append(time.perf_counter() - start)
+            results.append({row["id"] for row in rows})
+    return latencies, results
+
+
+def recall(truth: list[set], found: list[set]) -> float:
+    return statistics.mean(len(t & f) / len(t) if t else 1.0 for t, f in zip(truth, found))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000])
+    parser.add_argument("--documents", type=int, default=50, help="Documents the rows are spread over")
+    parser.add_argument("--index", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    knob = "hnsw.ef_search" if args.index == "hnsw" else "ivfflat.probes"
+    values = [10, 40, 100, 200] if args.index == "hnsw" else [1, 5, 10, 20]
+    rng = np.random.default_rng(42)
+    queries = random_unit_vectors(args.queries, rng)
+
+    conn = await asyncpg.connect(settings.DATABASE_URL.replace("postgresql+asyncpg", "postgresql"))
+    await register_vector(conn)
+    try:
+        for size in args.sizes:
+            await fill_table(conn, size, args.documents, rng)
+            build_seconds = await build_index(conn, args.index, size)
+            print(f"\n=== {size} rows, {args.index} index built in {build_seconds:.1f}s ===")
+            print(f"{'scope':<10}{'mode':<22}{'p50 ms':>9}{'p95 ms':>9}{f'recall@{args.k}':>11}")
+            for scope, document_id in (("table", None), ("document", 0)):
+                exact_lat, truth = await run_queries(conn, queries, args.k, document_id, True, None, None)
+                print(f"{scope:<10}{'exact':<22}{percentile(exact_lat, .5) * 1e3:>9.2f}"
+                      f"{percentile(exact_lat, .95) * 1e3:>9.2f}{1.0:>11.3f}")
+                for value in values:
+                    lat, found = await run_queries(conn, queries, args.k, document_id, False, knob, value)
+                    print(f"{scope:<10}{f'{knob}={value}':<22}{percentile(lat, .5) * 1e3:>9.2f}"
+                          f"{percentile(lat, .95) * 1e3:>9.2f}{recall(truth, found):>11.3f}")
+    finally:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
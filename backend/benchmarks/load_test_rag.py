@@ -0,0 +1,139 @@
+"""
+Load test: our own overhead in process_question, with the LLM faked.
+
+Runs `--requests` questions against one uploaded document with
+`--concurrency` in flight, through the real pipeline (query embedding,
+vector search, chat-history writes) but with FakeLLMBackend instead of
+Replicate, so no network access or API token is needed. For every
+request the time spent inside the LLM backend is recorded and subtracted
+from the end-to-end latency; what is left is the pipeline's overhead.
+
+Usage (from backend/, needs the database from docker-compose and a
+document that finished ingestion):
+    PYTHONPATH=src poetry run python benchmarks/load_test_rag.py \\
+        --document-id <uuid> --user-id <uuid> --requests 500 --concurrency 64 \\
+        --ttft-distribution lognormal --ttft-mean 1.5 --ttft-stddev 0.75 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import contextvars
+import random
+import statistics
+import time
+import uuid
+
+from api.database import table_models  # noqa: F401  (registers the models before the engine module)
+from api.config.db import async_session_maker
+from api.service.llm_backend import FakeLLMBackend, LatencyDistribution, set_llm_backend
+from api.service import rag
+from api.service.rag import process_question
+
+QUESTIONS = [
+    "Wie entkalke ich die Maschine?",
+    "How do I replace the drain pump filter?",
+    "Was bedeutet der Fehlercode E15?",
+    "Which screws hold the rear panel?",
+    "Wie reinige ich das Flusensieb?",
+]
+
+# Seconds spent inside the LLM backend by the current request (one list per task)
+llm_seconds: contextvars.ContextVar[list] = contextvars.ContextVar("llm_seconds")
+
+
+class TimedBackend:
+    """Records the time each call spends in the wrapped backend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    async def complete(self, model, prompt):
+        start = time.perf_counter()
+        try:
+            return await self.backend.complete(model, prompt)
+        finally:
+            llm_seconds.get().append(time.perf_counter() - start)
+
+    async def stream(self, model, prompt):
+        start = time.perf_counter()
+        try:
+            async for token in self.backend.stream(model, prompt):
+                yield token
+        finally:
+            llm_seconds.get().append(time.perf_counter() - start)
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def one_request(i: int, document_id: uuid.UUID, user_id: uuid.UUID, gate: asyncio.Semaphore):
+    async with gate:
+        llm_seconds.set([])
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})"
+        start = time.perf_counter()
+        async with async_session_maker() as db:
+            await process_question(question, db, document_id, user_id)
+        total = time.perf_counter() - start
+        llm = sum(llm_seconds.get())
+        return total, llm, total - llm
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document-id", type=uuid.UUID, required=True)
+    parser.add_argument("--user-id", type=uuid.UUID, required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--ttft-distribution", choices=LatencyDistribution.KINDS, default="lognormal")
+    parser.add_argument("--ttft-mean", type=float, default=1.5)
+    parser.add_argument("--ttft-stddev", type=float, default=0.75)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="Keep the semantic answer cache on (the questions are near-duplicates, so most requests hit)")
+    parser.add_argument("--conversation-memory", action="store_true",
+                        help="Keep the conversation memory on (its background summaries also call the fake LLM)")
+    args = parser.parse_args()
+
+    if not args.answer_cache:
+        rag.answer_cache = None
+    if not args.conversation_memory:
+        rag.conversation_memory = None
+
+    rng = random.Random(args.seed)
+    set_llm_backend(TimedBackend(FakeLLMBackend(
+        ttft=LatencyDistribution(args.ttft_distribution, args.ttft_mean, args.ttft_stddev, rng=rng),
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        failure_rate=args.failure_rate,
+        rng=rng,
+    )))
+
+    # Warm up the embedding model and the connection pool outside the measurement
+    await one_request(-1, args.document_id, args.user_id, asyncio.Semaphore(1))
+
+    gate = asyncio.Semaphore(args.concurrency)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        one_request(i, args.document_id, args.user_id, gate) for i in range(args.requests)
+    ))
+    wall = time.perf_counter() - start
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {wall:.1f}s wall, "
+          f"{args.requests / wall:.1f} req/s")
+    print(f"{'':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, column in (("end-to-end", 0), ("llm (fake)", 1), ("overhead", 2)):
+        samples = [r[column] for r in results]
+        print(f"{name:<12}{statistics.mean(samples) * 1e3:>10.1f}{percentile(samples, .5) * 1e3:>10.1f}"
+              f"{percentile(samples, .95) * 1e3:>10.1f}{percentile(samples, .99) * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,6 @@
 import logging
 import logging.config
-from typing import Optional
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import model_validator
 
@@ -44,11 +44,134 @@ class Settings(BaseSettings):
 
     DATABASE_URL: Optional[str] = None  # Constructed dynamically
 
+    # === Database Connection Pool ===
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # Wait for a free connection before failing
+    DB_POOL_PRE_PING: bool = True  # Detect connections dropped by the server before use
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Reopen connections older than this (-1: never)
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Prepared statements per connection; 0 behind PgBouncer
+    DB_ECHO: bool = False  # Log every SQL statement (debugging only)
+
     # === API Tokens ===
     HUGGINGFACE_HUB_TOKEN: Optional[str] = None
     REPLICATE_API_TOKEN: Optional[str] = None
     GEMMA_API_KEY: Optional[str] = None  #  Required for Gemma 3 integration
 
+    # === LLM Backend ===
+    LLM_BACKEND: Literal["replicate", "fake"] = "replicate"  # "fake": offline, simulated latency
+    LLM_PRIMARY_MODEL: str = "google-deepmind/gemma-3-27b-it:c0f0aebe8e578c15a7531e08a62cf01206f5870e9d0a67804b8152822db58c54"
+    LLM_FALLBACK_MODEL: str = "google-deepmind/gemma-3-7b-it"
+    LLM_FAKE_LATENCY_DISTRIBUTION: Literal["constant", "uniform", "exponential", "lognormal"] = "lognormal"
+    LLM_FAKE_TTFT_MEAN_SECONDS: float = 1.5  # Simulated time to first token
+    LLM_FAKE_TTFT_STDDEV_SECONDS: float = 0.75
+    LLM_FAKE_TOKENS_PER_SECOND: float = 40.0  # 0 = whole answer at once
+    LLM_FAKE_OUTPUT_TOKENS: int = 150
+    LLM_FAKE_FAILURE_RATE: float = 0.0  # Share of calls failing before the first token
+    LLM_FAKE_SEED: Optional[int] = None
+
+    # === LLM Client ===
+    LLM_MAX_CONCURRENCY: int = 256  # In-flight LLM calls per process
+    LLM_MAX_CONCURRENCY_PER_MODEL: int = 128
+    LLM_HTTP_MAX_CONNECTIONS: int = 100  # Shared keep-alive pool to the provider
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_TIMEOUT_SECONDS: float = 180  # Default latency budget per question, fallback included
+
+    # === LLM Hedging / Circuit Breaker ===
+    LLM_HEDGE_ENABLED: bool = True  # Start the fallback model when the primary is slow
+    LLM_HEDGE_PERCENTILE: float = 0.95  # ...slower than this percentile of its recent latencies
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 20.0  # Until LLM_HEDGE_MIN_SAMPLES latencies are known
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_WINDOW: int = 200  # Recent primary latencies kept for the percentile
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive primary failures/timeouts before routing to the fallback
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # Then one probe request tries the primary again
+
+    # === PDF Ingestion ===
+    INGESTION_WORKERS: int = 2  # PDFs processed concurrently per API process
+    INGESTION_POLL_SECONDS: float = 5.0  # Idle workers look for pending jobs (other processes, restarts)
+    INGESTION_STALE_SECONDS: float = 300.0  # Running job without heartbeat this long is re-run
+    PDF_EXTRACT_WORKERS: Optional[int] = None  # Extraction processes (None = CPU count)
+    PDF_EXTRACT_MIN_PAGES_PER_WORKER: int = 16  # Smaller PDFs are extracted serially
+    CHUNK_MAX_TOKENS: int = 200  # Embedding-tokenizer tokens per chunk (MiniLM truncates at 256)
+    CHUNK_MIN_TOKENS: int = 32  # A heading only starts a new chunk past this size
+
+    # === PDF Blob Storage ===
+    BLOB_STORE_BACKEND: Literal["local", "s3", "s3-local"] = "local"  # "s3-local": S3 code path on disk
+    BLOB_STORE_LOCAL_ROOT: str = "./data/blobs"
+    BLOB_STORE_S3_BUCKET: str = "reparatur-pdfs"
+    BLOB_STORE_S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://minio:9000
+    BLOB_STORE_S3_REGION: Optional[str] = None
+
+    # === Model Loading ===
+    MODEL_WARMUP_ON_STARTUP: bool = True  # False: models load on first use, the worker is ready at once
+    EMBEDDING_BACKEND: Literal["torch", "onnx"] = "torch"  # onnx: int8-quantized MiniLM on onnxruntime (CPU), needs `poetry install --extras onnx`
+    EMBEDDING_ONNX_DIR: str = "./data/models/all-MiniLM-L6-v2-onnx-int8"  # Exported here on first use when missing
+    EMBEDDING_ONNX_THREADS: int = 0  # onnxruntime intra-op threads (0 = all cores)
+
+    # === Embedding Sidecar ===
+    EMBEDDING_SIDECAR_SOCKET: Optional[str] = None  # e.g. /tmp/reparatur-embedding.sock; None = model in every worker
+    EMBEDDING_SIDECAR_MAX_BATCH_SIZE: int = 64  # Texts of all workers encoded together
+    EMBEDDING_SIDECAR_MAX_WAIT_MS: float = 5  # Longest a text waits for its batch to fill
+    EMBEDDING_SIDECAR_TIMEOUT_SECONDS: float = 30
+
+    # === Query Embedding ===
+    QUERY_EMBED_MAX_BATCH_SIZE: int = 32  # Questions encoded per forward pass
+    QUERY_EMBED_MAX_WAIT_MS: float = 5.0  # How long a question waits for batch mates
+    QUERY_EMBED_CACHE_ENABLED: bool = True
+    QUERY_EMBED_CACHE_MAX_ENTRIES: int = 10_000
+    QUERY_EMBED_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # 384 float32 ≈ 1.5 KB per entry
+    QUERY_EMBED_CACHE_TTL_SECONDS: float = 3600
+
+    # === Context Assembly ===
+    CONTEXT_CANDIDATES: int = 20  # Chunks retrieved before dedup / MMR / packing
+    CONTEXT_MAX_TOKENS: int = 1200  # Prompt-token budget of the document context
+    CONTEXT_MMR_LAMBDA: float = 0.7  # 1.0 = pure relevance, lower = more diverse
+    CONTEXT_MIN_OVERLAP_CHARS: int = 30  # Shorter repeats between chunks are kept
+    LLM_TOKENIZER_ID: str = "google/gemma-3-27b-it"  # Gated on the Hub: needs HUGGINGFACE_HUB_TOKEN
+
+    # === Cross-Encoder Reranking ===
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # German-heavy corpora: cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+    RERANK_CANDIDATES: int = 30  # Chunks retrieved and scored
+    RERANK_TOP_K: int = 8  # Best chunks handed to context packing
+    RERANK_BUDGET_MS: float = 250  # Past this, keep the retrieval order
+    RERANK_MAX_LENGTH: int = 256  # Tokens per (question, chunk) pair
+    RERANK_MAX_PENDING: int = 2  # Scoring jobs running + queued; more concurrent questions skip reranking
+    RERANK_CACHE_MAX_ENTRIES: int = 100_000  # (question hash, chunk id) → score
+    RERANK_CACHE_TTL_SECONDS: float = 3600
+
+    # === Semantic Answer Cache ===
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Cosine similarity of question embeddings for a hit
+    ANSWER_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    ANSWER_CACHE_MAX_ENTRIES_PER_SCOPE: int = 1000  # Per (document, user level); least recently used evicted
+
+    # === Conversation Memory ===
+    CONVERSATION_MEMORY_ENABLED: bool = True  # Questions in an active conversation see a bounded summary of the chat
+    CONVERSATION_ACTIVE_SECONDS: float = 1800  # Memory only if the last message is younger (others stay cacheable)
+    CONVERSATION_RECENT_TURNS: int = 3  # Last question/answer pairs sent verbatim
+    CONVERSATION_TURN_MAX_TOKENS: int = 200  # Per verbatim message
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 300  # Rolling summary of everything older
+    CONVERSATION_SUMMARY_BATCH_MESSAGES: int = 20  # Fold once this many left the verbatim window (one LLM call)
+    CONVERSATION_SUMMARY_BUDGET_SECONDS: float = 60
+    CONVERSATION_SUMMARY_MODEL: str = ""  # Empty: LLM_FALLBACK_MODEL (called directly, outside the hedge router)
+
+    # === Vector Search ===
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat", "none"] = "hnsw"  # ANN index on document_chunks.embedding
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_IVFFLAT_LISTS: int = 100  # ~ rows / 1000 is a good start
+    VECTOR_SEARCH_EF_SEARCH: int = 40  # HNSW candidate list per query (recall vs latency)
+    VECTOR_SEARCH_PROBES: int = 10  # IVFFlat lists probed per query
+    VECTOR_SEARCH_ITERATIVE_SCAN: Optional[Literal["relaxed_order", "strict_order"]] = "relaxed_order"  # None for pgvector < 0.8
+    VECTOR_EXACT_SEARCH_MAX_CHUNKS: int = 2000  # Smaller documents are searched exactly
+
+    # === Retrieval Mode ===
+    SEARCH_MODE: Literal["vector", "hybrid"] = "vector"  # Default; the chat endpoints accept ?search_mode=
+    SEARCH_HYBRID_DEPTH: int = 50  # Hits taken from each of the vector and full-text lists
+    SEARCH_RRF_K: int = 60  # Reciprocal rank fusion constant
+
     @model_validator(mode="after")
     def compute_database_url(self):
         """
@@ -79,4 +202,3 @@ class Settings(BaseSettings):
 
 # Load settings globally
 settings = Settings()
-print("DEBUG TOKEN:", settings.REPLICATE_API_TOKEN)
@@ -1,10 +1,10 @@
 import asyncio
 import logging
-from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 from api.database import table_models
+from api.database.schema_upgrades import apply_schema_upgrades, apply_concurrent_indexes
 from dotenv import load_dotenv
-from api.config.core import settings
+from api.config.db import engine
 
 load_dotenv()
 
@@ -12,7 +12,6 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def create_tables():
-    engine = create_async_engine(settings.DATABASE_URL, echo=True)
     async with engine.begin() as conn:
         logger.info("Creating extensions...")
         await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'))
@@ -22,6 +21,12 @@ async def create_tables():
         await conn.run_sync(table_models.Base.metadata.create_all)
         logger.info("Tables created successfully.")
 
+        logger.info("Applying schema upgrades...")
+        await apply_schema_upgrades(conn)
+
+    logger.info("Building indexes...")
+    await apply_concurrent_indexes(engine)
+
     await engine.dispose()
 
 if __name__ == "__main__":
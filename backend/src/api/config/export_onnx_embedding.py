@@ -0,0 +1,21 @@
+import argparse
+import logging
+from api.config.core import settings
+from api.service.model_registry import EMBEDDING_MODEL_ID
+from api.service.onnx_embedding import export_onnx_int8
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------
+# Export the embedding model to ONNX (int8) for EMBEDDING_BACKEND=onnx.
+# The API exports on first use when EMBEDDING_ONNX_DIR is empty; run this
+# ahead of time (e.g. in the image build) to keep that out of startup.
+# ------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to int8 ONNX")
+    parser.add_argument("--output-dir", default=settings.EMBEDDING_ONNX_DIR)
+    args = parser.parse_args()
+    path = export_onnx_int8(EMBEDDING_MODEL_ID, args.output_dir)
+    logger.info(f"Wrote {path}")
@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import logging
+from sqlalchemy import select, update, text
+from api.database import table_models  # noqa: F401 (register models first)
+from api.database.table_models import UploadedPdf
+from api.config.db import async_session_maker
+from api.service.blob_store import blob_store, pdf_blob_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------
+# Move PDF bytes from uploaded_pdfs.content into the blob store.
+# Also fills content_sha256 of uploads from before deduplication,
+# so new uploads of the same PDF reuse them.
+# One row at a time (the bytes of a single PDF in memory), committed per
+# row, so the script can be interrupted and re-run safely.
+# ------------------------------------------------------
+
+async def migrate_pdf_blobs():
+    async with async_session_maker() as db:
+        pending = (await db.execute(
+            select(UploadedPdf.id)
+            .where(UploadedPdf.blob_key.is_(None), UploadedPdf.content.is_not(None))
+        )).scalars().all()
+    logger.info(f"Moving {len(pending)} PDFs to the blob store...")
+
+    for n, document_id in enumerate(pending, start=1):
+        async with async_session_maker() as db:
+            content = (await db.execute(
+                select(UploadedPdf.content).where(UploadedPdf.id == document_id)
+            )).scalar_one()
+            content_sha256 = hashlib.sha256(content).hexdigest()
+            blob_key = pdf_blob_key(content_sha256)
+            if not await blob_store.exists(blob_key):
+                await blob_store.put(blob_key, content)
+            await db.execute(
+                update(UploadedPdf)
+                .where(UploadedPdf.id == document_id)
+                .values(blob_key=blob_key, content_sha256=content_sha256, content=None)
+            )
+            await db.commit()
+        logger.info(f"[{n}/{len(pending)}] {document_id} → {blob_key}")
+
+    # Duplicates stored no bytes of their own: share their source's blob
+    async with async_session_maker() as db:
+        result = await db.execute(text("""
+            UPDATE uploaded_pdfs AS dup
+            SET blob_key = src.blob_key
+            FROM uploaded_pdfs AS src
+            WHERE dup.source_document_id = src.id
+              AND dup.blob_key IS NULL
+              AND src.blob_key IS NOT NULL
+        """))
+        await db.commit()
+        logger.info(f"Linked {result.rowcount} duplicate uploads to their source blobs")
+
+    logger.info("Migration finished. Reclaim space with: VACUUM FULL uploaded_pdfs;")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_pdf_blobs())
@@ -0,0 +1,108 @@
+import uuid
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Column order of the records passed to DocumentChunkCopyWriter.write
+DOCUMENT_CHUNK_COLUMNS = [
+    "id",
+    "document_id",
+    "user_id",
+    "content",
+    "ordinal",
+    "page_number",
+    "char_start",
+    "char_end",
+    "embedding",
+]
+
+
+def document_chunk_record(
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    content: str,
+    ordinal: Optional[int],
+    page_number: Optional[int],
+    char_start: Optional[int],
+    char_end: Optional[int],
+    embedding,
+) -> tuple:
+    """One row for DOCUMENT_CHUNK_COLUMNS (ids are generated client side, like the ORM default)."""
+    return (uuid.uuid4(), document_id, user_id, content, ordinal, page_number, char_start, char_end, embedding)
+
+
+def _vector_literal(embedding) -> str:
+    return "[" + ",".join(str(x) for x in embedding.tolist()) + "]"
+
+
+class DocumentChunkCopyWriter:
+    """
+    Streams document_chunks rows straight to Postgres with asyncpg's
+    binary COPY (`copy_records_to_table`), bypassing the ORM.
+
+    Runs on the session's connection inside one asyncpg transaction (a
+    savepoint when the session already started one), so every batch is
+    committed or rolled back together. The pgvector binary codec is only
+    registered for the duration of the writer and removed afterwards, so
+    pooled connections keep passing vectors as text to the rest of the app.
+    When the codec cannot be registered the writer falls back to a
+    text-encoded `executemany`.
+
+        async with DocumentChunkCopyWriter(db) as writer:
+            await writer.write(records)
+        await db.commit()
+    """
+
+    def __init__(self, db: AsyncSession, table: str = "document_chunks"):
+        self.db = db
+        self.table = table
+        self.rows_written = 0
+        self._conn = None
+        self._transaction = None
+        self._binary = False
+
+    async def __aenter__(self) -> "DocumentChunkCopyWriter":
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        self._conn = raw.driver_connection  # asyncpg.Connection
+        self._transaction = self._conn.transaction()
+        await self._transaction.start()
+        try:
+            from pgvector.asyncpg import register_vector
+            await register_vector(self._conn)
+            self._binary = True
+        except Exception as e:
+            logger.warning(f"⚠️ pgvector binary codec unavailable, falling back to text inserts: {e}")
+        return self
+
+    async def write(self, records: Sequence[tuple]) -> None:
+        """Write one batch of DOCUMENT_CHUNK_COLUMNS records."""
+        if not records:
+            return
+        if self._binary:
+            await self._conn.copy_records_to_table(self.table, records=records, columns=DOCUMENT_CHUNK_COLUMNS)
+        else:
+            placeholders = ", ".join(f"${i}" for i in range(1, len(DOCUMENT_CHUNK_COLUMNS)))
+            await self._conn.executemany(
+                f"INSERT INTO {self.table} ({', '.join(DOCUMENT_CHUNK_COLUMNS)}) "
+                f"VALUES ({placeholders}, ${len(DOCUMENT_CHUNK_COLUMNS)}::vector)",
+                [record[:-1] + (_vector_literal(record[-1]),) for record in records],
+            )
+        self.rows_written += len(records)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self._transaction.commit()
+            else:
+                await self._transaction.rollback()
+        finally:
+            if self._binary:
+                for typename in ("vector", "halfvec", "sparsevec"):
+                    try:
+                        await self._conn.reset_type_codec(typename)
+                    except Exception:
+                        pass  # type not installed in this database
@@ -0,0 +1,62 @@
+import uuid
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.database.repository.base import BaseRepository
+from api.database.table_models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMessageRepository(BaseRepository[ChatMessage]):
+    model = ChatMessage
+
+    async def get_page(
+        self,
+        user_id: uuid.UUID,
+        document_id: Optional[uuid.UUID] = None,
+        after: Optional[tuple[datetime, uuid.UUID]] = None,
+        limit: int = 100,
+        descending: bool = False,
+    ) -> list[ChatMessage]:
+        """
+        Retrieve one keyset page of a user's chat history, ordered by (created_at, id).
+
+        The position is a row comparison on (created_at, id), served by the
+        chat_messages composite indexes, so every page costs the same no
+        matter how deep into the history it is.
+
+        Args:
+            user_id (uuid.UUID): Owner of the messages.
+            document_id (Optional[uuid.UUID]): Only messages about this document.
+            after (Optional[tuple[datetime, uuid.UUID]]): (created_at, id) of the last
+                message of the previous page; None for the first page.
+            limit (int): Maximum number of messages in the page.
+            descending (bool): Newest first instead of oldest first.
+
+        Returns:
+            list[ChatMessage]: Up to `limit` messages.
+
+        Raises:
+            SQLAlchemyError: If a database error occurs during retrieval.
+        """
+        try:
+            key = tuple_(ChatMessage.created_at, ChatMessage.id)
+            query = select(ChatMessage).where(ChatMessage.user_id == user_id)
+            if document_id:
+                query = query.where(ChatMessage.document_id == document_id)
+            if after is not None:
+                query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+            if descending:
+                query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            else:
+                query = query.order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc())
+            result = await self.db.execute(query.limit(limit))
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error getting {self.model.__name__} page for user {user_id}: {e}")
+            raise e
@@ -0,0 +1,6 @@
+from api.database.repository.base import BaseRepository
+from api.database.table_models import IngestionJob
+
+
+class IngestionJobRepository(BaseRepository[IngestionJob]):
+    model = IngestionJob
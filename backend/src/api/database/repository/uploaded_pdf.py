@@ -1,6 +1,47 @@
+import uuid
+import logging
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
 from api.database.repository.base import BaseRepository
-from api.database.table_models import UploadedPdf
+from api.database.table_models import UploadedPdf, IngestionJob
+from api.models.ingestion_job import IngestionStatus
+
+logger = logging.getLogger(__name__)
 
 
 class UploadedPdfRepository(BaseRepository[UploadedPdf]):
     model = UploadedPdf
+
+    async def get_source_id_by_sha256(self, content_sha256: str) -> Optional[uuid.UUID]:
+        """
+        Retrieve the earliest upload with these bytes that owns its chunks
+        (not itself a duplicate) and whose ingestion has not failed.
+
+        Args:
+            content_sha256 (str): Hex SHA-256 of the PDF bytes.
+
+        Returns:
+            Optional[uuid.UUID]: Id of the source document, or None if the bytes are new.
+
+        Raises:
+            SQLAlchemyError: If a database error occurs during retrieval.
+        """
+        try:
+            result = await self.db.execute(
+                select(UploadedPdf.id)
+                .join(IngestionJob, IngestionJob.document_id == UploadedPdf.id)
+                .where(
+                    UploadedPdf.content_sha256 == content_sha256,
+                    UploadedPdf.source_document_id.is_(None),
+                    IngestionJob.status != IngestionStatus.FAILED.value,
+                )
+                .order_by(UploadedPdf.uploaded_at.asc())
+                .limit(1)
+            )
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.error(f"Error getting {self.model.__name__} by content_sha256 == {content_sha256}: {e}")
+            raise e
@@ -0,0 +1,268 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from api.config.core import settings
+from api.database.table_models import CONTENT_TSV_EXPRESSION
+
+logger = logging.getLogger(__name__)
+
+def create_trigger_if_missing(name: str, table: str, definition: str) -> str:
+    """
+    CREATE TRIGGER `name` ON `table` only if it does not exist yet: checking
+    pg_trigger takes no lock, while re-creating a trigger locks the table
+    on every startup of every worker. `definition` is the rest of the
+    statement after the trigger name, with "{table}" where the table goes.
+    """
+    return f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger WHERE tgname = '{name}' AND tgrelid = '{table}'::regclass
+        ) THEN
+            CREATE TRIGGER {name} {definition.format(table=table)};
+        END IF;
+    END
+    $$
+    """
+
+
+def add_column_if_missing(table: str, column: str, definition: str) -> str:
+    """
+    ALTER TABLE `table` ADD COLUMN only if information_schema does not list
+    the column yet: ADD COLUMN IF NOT EXISTS takes an ACCESS EXCLUSIVE lock
+    even when the column is already there.
+    """
+    return f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = '{table}' AND column_name = '{column}'
+        ) THEN
+            ALTER TABLE {table} ADD COLUMN {column} {definition};
+        END IF;
+    END
+    $$
+    """
+
+
+def drop_not_null_if_set(table: str, column: str) -> str:
+    """ALTER COLUMN ... DROP NOT NULL only while the column is still NOT NULL."""
+    return f"""
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = '{table}'
+              AND column_name = '{column}' AND is_nullable = 'NO'
+        ) THEN
+            ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL;
+        END IF;
+    END
+    $$
+    """
+
+
+# ------------------------------------------------------
+# Idempotent DDL for tables that already exist.
+# `Base.metadata.create_all` only creates missing tables, so columns and
+# indexes added to existing models are declared here as well.
+# Statements run in order on every startup, inside one transaction, in
+# every worker: they must be re-runnable and take no table lock once
+# applied (check the catalog first). Indexes go to CONCURRENT_INDEXES.
+# ------------------------------------------------------
+SCHEMA_UPGRADES: list[str] = [
+    # Chunk position metadata (structure-aware chunker)
+    add_column_if_missing("document_chunks", "ordinal", "INTEGER"),
+    add_column_if_missing("document_chunks", "page_number", "INTEGER"),
+    add_column_if_missing("document_chunks", "char_start", "INTEGER"),
+    add_column_if_missing("document_chunks", "char_end", "INTEGER"),
+    # Content-addressed deduplication of uploads
+    drop_not_null_if_set("uploaded_pdfs", "content"),
+    # Uploads from before deduplication get their hash from api/config/migrate_pdf_blobs.py
+    # (hashing every row here would rescan uploaded_pdfs on each startup)
+    add_column_if_missing("uploaded_pdfs", "content_sha256", "VARCHAR(64)"),
+    add_column_if_missing(
+        "uploaded_pdfs", "source_document_id", "UUID REFERENCES uploaded_pdfs(id) ON DELETE SET NULL"
+    ),
+    # Deleting a source upload (or its owner) promotes its oldest duplicate to source:
+    # the chunks, the ingestion job and the other duplicates move over instead of
+    # cascading away from everyone who uploaded the same PDF.
+    """
+    CREATE OR REPLACE FUNCTION uploaded_pdfs_promote_duplicate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        heir uploaded_pdfs%ROWTYPE;
+    BEGIN
+        IF OLD.source_document_id IS NOT NULL THEN
+            RETURN OLD;
+        END IF;
+        SELECT * INTO heir FROM uploaded_pdfs
+        WHERE source_document_id = OLD.id
+        ORDER BY uploaded_at, id
+        LIMIT 1
+        FOR UPDATE;
+        IF NOT FOUND THEN
+            RETURN OLD;
+        END IF;
+        UPDATE uploaded_pdfs
+        SET source_document_id = NULL,
+            blob_key = COALESCE(blob_key, OLD.blob_key),
+            content = CASE WHEN blob_key IS NULL AND OLD.blob_key IS NULL THEN OLD.content ELSE content END
+        WHERE id = heir.id;
+        UPDATE uploaded_pdfs SET source_document_id = heir.id WHERE source_document_id = OLD.id;
+        UPDATE document_chunks SET document_id = heir.id, user_id = heir.user_id WHERE document_id = OLD.id;
+        UPDATE ingestion_jobs SET document_id = heir.id WHERE document_id = OLD.id;
+        RETURN OLD;
+    END
+    $$
+    """,
+    create_trigger_if_missing(
+        "uploaded_pdfs_promote_duplicate", "uploaded_pdfs",
+        "BEFORE DELETE ON {table} FOR EACH ROW EXECUTE FUNCTION uploaded_pdfs_promote_duplicate()",
+    ),
+    # PDF bytes move to the blob store (api/config/migrate_pdf_blobs.py)
+    add_column_if_missing("uploaded_pdfs", "blob_key", "VARCHAR(255)"),
+    # Hybrid search: generated German+English tsvector (rewrites the table once; GIN index below)
+    add_column_if_missing(
+        "document_chunks", "content_tsv", f"tsvector GENERATED ALWAYS AS ({CONTENT_TSV_EXPRESSION}) STORED"
+    ),
+    # Semantic answer cache: any change to a document's chunks drops its cached answers.
+    # Statement-level triggers, so a COPY of thousands of chunks fires once.
+    """
+    CREATE OR REPLACE FUNCTION answer_cache_invalidate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            DELETE FROM answer_cache WHERE document_id IN (SELECT DISTINCT document_id FROM new_chunks);
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM answer_cache WHERE document_id IN (SELECT DISTINCT document_id FROM old_chunks);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    create_trigger_if_missing(
+        "document_chunks_insert_invalidate_answers", "document_chunks",
+        "AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_chunks "
+        "FOR EACH STATEMENT EXECUTE FUNCTION answer_cache_invalidate()",
+    ),
+    create_trigger_if_missing(
+        "document_chunks_update_invalidate_answers", "document_chunks",
+        "AFTER UPDATE ON {table} REFERENCING OLD TABLE AS old_chunks NEW TABLE AS new_chunks "
+        "FOR EACH STATEMENT EXECUTE FUNCTION answer_cache_invalidate()",
+    ),
+    create_trigger_if_missing(
+        "document_chunks_delete_invalidate_answers", "document_chunks",
+        "AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_chunks "
+        "FOR EACH STATEMENT EXECUTE FUNCTION answer_cache_invalidate()",
+    ),
+]
+
+
+# ------------------------------------------------------
+# Indexes on tables that already hold data, built with
+# CREATE INDEX CONCURRENTLY (writes continue during the build) after the
+# SCHEMA_UPGRADES transaction has committed. Name → rest of the statement.
+# ------------------------------------------------------
+CONCURRENT_INDEXES: dict[str, str] = {
+    # Filtered search: every question filters chunks by document_id (leading column)
+    "ix_document_chunks_document_user": "ON document_chunks (document_id, user_id)",
+    # Deduplication lookups and duplicate promotion
+    "ix_uploaded_pdfs_content_sha256": "ON uploaded_pdfs (content_sha256)",
+    "ix_uploaded_pdfs_source_document_id": "ON uploaded_pdfs (source_document_id)",
+    # Ingestion workers claim the oldest pending job (api.service.ingestion)
+    "ix_ingestion_jobs_pending": "ON ingestion_jobs (created_at) "
+    "WHERE status IN ('queued', 'extracting', 'embedding')",
+    # Hybrid search: full-text match on the generated tsvector
+    "ix_document_chunks_content_tsv": "ON document_chunks USING gin (content_tsv)",
+    # Keyset-paginated chat history
+    "ix_chat_messages_user_document_created": "ON chat_messages (user_id, document_id, created_at, id)",
+    "ix_chat_messages_user_created": "ON chat_messages (user_id, created_at, id)",
+}
+
+# Other workers skip the index builds while one holds this advisory lock
+INDEX_BUILD_LOCK_KEY = 0x7665_6374  # "vect"
+
+VECTOR_INDEX_NAMES = {
+    "hnsw": "ix_document_chunks_embedding_hnsw",
+    "ivfflat": "ix_document_chunks_embedding_ivfflat",
+}
+
+
+def vector_index() -> dict[str, str]:
+    """
+    The ANN index on document_chunks.embedding chosen by VECTOR_INDEX_TYPE,
+    as {name: rest of the statement} (empty for "none"). The `<->` (L2)
+    operator is used by the search, so the index is built with vector_l2_ops.
+    """
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        return {
+            VECTOR_INDEX_NAMES["hnsw"]: "ON document_chunks USING hnsw (embedding vector_l2_ops) "
+            f"WITH (m = {int(settings.VECTOR_HNSW_M)}, ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)})",
+        }
+    if settings.VECTOR_INDEX_TYPE == "ivfflat":
+        return {
+            VECTOR_INDEX_NAMES["ivfflat"]: "ON document_chunks USING ivfflat (embedding vector_l2_ops) "
+            f"WITH (lists = {int(settings.VECTOR_IVFFLAT_LISTS)})",
+        }
+    return {}
+
+
+def concurrent_index_ddl() -> list[str]:
+    """DDL of CONCURRENT_INDEXES and the vector index; none of it can run inside a transaction."""
+    statements = []
+    vector = vector_index()
+    if vector:
+        statements += [
+            f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+            for name in VECTOR_INDEX_NAMES.values() if name not in vector
+        ]
+    statements += [
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"
+        for name, definition in {**CONCURRENT_INDEXES, **vector}.items()
+    ]
+    return statements
+
+
+async def apply_schema_upgrades(conn: AsyncConnection) -> None:
+    """Run every statement of SCHEMA_UPGRADES (inside the caller's transaction)."""
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+    logger.info(f"Applied {len(SCHEMA_UPGRADES)} schema upgrade statements")
+
+
+async def apply_concurrent_indexes(engine: AsyncEngine) -> None:
+    """
+    Run concurrent_index_ddl() on an autocommit connection, after the schema
+    upgrades are committed. Only the worker holding INDEX_BUILD_LOCK_KEY
+    builds; the others start without waiting. An interrupted concurrent
+    build leaves an INVALID index behind, which is dropped and rebuilt.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        locked = (await conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": INDEX_BUILD_LOCK_KEY}
+        )).scalar_one()
+        if not locked:
+            logger.info("Indexes are being built by another worker, skipping")
+            return
+        try:
+            invalid = (await conn.execute(
+                text(
+                    "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+                ),
+                {"names": [*CONCURRENT_INDEXES, *VECTOR_INDEX_NAMES.values()]},
+            )).scalars().all()
+            for index_name in invalid:
+                logger.warning(f"⚠️ Dropping invalid index {index_name} left by an interrupted build")
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            statements = concurrent_index_ddl()
+            for statement in statements:
+                await conn.execute(text(statement))
+            logger.info(f"Applied {len(statements)} concurrent index statements")
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INDEX_BUILD_LOCK_KEY})
@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime, timezone
 from typing import List
 
-from sqlalchemy import String, LargeBinary, DateTime, Integer, ForeignKey, Text, func, ARRAY , Float
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import String, LargeBinary, DateTime, Integer, ForeignKey, Text, func, ARRAY , Float, Index, Computed, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from pgvector.sqlalchemy import Vector
@@ -34,16 +34,34 @@ class User(Base):
 
 # ================= UPLOADED PDFs =================
 class UploadedPdf(Base):
-    """Table for uploaded PDFs. Stores binary content and metadata."""
+    """Table for uploaded PDFs. Stores metadata and the blob-store key of the file.
+
+    A re-upload of bytes that were already processed stores no content and
+    points `source_document_id` at the first upload, whose chunks it reuses.
+    Deleting that source promotes its oldest duplicate to source (trigger in
+    schema_upgrades), so the chunks survive as long as one upload uses them.
+    """
     __tablename__ = "uploaded_pdfs"
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     title: Mapped[str] = mapped_column(String(length=255), nullable=False)
-    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Legacy inline bytes (NULL once moved to the blob store, and for duplicates).
+    # Deferred: only loaded when explicitly requested.
+    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    # Key of the PDF bytes in the blob store (see api.service.blob_store)
+    blob_key: Mapped[str] = mapped_column(String(length=255), nullable=True)
     file_size: Mapped[int] = mapped_column(Integer)
 
+    # Content addressing: identical uploads share one set of chunks/embeddings
+    content_sha256: Mapped[str] = mapped_column(String(length=64), nullable=True, index=True)
+    source_document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("uploaded_pdfs.id", ondelete="SET NULL"),
+        nullable=True
+    )
+
     # Let Postgres set the timestamp automatically
     uploaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -60,8 +78,10 @@ class UploadedPdf(Base):
 
     # Relationships
     user: Mapped["User"] = relationship("User", back_populates="uploaded_pdfs")
+    # passive_deletes: the database cascades (after the promote-duplicate trigger
+    # has moved them to a surviving duplicate), the ORM does not delete them first
     chunks: Mapped[List["DocumentChunk"]] = relationship(
-        "DocumentChunk", back_populates="document", cascade="all, delete-orphan"
+        "DocumentChunk", back_populates="document", cascade="all, delete-orphan", passive_deletes=True
     )
     chat_messages: Mapped[List["ChatMessage"]] = relationship(
         "ChatMessage", back_populates="document", cascade="all, delete-orphan"
@@ -69,6 +89,10 @@ class UploadedPdf(Base):
     tools: Mapped[List["DocumentTool"]] = relationship(
     "DocumentTool", back_populates="document", cascade="all, delete-orphan"
 )
+    # One-to-one: background extraction/embedding job of this PDF
+    ingestion_job: Mapped["IngestionJob"] = relationship(
+        "IngestionJob", back_populates="document", uselist=False, cascade="all, delete-orphan", passive_deletes=True
+    )
 
     # One-to-one: each PDF has one tools/parts record
     # tools_parts: Mapped["DocumentToolsParts"] = relationship(
@@ -80,9 +104,21 @@ class UploadedPdf(Base):
 
 
 # ================= DOCUMENT CHUNKS =================
+CONTENT_TSV_EXPRESSION = (
+    "to_tsvector('german'::regconfig, content) || to_tsvector('english'::regconfig, content)"
+)
+
+
+
 class DocumentChunk(Base):
     """Extracted text chunks from PDFs with embeddings for semantic search."""
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        # Filtered similarity search (see schema_upgrades for the ANN index)
+        Index("ix_document_chunks_document_user", "document_id", "user_id"),
+        # Lexical half of hybrid search
+        Index("ix_document_chunks_content_tsv", "content_tsv", postgresql_using="gin"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -96,17 +132,107 @@ class DocumentChunk(Base):
 
     content: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Position of the chunk in its document (nullable for chunks stored before these existed)
+    ordinal: Mapped[int] = mapped_column(Integer, nullable=True)
+    page_number: Mapped[int] = mapped_column(Integer, nullable=True)  # 1-based start page
+    char_start: Mapped[int] = mapped_column(Integer, nullable=True)
+    char_end: Mapped[int] = mapped_column(Integer, nullable=True)
+
     # Embedding vector (example: MiniLM-L6-v2 with 384 dimensions)
     embedding: Mapped[List[float]] = mapped_column(Vector(384))
 
+    # Full-text index of the content (manuals are German or English); maintained by Postgres
+    content_tsv: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(CONTENT_TSV_EXPRESSION, persisted=True),
+        deferred=True,
+    )
+
     # Relationship: chunk belongs to one PDF
     document: Mapped["UploadedPdf"] = relationship("UploadedPdf", back_populates="chunks")
 
 
+# ================= INGESTION JOBS =================
+class IngestionJob(Base):
+    """Background extract → chunk → embed → store job of an uploaded PDF."""
+    __tablename__ = "ingestion_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("uploaded_pdfs.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+    )
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")  # see IngestionStatus
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)  # 0.0 .. 1.0
+    chunk_count: Mapped[int] = mapped_column(Integer, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+    # Relationship: job belongs to one PDF
+    document: Mapped["UploadedPdf"] = relationship("UploadedPdf", back_populates="ingestion_job")
+
+
+# ================= ANSWER CACHE =================
+class AnswerCacheEntry(Base):
+    """
+    Semantic answer cache: answers of earlier questions about a document,
+    reused for new questions whose embedding is close enough.
+    Entries are dropped when the document's chunks change (trigger in schema_upgrades).
+    """
+    __tablename__ = "answer_cache"
+    __table_args__ = (
+        Index("ix_answer_cache_scope", "document_id", "user_level", "last_used_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    # Source document of the chunks (duplicates share the cache of their source)
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("uploaded_pdfs.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    user_level: Mapped[str] = mapped_column(String(20), nullable=False)  # beginner / intermediate / expert
+    question: Mapped[str] = mapped_column(Text, nullable=False)  # normalized question
+    question_embedding: Mapped[List[float]] = mapped_column(Vector(384), nullable=False)
+    answer: Mapped[str] = mapped_column(Text, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
 # ================= CHAT MESSAGES =================
 class ChatMessage(Base):
     """Chat messages table. Stores conversation history for each user."""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination of the history on (created_at, id), per document or over all of them
+        Index("ix_chat_messages_user_document_created", "user_id", "document_id", "created_at", "id"),
+        Index("ix_chat_messages_user_created", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -134,6 +260,43 @@ class ChatMessage(Base):
     document: Mapped["UploadedPdf"] = relationship("UploadedPdf", back_populates="chat_messages")
 
 
+# ================= CONVERSATION SUMMARIES =================
+class ConversationSummary(Base):
+    """
+    Rolling summary of a user's chat about one document: every message up to
+    (summarized_until, summarized_until_id) is folded into `summary`, newer
+    ones are still sent to the model verbatim (see api.service.conversation_memory).
+    """
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "document_id", name="uq_conversation_summaries_user_document"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("uploaded_pdfs.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    summary: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    # Keyset position (created_at, id) of the last chat message in the summary
+    summarized_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    summarized_until_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    summarized_messages: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+
 # ================= DOCUMENT TOOLS & PARTS =================
 
 #     """Stores required tools & parts for each uploaded PDF."""
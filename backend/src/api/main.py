@@ -1,10 +1,18 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import routers
-from api.routers import users, uploaded_pdfs, chat , tools , document_chunks , document_tools 
+from api.routers import users, uploaded_pdfs, chat , tools , document_chunks , document_tools , diagnostics , health , metrics
+from api.config.core import settings
 from api.config.db import init_db_tables
+from api.service.ingestion import ingestion_queue
+from api.service.pdf_extraction import pdf_extractor
+from api.service.rag import query_embedder, conversation_memory
+from api.service.llm_backend import close_llm_backend
+from api.service.reranking import reranker
+from api.service.model_registry import models
 
 
 
@@ -20,10 +28,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger("api.main")
 
+# ------------------------------------------------------
+# Lifespan: startup (DB tables, workers, model warm-up) and shutdown
+# ------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Initializing database tables")
+    await init_db_tables()   # Async database initialization
+    logger.info("Database tables initialized successfully")
+    await ingestion_queue.start()  # background PDF extraction/embedding workers
+    if settings.MODEL_WARMUP_ON_STARTUP:
+        models.start_warm_up()  # /health/ready turns 200 once done
+    else:
+        models.ready = True
+
+    yield
+
+    await models.stop()
+    await ingestion_queue.stop()
+    pdf_extractor.shutdown()
+    await query_embedder.stop()
+    if conversation_memory is not None:
+        await conversation_memory.close()
+    await close_llm_backend()
+    reranker.shutdown()
+
+
 # ------------------------------------------------------
 # Create FastAPI application
 # ------------------------------------------------------
-app = FastAPI(title="Reparatur API")
+app = FastAPI(title="Reparatur API", lifespan=lifespan)
 
 # ------------------------------------------------------
 # Enable CORS (Cross-Origin Resource Sharing)
@@ -45,12 +79,6 @@ app.include_router(chat.router)
 app.include_router(document_chunks.router)
 app.include_router(tools.router)
 app.include_router(document_tools.router)
-
-# ------------------------------------------------------
-# Startup event: initialize database tables asynchronously
-# ------------------------------------------------------
-@app.on_event("startup")
-async def on_startup():
-    logger.info("Initializing database tables")
-    await init_db_tables()   # Async database initialization
-    logger.info("Database tables initialized successfully")
+app.include_router(diagnostics.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
@@ -1,5 +1,5 @@
 import uuid
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 class DocumentChunkBase(BaseModel):
@@ -15,6 +15,10 @@ class DocumentChunkRead(DocumentChunkBase):
     document_id: uuid.UUID
     user_id: uuid.UUID
     embedding: List[float]
+    ordinal: Optional[int] = None
+    page_number: Optional[int] = None
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -0,0 +1,25 @@
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class IngestionStatus(str, Enum):
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    EMBEDDING = "embedding"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class IngestionJobOut(BaseModel):
+    document_id: UUID
+    status: IngestionStatus
+    progress: float
+    chunk_count: int | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
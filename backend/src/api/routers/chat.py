@@ -1,29 +1,95 @@
-from dataclasses import dataclass
+import json
+import time
+import asyncio
+import base64
+from datetime import datetime
 import logging
+from typing import AsyncIterator
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from uuid import UUID
+from typing import Literal, Optional
+from api.config.db import async_session_maker
 from api.routers.dependencies import db_dependency
-from api.service.rag import process_question, ask_gemma3
+from api.service.rag import (
+    process_question, ask_general_question, clean_answer, save_chat_messages, conversation_memory,
+    resolve_document_question, stream_document_question, stream_general_question, record_question,
+)
+from api.service.user_level import apply_user_level
 from api.database.table_models import ChatMessage
+from api.database.repository.chat_message import ChatMessageRepository
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-@dataclass(frozen=True)
-class UserLevelQuestionPrefix:
-    BASE_PREFIX = """
-    (if applicable) Also think about what tools should be used in the answer you give me 
-    and their current prices 
-    and what companies are providing them in germany with links to them
-    and give me brief comparison, if i repair it myself and if get a help from professionals, in terms of costs and time
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_answer(
+    items: AsyncIterator[tuple[str, str]],
+    question: str,
+    user_id: UUID,
+    document_id: UUID | None,
+    start_time: float,
+) -> AsyncIterator[str]:
+    """
+    SSE body of the streaming chat endpoints:
+    - "token" events as soon as Gemma produces them; a cached answer
+      arrives as one "token" event holding the whole answer
+    - one "done" event with the full answer, whether it was cached,
+      time-to-first-token and total time (sent after the ChatMessage pair is persisted)
+    - an "error" event instead if generation fails or exceeds LLM_TIMEOUT_SECONDS
+    Document questions are counted in the question metrics when the stream ends.
     """
-    BEGINNER: str = f"{BASE_PREFIX}, I am a beginner user with little to no prior knowledge of the subject."
-    INTERMEDIATE: str = f"{BASE_PREFIX}, I am an intermediate user with some knowledge of the subject."
-    EXPERT: str = f"{BASE_PREFIX}, I am an expert user with extensive knowledge of the subject."
+    parts: list[str] = []
+    first_token_at = None
+    cached = False
+    try:
+        async for kind, text in items:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            cached = kind == "cached"
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+    except asyncio.TimeoutError:
+        logger.error("⏳ Streaming chat timed out")
+        if document_id is not None:
+            record_question(time.perf_counter() - start_time, "timeout")
+        yield sse_event("error", {"detail": "Request timed out."})
+        return
+    except Exception as e:
+        logger.exception("❌ Streaming chat error")
+        yield sse_event("error", {"detail": f"Chat failed: {str(e)}"})
+        return
+
+    answer = clean_answer("".join(parts)) or "⚠️ Sorry, I could not get an answer."
+    # The request's session is released before a streamed body finishes; use a fresh one
+    async with async_session_maker() as db:
+        try:
+            await save_chat_messages(db, user_id, document_id, question, answer)
+            if document_id is not None and conversation_memory is not None:
+                conversation_memory.schedule_update(user_id, document_id)
+        except Exception as e:
+            logger.exception(f"❌ Failed to save chat messages: {e}")
+
+    elapsed = time.perf_counter() - start_time
+    if document_id is not None:
+        record_question(elapsed, "cached" if cached else "answered")
+    yield sse_event("done", {
+        "question": question,
+        "answer": answer,
+        "cached": cached,
+        "time_to_first_token": first_token_at - start_time if first_token_at else None,
+        "elapsed_time": elapsed,
+    })
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 
 @router.get("/general")
@@ -35,26 +101,16 @@ async def general_chat(
     ):
     """
     General chatbot endpoint (no document required).
+    Identical questions asked at the same time (same level) share one Gemma call.
     """
     try:
-        if user_level_rate == 3 or user_level_rate == 4:
-            question_prefix = UserLevelQuestionPrefix.INTERMEDIATE
-        elif user_level_rate == 5:
-            question_prefix = UserLevelQuestionPrefix.EXPERT
-        else:
-            question_prefix = UserLevelQuestionPrefix.BEGINNER
-
-        question = f"{question_prefix}, {question}"
-        # Call Gemma without PDF context
-        response = ask_gemma3(question)
+        # Call Gemma without PDF context (async client; never blocks the event loop)
+        response = await ask_general_question(question, user_level_rate)
         answer = response.get("answer", "No answer")
 
         # Save chat history (no document_id here)
-        user_msg = ChatMessage(user_id=user_id, role="user", message=question)
-        assistant_msg = ChatMessage(user_id=user_id, role="assistant", message=answer)
-
-        db.add_all([user_msg, assistant_msg])
-        await db.commit()
+        question = apply_user_level(question, user_level_rate)
+        await save_chat_messages(db, user_id, None, question, answer)
 
         return {"question": question, "answer": answer}
 
@@ -63,71 +119,197 @@ async def general_chat(
         raise HTTPException(status_code=500, detail=f"General chat error: {str(e)}")
 
 
+@router.get("/general/stream")
+async def general_chat_stream(
+        question: str,
+        user_id: UUID,
+        user_level_rate: int = Query(1, ge=1, le=5, description="User expertise level from 1 (beginner) to 5 (expert)"),
+    ):
+    """
+    Streaming variant of /chat/general (Server-Sent Events).
+    Identical questions streamed at the same time (same level) share one Gemma stream.
+    """
+    start_time = time.perf_counter()
+    items = stream_general_question(question, user_level_rate)
+    question = apply_user_level(question, user_level_rate)
+    return StreamingResponse(
+        stream_answer(items, question, user_id, None, start_time),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.get("/")
 async def chat_with_pdf(
     question: str = Query(..., description="User question"),
     document_id: UUID = Query(..., description="UUID of the uploaded PDF"),
     user_id: UUID = Query(..., description="UUID of the user asking the question"),
     user_level_rate: int = Query(1, ge=1, le=5, description="User expertise level from 1 (beginner) to 5 (expert)"),
+    search_mode: Optional[Literal["vector", "hybrid"]] = Query(None, description="Retrieval mode (default from settings)"),
     db: AsyncSession = Depends(db_dependency),
 ):
     """
     Ask a question about a specific uploaded PDF.
-    - Retrieves relevant chunks from DB (filtered by document_id).
-    - Sends context + question to Gemma 3 for answering.
+    - Answers from the semantic answer cache when a similar question
+      about this document was answered before for the same user level.
+    - Otherwise retrieves relevant chunks from DB (filtered by document_id)
+      and sends context + question to Gemma 3 for answering.
     - Stores Q&A in chat history table.
     - Returns the model's response + elapsed time.
     """
     try:
-        if user_level_rate == 3 or user_level_rate == 4:
-            question_prefix = UserLevelQuestionPrefix.INTERMEDIATE
-        elif user_level_rate == 5:
-            question_prefix = UserLevelQuestionPrefix.EXPERT
-        else:
-            question_prefix = UserLevelQuestionPrefix.BEGINNER
-
-        question = f"{question_prefix}, {question}"
         result = await process_question(
             question=question,
             db=db,
             document_id=document_id,
             user_id=user_id,
+            user_level_rate=user_level_rate,
+            search_mode=search_mode,
         )
-        return result  # includes "answer", "raw_response", "elapsed_time"
+        return result  # includes "answer", "raw_response", "elapsed_time", "cached"
     except Exception as e:
         logger.exception("❌ Chat with PDF error")
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
+@router.get("/stream")
+async def chat_with_pdf_stream(
+    question: str = Query(..., description="User question"),
+    document_id: UUID = Query(..., description="UUID of the uploaded PDF"),
+    user_id: UUID = Query(..., description="UUID of the user asking the question"),
+    user_level_rate: int = Query(1, ge=1, le=5, description="User expertise level from 1 (beginner) to 5 (expert)"),
+    search_mode: Optional[Literal["vector", "hybrid"]] = Query(None, description="Retrieval mode (default from settings)"),
+    db: AsyncSession = Depends(db_dependency),
+):
+    """
+    Streaming variant of /chat/ (Server-Sent Events), on the same pipeline.
+    - Resolves the document and the conversation memory of an active conversation before the stream starts.
+    - Serves an answer from the semantic answer cache as a single "token" event.
+    - Otherwise retrieves relevant chunks and forwards Gemma tokens as "token" events
+      while they are generated; identical questions streamed at the same time share one run.
+    - Stores Q&A in chat history, then sends a "done" event
+      with the answer, whether it was cached, time-to-first-token and elapsed time.
+    """
+    start_time = time.perf_counter()
+    try:
+        q = await resolve_document_question(db, question, document_id, user_id, user_level_rate, search_mode)
+    except Exception as e:
+        logger.exception("❌ Chat with PDF error")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+    return StreamingResponse(
+        stream_answer(stream_document_question(q), q.prompt_question, user_id, document_id, start_time),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+HISTORY_BATCH_SIZE = 500  # Messages fetched per keyset query while streaming
+
+
+def message_to_dict(msg: ChatMessage) -> dict:
+    return {
+        "id": str(msg.id),
+        "role": msg.role,
+        "message": msg.message,
+        "document_id": str(msg.document_id) if msg.document_id else None,
+        "created_at": msg.created_at.isoformat(),
+    }
+
+
+def encode_history_cursor(msg: ChatMessage) -> str:
+    """Opaque cursor for the (created_at, id) position of a message."""
+    return base64.urlsafe_b64encode(f"{msg.created_at.isoformat()}|{msg.id}".encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, _, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), UUID(message_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def iter_history(
+    user_id: UUID,
+    document_id: UUID | None,
+    after: tuple[datetime, UUID] | None,
+    limit: int | None,
+    descending: bool,
+) -> AsyncIterator[ChatMessage]:
+    """Messages in keyset batches of HISTORY_BATCH_SIZE (at most `limit`), on a session of its own."""
+    remaining = limit
+    async with async_session_maker() as db:
+        repository = ChatMessageRepository(db)
+        while remaining is None or remaining > 0:
+            batch_size = HISTORY_BATCH_SIZE if remaining is None else min(HISTORY_BATCH_SIZE, remaining)
+            page = await repository.get_page(user_id, document_id, after, batch_size, descending)
+            for msg in page:
+                yield msg
+            if len(page) < batch_size:
+                return
+            after = (page[-1].created_at, page[-1].id)
+            if remaining is not None:
+                remaining -= len(page)
+            db.expunge_all()  # keep memory flat: drop the previous batch from the identity map
+
+
+async def stream_json_array(messages: AsyncIterator[ChatMessage]) -> AsyncIterator[str]:
+    yield "["
+    first = True
+    async for msg in messages:
+        yield ("" if first else ",") + json.dumps(message_to_dict(msg), ensure_ascii=False)
+        first = False
+    yield "]"
+
+
+async def stream_ndjson(messages: AsyncIterator[ChatMessage]) -> AsyncIterator[str]:
+    async for msg in messages:
+        yield json.dumps(message_to_dict(msg), ensure_ascii=False) + "\n"
+
+
 @router.get("/history")
 async def get_chat_history(
     user_id: UUID = Query(..., description="UUID of the user"),
     document_id: UUID | None = Query(None, description="Optional UUID of the document"),
+    limit: int | None = Query(None, ge=1, le=1000, description="Page size; enables cursor pagination"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    order: Literal["asc", "desc"] = Query("asc", description="Oldest first (asc) or newest first (desc)"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson: stream one message per line"),
     db: AsyncSession = Depends(db_dependency),
 ):
     """
-    Returns all previous chat messages for a given user.
+    Returns previous chat messages for a given user, ordered by (created_at, id).
     If document_id is provided, filter by document as well.
+    - Without `limit`: the whole history as a JSON list (as before),
+      streamed from keyset batches so memory stays flat.
+    - With `limit`: one page {"messages": [...], "next_cursor": ...};
+      pass next_cursor back as `cursor` for the next page (null = last page).
+    - format=ndjson: newline-delimited JSON messages, streamed
+      (the whole history, or `limit` messages from `cursor`).
     """
+    after = decode_history_cursor(cursor) if cursor else None
+    descending = order == "desc"
     try:
-        query = select(ChatMessage).where(ChatMessage.user_id == user_id)
-        if document_id:
-            query = query.where(ChatMessage.document_id == document_id)
-
-        query = query.order_by(ChatMessage.created_at.asc())
-        result = await db.execute(query)
-        messages = result.scalars().all()
-
-        return [
-            {
-                "id": str(msg.id),
-                "role": msg.role,
-                "message": msg.message,
-                "document_id": str(msg.document_id) if msg.document_id else None,
-                "created_at": msg.created_at,
-            }
-            for msg in messages
-        ]
+        if format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson(iter_history(user_id, document_id, after, limit, descending)),
+                media_type="application/x-ndjson",
+            )
+        if limit is None:
+            return StreamingResponse(
+                stream_json_array(iter_history(user_id, document_id, after, None, descending)),
+                media_type="application/json",
+            )
+
+        # One extra row tells whether another page exists
+        messages = await ChatMessageRepository(db).get_page(user_id, document_id, after, limit + 1, descending)
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        return {
+            "messages": [message_to_dict(msg) for msg in messages],
+            "next_cursor": encode_history_cursor(messages[-1]) if has_more else None,
+        }
 
     except Exception as e:
         logger.exception("❌ Error fetching chat history")
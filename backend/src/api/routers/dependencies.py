@@ -1,19 +1,12 @@
 from collections.abc import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from api.config.core import settings
-
-# Create engine
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
-
-# Async session factory
-async_session_maker = async_sessionmaker(
-    bind=engine, expire_on_commit=False, class_=AsyncSession
-)
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.config.db import async_session_maker
 
 # Dependency for FastAPI routes
 async def db_dependency() -> AsyncGenerator[AsyncSession, None]:
     """
-    Async generator dependency that yields a database session.
+    Async generator dependency that yields a database session
+    (from the shared engine in api.config.db).
     """
     async with async_session_maker() as session:
         yield session
@@ -0,0 +1,74 @@
+from fastapi import APIRouter
+
+from api.config.core import settings
+from api.config.db import pool_stats
+from api.service.answer_cache import answer_cache
+from api.service.llm_backend import llm_limiter
+from api.service.llm_routing import llm_router
+from api.service.reranking import reranker
+from api.service.model_registry import models
+from api.service.rag import query_embedder, query_embedding_cache, question_flights, question_streams, conversation_memory
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/embedding")
+async def embedding_stats():
+    """
+    Batch statistics of the shared query embedder
+    (requests, batches, mean batch fill, batch-size histogram)
+    and hit/miss counters of the query-embedding cache.
+    With EMBEDDING_SIDECAR_SOCKET, also this worker's requests to the sidecar.
+    """
+    sidecar = None
+    if settings.EMBEDDING_SIDECAR_SOCKET and models.is_loaded("embedding"):
+        sidecar = models.get("embedding").stats()
+    return {
+        "backend": "sidecar" if settings.EMBEDDING_SIDECAR_SOCKET else settings.EMBEDDING_BACKEND,
+        "sidecar": sidecar,
+        "batcher": query_embedder.snapshot(),
+        "cache": query_embedding_cache.stats() if query_embedding_cache is not None else {"enabled": False},
+    }
+
+
+@router.get("/llm")
+async def llm_stats():
+    """
+    Selected LLM backend, in-flight/waiting calls against the concurrency
+    limits, primary/fallback routing (hedges, circuit breaker, timeouts)
+    and how many questions were coalesced into a running one.
+    """
+    return {
+        "backend": settings.LLM_BACKEND,
+        **llm_limiter.stats(),
+        "routing": llm_router.stats(),
+        "coalescing": question_flights.stats(),
+        "stream_coalescing": question_streams.stats(),
+    }
+
+
+@router.get("/answer-cache")
+async def answer_cache_stats():
+    """Hit/miss counters of the semantic answer cache (since process start)."""
+    return answer_cache.stats() if answer_cache is not None else {"enabled": False}
+
+
+@router.get("/rerank")
+async def rerank_stats():
+    """Cross-encoder rerank calls, scored pairs, score-cache hits and budget timeouts."""
+    return reranker.stats()
+
+
+@router.get("/conversation-memory")
+async def conversation_memory_stats():
+    """Conversation memory loads and background summary updates (since process start)."""
+    return conversation_memory.stats() if conversation_memory is not None else {"enabled": False}
+
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """
+    Connection pool of the shared engine: size, checked-out and overflow
+    connections, and how long checkouts waited for a connection.
+    """
+    return pool_stats()
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.service.model_registry import models
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests (models may still be loading)."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    200 once the models are loaded and warmed up (see MODEL_WARMUP_ON_STARTUP),
+    503 before that; per-model load / warm-up times either way.
+    """
+    status = models.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
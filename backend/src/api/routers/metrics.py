@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from api.service.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Hot-path histograms and counters of this worker in the Prometheus text
+    format: RAG stages (embed, answer cache, search, rerank, LLM time to
+    first token / total, persist, total), ingestion stages (extract, chunk,
+    embed, insert), LLM fallbacks and timeouts, rerank timeouts.
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
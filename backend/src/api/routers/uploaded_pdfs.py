@@ -1,13 +1,24 @@
 import uuid
+import asyncio
+import hashlib
 import logging
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+import re
+import unicodedata
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_201_CREATED
 
 from api.routers.dependencies import db_dependency
 from api.models.uploaded_pdf import UploadedPdfOut
-from api.database.table_models import UploadedPdf
-from api.service.rag import extract_text_from_pdf_bytes, chunk_text, store_chunks_in_db
+from api.models.ingestion_job import IngestionJobOut, IngestionStatus
+from api.database.table_models import UploadedPdf, IngestionJob
+from api.database.repository.ingestion_job import IngestionJobRepository
+from api.database.repository.uploaded_pdf import UploadedPdfRepository
+from api.service.blob_store import BlobNotFoundError, blob_store, pdf_blob_key
+from api.service.ingestion import ingestion_queue
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/uploadedPdfs", tags=["uploadedPdfs"])
@@ -28,9 +39,15 @@ async def upload_pdf(
     """
     Upload a PDF:
     1. Validate file type
-    2. Save metadata + content to DB
-    3. Extract text, split into chunks, store embeddings
-    4. Schedule background extraction of tools & parts
+    2. Hash the bytes and store them once per hash in the blob store
+    3. If the same PDF was already processed, save only metadata linked
+       to it (its chunks and embeddings are reused)
+    4. Otherwise save metadata + a queued ingestion job to DB and hand
+       the job to the background ingestion workers
+       (extract text, split into chunks, store embeddings)
+
+    Returns as soon as the PDF is committed; poll
+    GET /uploadedPdfs/{id}/status?user_id=... until the job is "ready".
     """
     try:
         # 1. Validate file
@@ -39,29 +56,39 @@ async def upload_pdf(
 
         # Read file into memory
         content_bytes = await file.read()
+        content_sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content_bytes).hexdigest())
+
+        # 2. Store the bytes once per content hash in the blob store
+        blob_key = pdf_blob_key(content_sha256)
+        if not await blob_store.exists(blob_key):
+            await blob_store.put(blob_key, content_bytes)
 
-        # 2. Save PDF into DB
+        # 3. Already processed? Link to the source document instead of re-ingesting
+        source_id = await UploadedPdfRepository(db=db).get_source_id_by_sha256(content_sha256)
         new_pdf = UploadedPdf(
             id=uuid.uuid4(),
             title=file.filename,
-            content=content_bytes,
+            blob_key=blob_key,
             file_size=len(content_bytes),
+            content_sha256=content_sha256,
+            source_document_id=source_id,
             user_id=uuid.UUID(user_id),
         )
-        db.add(new_pdf)
+        if source_id is not None:
+            db.add(new_pdf)
+            await db.commit()
+            await db.refresh(new_pdf)
+            logger.info(f"♻️ PDF {new_pdf.id} is a duplicate of {source_id}, reusing its chunks")
+            return UploadedPdfOut.model_validate(new_pdf)
+
+        # 4. Save metadata + a queued ingestion job into DB
+        job = IngestionJob(document_id=new_pdf.id, status=IngestionStatus.QUEUED.value, progress=0.0)
+        db.add_all([new_pdf, job])
         await db.commit()
         await db.refresh(new_pdf)
 
-        # 3. Extract text + chunks
-        pre_extracted_text = ""
-        try:
-            pre_extracted_text = extract_text_from_pdf_bytes(content_bytes)
-            if pre_extracted_text.strip():
-                chunks = chunk_text(pre_extracted_text)
-                await store_chunks_in_db(chunks, new_pdf.id, uuid.UUID(user_id), db)
-                logger.info(f"💾 Stored {len(chunks)} chunks for PDF {new_pdf.id}")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to process chunks for {new_pdf.id}: {e}")
+        # Extract text + chunks + embeddings in the background
+        ingestion_queue.enqueue(job.id)
 
         return UploadedPdfOut.model_validate(new_pdf)
 
@@ -70,3 +97,118 @@ async def upload_pdf(
     except Exception as e:
         logger.error(f"❌ Upload error: {e}")
         raise HTTPException(status_code=500, detail="Unexpected upload error")
+
+
+@router.get(
+    "/{document_id}/status",
+    operation_id="GetUploadedPdfStatus",
+    response_model=IngestionJobOut,
+)
+async def get_upload_status(
+    document_id: uuid.UUID,
+    user_id: uuid.UUID = Query(..., description="UUID of the owner of the PDF"),
+    db: AsyncSession = Depends(db_dependency),
+):
+    """
+    Ingestion status of an uploaded PDF owned by `user_id`:
+    queued → extracting → embedding → ready (or failed, with error).
+    Duplicates report the status of the upload whose chunks they share.
+    """
+    source_id = (await db.execute(
+        select(func.coalesce(UploadedPdf.source_document_id, UploadedPdf.id))
+        .where(UploadedPdf.id == document_id, UploadedPdf.user_id == user_id)
+    )).scalar_one_or_none()
+    if source_id is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    job = await IngestionJobRepository(db=db).get_first_by_field(
+        field_name="document_id", field_value=source_id
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="No ingestion job found for this document")
+    status = IngestionJobOut.model_validate(job)
+    status.document_id = document_id
+    return status
+
+
+def _content_disposition(title: str) -> str:
+    """
+    `inline` Content-Disposition for a user-chosen title (RFC 6266):
+    an ASCII fallback filename (quotes and control characters replaced)
+    plus the exact title as UTF-8 in filename*.
+    """
+    fallback = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode()
+    fallback = re.sub(r'["\\\x00-\x1f\x7f]', "_", fallback).strip()
+    if not re.search(r"[A-Za-z0-9]", fallback.rsplit(".", 1)[0]):  # e.g. a title in another script
+        fallback = "document.pdf"
+    return f"inline; filename=\"{fallback}\"; filename*=UTF-8''{quote(title, safe='')}"
+
+
+def _parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=start-end` range into inclusive offsets (None = whole file)."""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_s, _, end_s = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_s:  # suffix range: last N bytes
+            start, end = max(0, size - int(end_s)), size - 1
+        else:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get(
+    "/{document_id}/content",
+    operation_id="DownloadUploadedPdf",
+    response_class=StreamingResponse,
+)
+async def download_pdf(
+    document_id: uuid.UUID,
+    user_id: uuid.UUID = Query(..., description="UUID of the owner of the PDF"),
+    range_header: str | None = Header(None, alias="Range"),
+    db: AsyncSession = Depends(db_dependency),
+):
+    """
+    Stream the PDF file of an upload owned by `user_id`.
+    Supports single HTTP byte ranges (206 Partial Content) for
+    resumable downloads and page-wise PDF viewers.
+    """
+    row = (await db.execute(
+        select(UploadedPdf.title, UploadedPdf.blob_key)
+        .where(UploadedPdf.id == document_id, UploadedPdf.user_id == user_id)
+    )).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    title, blob_key = row
+    if not blob_key:
+        raise HTTPException(status_code=409, detail="Document content has not been migrated to the blob store yet")
+
+    try:
+        size = await blob_store.size(blob_key)
+    except BlobNotFoundError:
+        raise HTTPException(status_code=404, detail="Document content missing")
+
+    byte_range = _parse_range(range_header, size)
+    start, end = byte_range or (0, size - 1)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+        "Content-Disposition": _content_disposition(title),
+    }
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        blob_store.iter_range(blob_key, start, end),
+        status_code=206 if byte_range else 200,
+        media_type="application/pdf",
+        headers=headers,
+    )
@@ -0,0 +1,168 @@
+import uuid
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    id: uuid.UUID
+    question: str
+    answer: str
+    similarity: float
+
+
+# Nearest cached question of the same scope; `<=>` is cosine distance
+LOOKUP_SQL = text("""
+    SELECT id, question, answer, 1 - (question_embedding <=> (:embedding)::vector) AS similarity
+    FROM answer_cache
+    WHERE document_id = :document_id
+      AND user_level = :user_level
+      AND created_at > now() - make_interval(secs => :ttl_seconds)
+    ORDER BY question_embedding <=> (:embedding)::vector
+    LIMIT 1
+""")
+
+TOUCH_SQL = text("""
+    UPDATE answer_cache
+    SET hit_count = hit_count + 1, last_used_at = now()
+    WHERE id = :id
+""")
+
+INSERT_SQL = text("""
+    INSERT INTO answer_cache (id, document_id, user_level, question, question_embedding, answer, hit_count, created_at, last_used_at)
+    VALUES (:id, :document_id, :user_level, :question, (:embedding)::vector, :answer, 0, now(), now())
+""")
+
+# Expired entries of the document, plus everything of the scope past the
+# `max_entries` most recently used ones (LRU)
+EVICT_SQL = text("""
+    DELETE FROM answer_cache
+    WHERE (document_id = :document_id AND created_at <= now() - make_interval(secs => :ttl_seconds))
+       OR id IN (
+            SELECT id FROM answer_cache
+            WHERE document_id = :document_id AND user_level = :user_level
+            ORDER BY last_used_at DESC
+            OFFSET :max_entries
+       )
+""")
+
+
+class SemanticAnswerCache:
+    """
+    Persistent answer cache scoped to (source document, user level).
+
+    A question is a hit when the cosine similarity between its embedding and
+    the nearest cached question of the same scope reaches `threshold`.
+    Entries expire after `ttl_seconds`; each scope keeps at most
+    `max_entries`, evicting the least recently used. Cached answers of a
+    document are deleted by a database trigger whenever its chunks change.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def lookup(
+        self,
+        db: AsyncSession,
+        document_id: uuid.UUID,
+        user_level: str,
+        embedding_str: str,
+    ) -> Optional[CachedAnswer]:
+        """Cached answer for a question embedding, or None on a miss (or any cache error)."""
+        try:
+            row = (await db.execute(LOOKUP_SQL, {
+                "embedding": embedding_str,
+                "document_id": str(document_id),
+                "user_level": user_level,
+                "ttl_seconds": float(self.ttl_seconds),
+            })).first()
+            if row is None or row.similarity < self.threshold:
+                self._count("misses")
+                return None
+            await db.execute(TOUCH_SQL, {"id": row.id})
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            self._count("errors")
+            logger.warning(f"⚠️ Answer cache lookup failed: {e}")
+            return None
+
+        self._count("hits")
+        logger.info(f"♻️ Answer cache hit (similarity {row.similarity:.3f}) for document {document_id}")
+        return CachedAnswer(id=row.id, question=row.question, answer=row.answer, similarity=row.similarity)
+
+    async def store(
+        self,
+        db: AsyncSession,
+        document_id: uuid.UUID,
+        user_level: str,
+        question: str,
+        embedding_str: str,
+        answer: str,
+    ) -> None:
+        """Cache an answer and apply TTL/LRU eviction to its scope."""
+        try:
+            params = {
+                "document_id": str(document_id),
+                "user_level": user_level,
+                "ttl_seconds": float(self.ttl_seconds),
+            }
+            await db.execute(INSERT_SQL, {
+                **params,
+                "id": str(uuid.uuid4()),
+                "question": question,
+                "embedding": embedding_str,
+                "answer": answer,
+            })
+            await db.execute(EVICT_SQL, {**params, "max_entries": self.max_entries})
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            self._count("errors")
+            logger.warning(f"⚠️ Answer cache store failed: {e}")
+            return
+        self._count("stores")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries_per_scope": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
+
+
+answer_cache: Optional[SemanticAnswerCache] = (
+    SemanticAnswerCache(
+        threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES_PER_SCOPE,
+    )
+    if settings.ANSWER_CACHE_ENABLED else None
+)
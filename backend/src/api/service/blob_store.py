@@ -0,0 +1,267 @@
+import os
+import asyncio
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional, Protocol
+
+from api.config.core import settings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 256 * 1024
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when a blob key does not exist in the store."""
+
+
+def pdf_blob_key(content_sha256: str) -> str:
+    """Content-addressed key of a PDF: identical uploads share one blob."""
+    return f"pdfs/{content_sha256[:2]}/{content_sha256}.pdf"
+
+
+# ===================================
+# Blob Store Interface
+# ===================================
+class BlobStore(ABC):
+    """Async key → bytes storage for large binary objects (uploaded PDFs)."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def size(self, key: str) -> int:
+        """Size in bytes; raises BlobNotFoundError for unknown keys."""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end] (inclusive, like HTTP ranges; end=None → to the last byte)."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def get(self, key: str) -> bytes:
+        return b"".join([part async for part in self.iter_range(key)])
+
+
+# ===================================
+# Local Filesystem Backend
+# ===================================
+class LocalFileBlobStore(BlobStore):
+    """Blobs as files below `root`; writes are atomic (temp file + rename)."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def size(self, key: str) -> int:
+        try:
+            return (await asyncio.to_thread(self._path(key).stat)).st_size
+        except FileNotFoundError:
+            raise BlobNotFoundError(key)
+
+    async def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        try:
+            f = await asyncio.to_thread(open, self._path(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(key)
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                n = READ_CHUNK_BYTES if remaining is None else min(READ_CHUNK_BYTES, remaining)
+                data = await asyncio.to_thread(f.read, n)
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+        finally:
+            f.close()
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).exists)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, True)
+
+
+# ===================================
+# S3-Compatible Backend
+# ===================================
+class S3Client(Protocol):
+    """The subset of the boto3 S3 client API used by S3BlobStore."""
+
+    def put_object(self, *, Bucket: str, Key: str, Body: bytes) -> Any: ...
+    def get_object(self, *, Bucket: str, Key: str, Range: str = ...) -> dict: ...
+    def head_object(self, *, Bucket: str, Key: str) -> dict: ...
+    def delete_object(self, *, Bucket: str, Key: str) -> Any: ...
+
+
+class LocalS3Client:
+    """
+    Filesystem stand-in for an S3 client (buckets are directories below
+    `root`), so the S3 code path runs locally without a server.
+    """
+
+    class _NoSuchKey(Exception):
+        pass
+
+    def __init__(self, root: str):
+        self._stores: dict[str, LocalFileBlobStore] = {}
+        self.root = root
+
+    def _store(self, bucket: str) -> LocalFileBlobStore:
+        if bucket not in self._stores:
+            self._stores[bucket] = LocalFileBlobStore(os.path.join(self.root, bucket))
+        return self._stores[bucket]
+
+    def put_object(self, *, Bucket: str, Key: str, Body: bytes):
+        self._store(Bucket)._write(Key, Body)
+        return {}
+
+    def get_object(self, *, Bucket: str, Key: str, Range: Optional[str] = None) -> dict:
+        path = self._store(Bucket)._path(Key)
+        if not path.exists():
+            raise self._NoSuchKey(Key)
+        with open(path, "rb") as f:
+            if Range:
+                start, _, end = Range.removeprefix("bytes=").partition("-")
+                f.seek(int(start))
+                data = f.read(int(end) - int(start) + 1) if end else f.read()
+            else:
+                data = f.read()
+
+        class _Body:
+            def __init__(self, data: bytes):
+                self._data, self._pos = data, 0
+
+            def read(self, n: int = -1) -> bytes:
+                chunk = self._data[self._pos:] if n < 0 else self._data[self._pos:self._pos + n]
+                self._pos += len(chunk)
+                return chunk
+
+            def close(self):
+                pass
+
+        return {"Body": _Body(data), "ContentLength": len(data)}
+
+    def head_object(self, *, Bucket: str, Key: str) -> dict:
+        path = self._store(Bucket)._path(Key)
+        if not path.exists():
+            raise self._NoSuchKey(Key)
+        return {"ContentLength": path.stat().st_size}
+
+    def delete_object(self, *, Bucket: str, Key: str):
+        self._store(Bucket)._path(Key).unlink(missing_ok=True)
+        return {}
+
+
+class S3BlobStore(BlobStore):
+    """Blobs in an S3-compatible bucket (AWS, MinIO, ...) through any S3Client."""
+
+    def __init__(self, client: S3Client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    @staticmethod
+    def _is_missing(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound") or type(error).__name__ in ("NoSuchKey", "_NoSuchKey")
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=key, Body=data)
+
+    async def size(self, key: str) -> int:
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if self._is_missing(e):
+                raise BlobNotFoundError(key)
+            raise
+        return int(head["ContentLength"])
+
+    async def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        try:
+            response = await asyncio.to_thread(
+                self.client.get_object, Bucket=self.bucket, Key=key, Range=byte_range
+            )
+        except Exception as e:
+            if self._is_missing(e):
+                raise BlobNotFoundError(key)
+            raise
+        body = response["Body"]
+        try:
+            while True:
+                data = await asyncio.to_thread(body.read, READ_CHUNK_BYTES)
+                if not data:
+                    break
+                yield data
+        finally:
+            body.close()
+
+    async def exists(self, key: str) -> bool:
+        try:
+            await self.size(key)
+            return True
+        except BlobNotFoundError:
+            return False
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+
+# ===================================
+# Factory
+# ===================================
+def create_blob_store() -> BlobStore:
+    """Blob store selected by BLOB_STORE_BACKEND ("local", "s3" or "s3-local")."""
+    backend = settings.BLOB_STORE_BACKEND
+    if backend == "local":
+        return LocalFileBlobStore(settings.BLOB_STORE_LOCAL_ROOT)
+    if backend == "s3-local":
+        return S3BlobStore(LocalS3Client(settings.BLOB_STORE_LOCAL_ROOT), settings.BLOB_STORE_S3_BUCKET)
+    if backend == "s3":
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("BLOB_STORE_BACKEND=s3 requires boto3 (pip install boto3)")
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.BLOB_STORE_S3_ENDPOINT_URL,
+            region_name=settings.BLOB_STORE_S3_REGION,
+        )
+        return S3BlobStore(client, settings.BLOB_STORE_S3_BUCKET)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {backend}")
+
+
+blob_store = create_blob_store()
@@ -0,0 +1,157 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+# ===================================
+# Boundary Patterns
+# ===================================
+# Numbered steps and bullets: "1.", "2)", "a)", "Step 3:", "Schritt 4", "•", "-"
+_STEP_RE = re.compile(r"^\s*(?:\d{1,3}[.)]|[a-z][)]|(?:step|schritt)\s+\d+[.:)]?|[•▪●■◦*–-])\s+", re.IGNORECASE)
+# Multi-level section numbers ("3.2 Drain pump") or chapter words
+_SECTION_RE = re.compile(r"^\s*(?:\d+(?:\.\d+)+\.?\s+\S|(?:kapitel|chapter|abschnitt|section)\s+\d+)", re.IGNORECASE)
+_SENTENCE_RE = re.compile(r".+?(?:[.!?](?=\s)|$)\s*", re.DOTALL)
+_WORD_RE = re.compile(r"\S+\s*")
+
+MAX_HEADING_CHARS = 80
+
+
+@dataclass(frozen=True)
+class TextChunk:
+    """A chunk of document text plus where it came from."""
+    content: str
+    ordinal: int  # position of the chunk inside the document (0-based)
+    page_number: int  # page the chunk starts on (1-based)
+    char_start: int  # offsets into the concatenated page texts
+    char_end: int
+
+
+@dataclass(frozen=True)
+class _Unit:
+    text: str
+    start: int
+    page_number: int
+    heading: bool = False
+
+
+def _approximate_tokens(text: str) -> int:
+    return len(text.split())
+
+
+def _is_heading(line: str) -> bool:
+    s = line.strip()
+    if not s or len(s) > MAX_HEADING_CHARS or s[-1] in ".,;:!?":
+        return False
+    if _SECTION_RE.match(s):
+        return True
+    return s.isupper() and any(c.isalpha() for c in s)
+
+
+def _iter_blocks(page_text: str, base: int, page_number: int) -> Iterator[_Unit]:
+    """
+    Group the lines of one page into blocks: paragraphs, headings and
+    numbered steps. Blocks tile the page text, so offsets stay exact.
+    """
+    block_start = 0
+    block_heading = False
+    pending_break = False
+    pos = 0
+    for line in page_text.splitlines(keepends=True):
+        stripped = line.strip()
+        if not stripped:
+            pending_break = True
+        else:
+            heading = _is_heading(line)
+            if pos > block_start and (pending_break or heading or block_heading or _STEP_RE.match(line)):
+                yield _Unit(page_text[block_start:pos], base + block_start, page_number, block_heading)
+                block_start = pos
+            block_heading = heading
+            pending_break = False
+        pos += len(line)
+    if pos > block_start:
+        yield _Unit(page_text[block_start:pos], base + block_start, page_number, block_heading)
+
+
+def _split_unit(unit: _Unit, max_tokens: int, count: TokenCounter) -> Iterator[_Unit]:
+    """Split an oversized block at sentence ends, and over-long sentences at words."""
+    for m in _SENTENCE_RE.finditer(unit.text):
+        sentence = _Unit(m.group(), unit.start + m.start(), unit.page_number)
+        if count(sentence.text) <= max_tokens:
+            yield sentence
+            continue
+        piece_start, piece_end, tokens = None, None, 0
+        for w in _WORD_RE.finditer(sentence.text):
+            word_tokens = count(w.group())
+            if piece_start is not None and tokens + word_tokens > max_tokens:
+                yield _Unit(sentence.text[piece_start:piece_end], sentence.start + piece_start, unit.page_number)
+                piece_start, tokens = None, 0
+            if piece_start is None:
+                piece_start = w.start()
+            piece_end = w.end()
+            tokens += word_tokens
+        if piece_start is not None:
+            yield _Unit(sentence.text[piece_start:piece_end], sentence.start + piece_start, unit.page_number)
+
+
+def iter_chunks(
+    pages: Iterable[str],
+    max_tokens: int = 200,
+    min_tokens: int = 32,
+    token_counter: Optional[TokenCounter] = None,
+) -> Iterator[TextChunk]:
+    """
+    Lazily split page-indexed text into structure-aware chunks.
+
+    - Paragraphs, numbered steps and sentences are never cut in half
+      (only a single sentence longer than `max_tokens` is split at words).
+    - A heading starts a new chunk once the current one holds `min_tokens`.
+    - Sizes are measured with `token_counter` (the embedding tokenizer),
+      falling back to a whitespace word count.
+    - No overlap: boundaries already keep related text together.
+    """
+    count = token_counter or _approximate_tokens
+    ordinal = 0
+    parts: List[_Unit] = []
+    tokens = 0
+
+    def flush() -> Optional[TextChunk]:
+        raw = "".join(u.text for u in parts)
+        content = raw.strip()
+        if not content:
+            return None
+        lead = len(raw) - len(raw.lstrip())
+        start = parts[0].start + lead
+        end = parts[-1].start + len(parts[-1].text) - (len(raw) - len(raw.rstrip()))
+        return TextChunk(content, ordinal, parts[0].page_number, start, end)
+
+    offset = 0
+    for page_index, page_text in enumerate(pages):
+        for block in _iter_blocks(page_text, offset, page_index + 1):
+            if not block.text.strip():
+                # Blank lines opening a page: part of the chunk in progress, so its
+                # offsets stay contiguous and the paragraph break is kept
+                if parts:
+                    parts.append(block)
+                continue
+            block_tokens = count(block.text)
+            units = [block] if block_tokens <= max_tokens else list(_split_unit(block, max_tokens, count))
+            for unit in units:
+                unit_tokens = block_tokens if unit is block else count(unit.text)
+                if parts and (tokens + unit_tokens > max_tokens or (unit.heading and tokens >= min_tokens)):
+                    chunk = flush()
+                    if chunk:
+                        yield chunk
+                        ordinal += 1
+                    parts, tokens = [], 0
+                parts.append(unit)
+                tokens += unit_tokens
+        offset += len(page_text)
+
+    if parts:
+        chunk = flush()
+        if chunk:
+            yield chunk
@@ -0,0 +1,154 @@
+import uuid
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievedChunk:
+    """One retrieval candidate: a chunk of the document plus its search metadata."""
+    id: uuid.UUID
+    content: str
+    embedding: Optional[np.ndarray] = None
+    ordinal: Optional[int] = None
+    page_number: Optional[int] = None
+    distance: Optional[float] = None  # L2 distance to the question (vector search)
+    score: Optional[float] = None  # Stage-specific relevance (fusion / rerank), higher is better
+    rerank_score: Optional[float] = None  # Cross-encoder score, set by the reranker
+
+
+def parse_vector(value) -> np.ndarray:
+    """pgvector value as returned without a codec ("[0.1,0.2,...]") or already decoded."""
+    if isinstance(value, str):
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+# ===================================
+# Overlap Removal
+# ===================================
+def _overlap(left: str, right: str, min_chars: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if shorter than min_chars)."""
+    if len(left) < min_chars or len(right) < min_chars:
+        return 0
+    probe = right[:min_chars]
+    start = left.find(probe, max(0, len(left) - len(right)))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def remove_overlap(text: str, packed: Sequence[str], min_chars: int) -> str:
+    """
+    Strip from `text` what already-packed chunks contain: a prefix that
+    repeats the end of a packed chunk, a suffix that repeats its start
+    (chunk_text's sliding window), or the whole text when it is contained
+    in a packed chunk.
+    """
+    for other in packed:
+        if text in other:
+            return ""
+        head = _overlap(other, text, min_chars)
+        if head:
+            text = text[head:]
+        tail = _overlap(text, other, min_chars)
+        if tail:
+            text = text[:-tail]
+    return text.strip()
+
+
+# ===================================
+# Maximal Marginal Relevance
+# ===================================
+def mmr_order(
+    query_embedding: np.ndarray,
+    chunks: Sequence[RetrievedChunk],
+    lambda_mult: float = 0.7,
+) -> List[RetrievedChunk]:
+    """
+    Order chunks by Maximal Marginal Relevance: each pick maximises
+    λ·relevance(chunk) − (1−λ)·max sim(chunk, already picked),
+    so near-duplicates of picked chunks sink to the end.
+
+    Relevance is the cross-encoder score when every chunk was reranked
+    (min-max scaled to [0, 1], like the cosine range it replaces), else
+    the bi-encoder similarity to the question.
+    """
+    with_vectors = [c for c in chunks if c.embedding is not None]
+    if len(with_vectors) < 2:
+        return list(chunks)
+
+    vectors = np.stack([c.embedding for c in with_vectors])
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+    if all(c.rerank_score is not None for c in with_vectors):
+        scores = np.array([c.rerank_score for c in with_vectors], dtype=np.float32)
+        relevance = (scores - scores.min()) / max(float(scores.max() - scores.min()), 1e-12)
+    else:
+        relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+
+    selected: List[int] = []
+    remaining = list(range(len(with_vectors)))
+    max_sim_to_selected = np.full(len(with_vectors), -np.inf)
+    while remaining:
+        if selected:
+            scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * max_sim_to_selected[remaining]
+        else:
+            scores = relevance[remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        selected.append(best)
+        max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise[best])
+
+    ordered = [with_vectors[i] for i in selected]
+    return ordered + [c for c in chunks if c.embedding is None]
+
+
+# ===================================
+# Token-Budgeted Packing
+# ===================================
+def pack_context(
+    query_embedding: np.ndarray,
+    candidates: Sequence[RetrievedChunk],
+    max_tokens: int,
+    count_tokens: Callable[[str], int],
+    lambda_mult: float = 0.7,
+    min_overlap_chars: int = 30,
+    min_chunk_tokens: int = 8,
+    separator: str = "\n\n",
+) -> List[str]:
+    """
+    Context assembly: MMR-ordered candidates, overlap removed, greedily
+    packed while they fit into `max_tokens` (prompt-model tokens).
+    A chunk that does not fit is skipped, so a smaller later one can still
+    use the rest of the budget. The packed pieces are returned in document
+    order (by ordinal) when every chunk has one, otherwise in MMR order.
+    """
+    separator_tokens = count_tokens(separator) if separator.strip() else 0
+    budget = max_tokens
+    packed: List[tuple[RetrievedChunk, str]] = []
+
+    for chunk in mmr_order(query_embedding, candidates, lambda_mult):
+        text = remove_overlap(chunk.content, [t for _, t in packed], min_overlap_chars)
+        if not text:
+            continue
+        tokens = count_tokens(text) + (separator_tokens if packed else 0)
+        if tokens < min_chunk_tokens or tokens > budget:
+            continue
+        packed.append((chunk, text))
+        budget -= tokens
+        if budget < min_chunk_tokens:
+            break
+
+    if packed and all(chunk.ordinal is not None for chunk, _ in packed):
+        packed.sort(key=lambda item: item[0].ordinal)
+    logger.info(
+        f"📦 Packed {len(packed)}/{len(candidates)} chunks into {max_tokens - budget}/{max_tokens} prompt tokens"
+    )
+    return [text for _, text in packed]
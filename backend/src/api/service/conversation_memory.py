@@ -0,0 +1,268 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.config.core import settings
+from api.database.repository.chat_message import ChatMessageRepository
+from api.database.table_models import ChatMessage
+from api.config.db import async_session_maker
+from api.service.llm_backend import get_llm_backend
+from api.service.user_level import strip_user_level
+
+logger = logging.getLogger(__name__)
+
+ConversationKey = Tuple[uuid.UUID, uuid.UUID]  # (user_id, document_id)
+
+
+LOAD_SUMMARY_SQL = text("""
+    SELECT summary, summarized_until, summarized_until_id
+    FROM conversation_summaries
+    WHERE user_id = :user_id AND document_id = :document_id
+""")
+
+# Only moves forward: a slower concurrent update (another worker) cannot
+# overwrite a summary that already covers more of the conversation
+UPSERT_SUMMARY_SQL = text("""
+    INSERT INTO conversation_summaries
+        (id, user_id, document_id, summary, summarized_until, summarized_until_id, summarized_messages, updated_at)
+    VALUES (:id, :user_id, :document_id, :summary, :summarized_until, :summarized_until_id, :summarized_messages, now())
+    ON CONFLICT (user_id, document_id) DO UPDATE
+    SET summary = EXCLUDED.summary,
+        summarized_until = EXCLUDED.summarized_until,
+        summarized_until_id = EXCLUDED.summarized_until_id,
+        summarized_messages = conversation_summaries.summarized_messages + EXCLUDED.summarized_messages,
+        updated_at = now()
+    WHERE (conversation_summaries.summarized_until, conversation_summaries.summarized_until_id)
+          < (EXCLUDED.summarized_until, EXCLUDED.summarized_until_id)
+""")
+
+SUMMARY_PROMPT = """Update the running summary of a repair chat between a user and an assistant about a manual.
+Keep what matters for follow-up questions: the device and model, symptoms, steps already tried,
+tools and parts mentioned, open questions and decisions. Drop greetings and repetition.
+Reply with the updated summary only, at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+class ConversationMemory:
+    """
+    Bounded conversation context per (user, document) for follow-up questions.
+
+    The prompt component is the last `recent_turns` question/answer pairs
+    verbatim (each message cut to `turn_max_tokens`), the messages that
+    left that window but are not summarized yet (each cut to a quarter of
+    that), and a rolling summary of everything older (cut to
+    `summary_max_tokens`), so its size does not grow with the conversation.
+
+    The summary lives in conversation_summaries together with the position
+    (created_at, id) of the last message folded into it. After an answer
+    `schedule_update` checks in the background whether `batch_messages`
+    messages have left the verbatim window since, and only then folds them
+    into the summary with one LLM call; at most one update per
+    conversation runs at a time, with at most one more pending.
+
+    Only an active conversation is loaded: its last message must be less
+    than `active_seconds` old. A new conversation, or one the user comes
+    back to later, is answered without memory, so its questions stay
+    shareable through the answer cache and in-flight coalescing.
+    """
+
+    def __init__(
+        self,
+        truncate: Callable[[str, int], str],
+        recent_turns: int = 3,
+        turn_max_tokens: int = 200,
+        summary_max_tokens: int = 300,
+        batch_messages: int = 20,
+        budget_seconds: float = 60.0,
+        model: str = "",
+        active_seconds: float = 1800.0,
+    ):
+        self.truncate = truncate
+        self.recent_turns = recent_turns
+        self.turn_max_tokens = turn_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.batch_messages = batch_messages
+        self.budget_seconds = budget_seconds
+        self.model = model or settings.LLM_FALLBACK_MODEL
+        self.active_seconds = active_seconds
+        self._tasks: Dict[ConversationKey, asyncio.Task] = {}
+        self._pending: Set[ConversationKey] = set()
+        self.loads = 0
+        self.inactive = 0
+        self.updates = 0
+        self.folded_messages = 0
+        self.errors = 0
+        self.summary_seconds = 0.0
+
+    # ===================================
+    # Prompt Component
+    # ===================================
+    def _format_messages(self, messages: Sequence[ChatMessage], max_tokens: Optional[int] = None) -> str:
+        max_tokens = max_tokens or self.turn_max_tokens
+        lines = []
+        for msg in messages:
+            if msg.role == "assistant":
+                if msg.message.startswith("⚠️"):
+                    continue  # timeouts / errors carry nothing worth remembering
+                lines.append(f"Assistant: {self.truncate(msg.message, max_tokens)}")
+            else:
+                lines.append(f"User: {self.truncate(strip_user_level(msg.message), max_tokens)}")
+        return "\n".join(lines)
+
+    async def load(self, db: AsyncSession, user_id: uuid.UUID, document_id: uuid.UUID) -> str:
+        """
+        Summary + not yet summarized + last turns of the conversation about
+        this document ("" for a new or inactive one).
+        """
+        self.loads += 1
+        window = 2 * self.recent_turns
+        newest = await ChatMessageRepository(db).get_page(
+            user_id, document_id, limit=window + self.batch_messages, descending=True
+        )
+        if not newest or datetime.now(timezone.utc) - newest[0].created_at > timedelta(seconds=self.active_seconds):
+            self.inactive += 1
+            return ""
+        row = (await db.execute(LOAD_SUMMARY_SQL, {"user_id": user_id, "document_id": document_id})).first()
+        summary = row.summary if row is not None else ""
+        if row is not None and row.summarized_until is not None:
+            until = (row.summarized_until, row.summarized_until_id)
+            newest = [msg for msg in newest if (msg.created_at, msg.id) > until]
+        recent = list(reversed(newest[:window]))
+        unsummarized = list(reversed(newest[window:]))
+        # Truncating runs the prompt tokenizer (CPU work): keep it off the event loop
+        return await asyncio.to_thread(self._render, summary, unsummarized, recent)
+
+    def _render(self, summary: str, unsummarized: Sequence[ChatMessage], recent: Sequence[ChatMessage]) -> str:
+        parts = []
+        if summary:
+            parts.append("Summary of the earlier conversation:\n" + self.truncate(summary, self.summary_max_tokens))
+        earlier = self._format_messages(unsummarized, max(1, self.turn_max_tokens // 4))
+        if earlier:
+            parts.append("Earlier messages:\n" + earlier)
+        turns = self._format_messages(recent)
+        if turns:
+            parts.append("Recent messages:\n" + turns)
+        return "\n\n".join(parts)
+
+    # ===================================
+    # Background Summary Update
+    # ===================================
+    async def _fold(self, summary: str, messages: Sequence[ChatMessage]) -> str:
+        # Formatting and truncating run the prompt tokenizer: off the event loop, like load()
+        formatted = await asyncio.to_thread(self._format_messages, messages)
+        prompt = SUMMARY_PROMPT.format(
+            # ~0.75 words per token keeps the reply near the token cap
+            max_words=int(self.summary_max_tokens * 0.75),
+            summary=summary or "(none yet)",
+            messages=formatted or "(nothing relevant)",
+        )
+        start = time.perf_counter()
+        # Straight to the backend, not through llm_router: background summaries
+        # must not feed the hedge latency tracker or the circuit breaker
+        new_summary = await asyncio.wait_for(get_llm_backend().complete(self.model, prompt), self.budget_seconds)
+        self.summary_seconds += time.perf_counter() - start
+        new_summary = new_summary.replace("<end_of_turn>", "").strip()
+        if not new_summary:
+            return summary
+        return await asyncio.to_thread(self.truncate, new_summary, self.summary_max_tokens)
+
+    async def _update(self, user_id: uuid.UUID, document_id: uuid.UUID) -> None:
+        """Fold the next `batch_messages` messages older than the verbatim window into the summary, once there are that many."""
+        async with async_session_maker() as db:
+            repository = ChatMessageRepository(db)
+            recent = await repository.get_page(
+                user_id, document_id, limit=2 * self.recent_turns, descending=True
+            )
+            if len(recent) < 2 * self.recent_turns:
+                return  # the whole conversation is still sent verbatim
+            window_start = (recent[-1].created_at, recent[-1].id)
+
+            row = (await db.execute(LOAD_SUMMARY_SQL, {"user_id": user_id, "document_id": document_id})).first()
+            summary = row.summary if row is not None else ""
+            after = (row.summarized_until, row.summarized_until_id) if row is not None else None
+
+            older: List[ChatMessage] = [
+                msg for msg in await repository.get_page(user_id, document_id, after, limit=self.batch_messages)
+                if (msg.created_at, msg.id) < window_start
+            ]
+            if len(older) < self.batch_messages:
+                return  # not worth an LLM call yet; load() still sends them (shortened)
+            # The LLM call can take a while: don't hold a pooled connection for it
+            await db.commit()
+
+            summary = await self._fold(summary, older)
+            await db.execute(UPSERT_SUMMARY_SQL, {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "document_id": document_id,
+                "summary": summary,
+                "summarized_until": older[-1].created_at,
+                "summarized_until_id": older[-1].id,
+                "summarized_messages": len(older),
+            })
+            await db.commit()
+        self.updates += 1
+        self.folded_messages += len(older)
+        logger.info(f"🧠 Folded {len(older)} messages into the conversation summary of document {document_id}")
+
+    async def _run(self, key: ConversationKey) -> None:
+        try:
+            await self._update(*key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Conversation summary update failed for document {key[1]}: {e}")
+
+    def schedule_update(self, user_id: uuid.UUID, document_id: uuid.UUID) -> None:
+        """Update the summary in the background; coalesced with an update of the same conversation already running."""
+        key = (user_id, document_id)
+        if key in self._tasks:
+            self._pending.add(key)  # run once more when the current update is done
+            return
+        task = asyncio.get_running_loop().create_task(self._run(key))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._finished(key))
+
+    def _finished(self, key: ConversationKey) -> None:
+        self._tasks.pop(key, None)
+        if key in self._pending:
+            self._pending.discard(key)
+            self.schedule_update(*key)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "recent_turns": self.recent_turns,
+            "turn_max_tokens": self.turn_max_tokens,
+            "summary_max_tokens": self.summary_max_tokens,
+            "active_seconds": self.active_seconds,
+            "loads": self.loads,
+            "inactive": self.inactive,
+            "updates": self.updates,
+            "folded_messages": self.folded_messages,
+            "errors": self.errors,
+            "updates_running": len(self._tasks),
+            "summary_seconds_total": round(self.summary_seconds, 4),
+        }
+
+    async def close(self) -> None:
+        """Cancel running updates (shutdown); the next answer picks the work up again."""
+        self._pending.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+
+
+@dataclass
+class BatchStats:
+    """Counters describing how well concurrent encode requests are coalesced."""
+    requests: int = 0
+    batches: int = 0
+    max_batch_size: int = 0
+    encode_seconds: float = 0.0
+    # batch_size -> number of batches of that size
+    size_histogram: dict[int, int] = field(default_factory=dict)
+
+    def as_dict(self, max_batch_size: int) -> dict:
+        mean = self.requests / self.batches if self.batches else 0.0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(mean, 3),
+            "mean_batch_fill": round(mean / max_batch_size, 3) if max_batch_size else 0.0,
+            "largest_batch": self.max_batch_size,
+            "encode_seconds_total": round(self.encode_seconds, 4),
+            "batch_size_histogram": dict(sorted(self.size_histogram.items())),
+        }
+
+
+class BatchingEmbedder:
+    """
+    Micro-batching front end for a synchronous encoder.
+
+    Concurrent `encode()` calls are collected for up to `max_wait_ms`
+    (or until `max_batch_size` texts are waiting), encoded as one batch on a
+    single dedicated thread, and each caller's future is resolved with its
+    own copy of its row. The event loop never runs the model itself.
+    """
+
+    def __init__(self, encode_fn: EncodeFn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._executor = self._executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+            self._collector = asyncio.create_task(self._collect(), name="embedding-batcher")
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Embed one text; resolves once the batch it joined is encoded."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def encode_many(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return list(await asyncio.gather(*(self.encode(t) for t in texts)))
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Skip callers that gave up (cancelled) while waiting
+            batch = [(text, fut) for text, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_batch, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), vector in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vector)
+
+    def _encode_batch(self, texts: List[str]) -> List[np.ndarray]:
+        start = time.perf_counter()
+        # One array per caller: a row view would keep the whole batch alive
+        # for as long as any caller (or the query embedding cache) holds it
+        vectors = [row.copy() for row in self.encode_fn(texts)]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            size = len(texts)
+            self.stats.requests += size
+            self.stats.batches += 1
+            self.stats.max_batch_size = max(self.stats.max_batch_size, size)
+            self.stats.encode_seconds += elapsed
+            self.stats.size_histogram[size] = self.stats.size_histogram.get(size, 0) + 1
+        return vectors
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                **self.stats.as_dict(self.max_batch_size),
+            }
+
+    async def stop(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,273 @@
+"""
+Embedding sidecar: one process that owns the embedding model and serves
+every API worker over a Unix socket (EMBEDDING_SIDECAR_SOCKET).
+
+Workers then hold only a tokenizer and a socket instead of their own copy
+of the model and torch runtime, and concurrent requests of all workers are
+encoded together by the sidecar's BatchingEmbedder.
+
+Run it next to the API (from backend/, same settings / .env):
+    PYTHONPATH=src poetry run python -m api.service.embedding_sidecar
+
+Protocol (integers unsigned big-endian, vectors float32 little-endian),
+one request at a time per connection:
+    request:  count:u32, then count × (length:u32, UTF-8 bytes)
+    response: status:u8
+              status 0: rows:u32, dim:u32, rows × dim float32
+              status 1: length:u32, UTF-8 error message
+"""
+import os
+import time
+import socket
+import struct
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Set, Union
+
+import numpy as np
+
+from api.config.core import settings
+from api.service.embedding import BatchingEmbedder
+
+logger = logging.getLogger(__name__)
+
+_U32 = struct.Struct(">I")
+_SHAPE = struct.Struct(">II")
+STATUS_OK = 0
+STATUS_ERROR = 1
+MAX_TEXTS = 4096  # per request
+MAX_TEXT_BYTES = 1 << 20
+
+
+class SidecarError(RuntimeError):
+    """The sidecar answered with an error, or the connection broke mid-request."""
+
+
+# ===================================
+# Wire Format
+# ===================================
+def encode_request(texts: List[str]) -> bytes:
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def encode_vectors(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    rows, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+    return bytes([STATUS_OK]) + _SHAPE.pack(rows, dim) + vectors.tobytes()
+
+
+def encode_error(message: str) -> bytes:
+    data = message.encode("utf-8")
+    return bytes([STATUS_ERROR]) + _U32.pack(len(data)) + data
+
+
+# ===================================
+# Server
+# ===================================
+class EmbeddingSidecarServer:
+    """Unix-socket front end of a BatchingEmbedder; every text of every request joins the shared batches."""
+
+    def __init__(self, socket_path: str, embedder: BatchingEmbedder):
+        self.socket_path = socket_path
+        self.embedder = embedder
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self.requests = 0
+        self.errors = 0
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> List[str]:
+        (count,) = _U32.unpack(await reader.readexactly(_U32.size))
+        if count > MAX_TEXTS:
+            raise SidecarError(f"Too many texts in one request ({count} > {MAX_TEXTS})")
+        texts = []
+        for _ in range(count):
+            (length,) = _U32.unpack(await reader.readexactly(_U32.size))
+            if length > MAX_TEXT_BYTES:
+                raise SidecarError(f"Text too long ({length} bytes)")
+            texts.append((await reader.readexactly(length)).decode("utf-8"))
+        return texts
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    texts = await self._read_request(reader)
+                except asyncio.IncompleteReadError:
+                    return  # client closed the connection
+                except SidecarError as e:
+                    # The stream position is lost: answer, then drop the connection
+                    self.errors += 1
+                    writer.write(encode_error(str(e)))
+                    await writer.drain()
+                    return
+                self.requests += 1
+                try:
+                    vectors = await self.embedder.encode_many(texts) if texts else []
+                    writer.write(encode_vectors(np.stack(vectors) if vectors else np.zeros((0, 0))))
+                except Exception as e:
+                    self.errors += 1
+                    logger.exception(f"❌ Sidecar encode failed: {e}")
+                    writer.write(encode_error(str(e)))
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # stale socket of a previous run
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"🔌 Embedding sidecar listening on {self.socket_path}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()  # clients see EOF and reconnect to the next sidecar
+            await self._server.wait_closed()
+            self._server = None
+        await self.embedder.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# ===================================
+# Client
+# ===================================
+class SidecarEncoder:
+    """
+    Stand-in for the embedding model inside an API worker: `encode` has the
+    SentenceTransformer signature but sends the texts to the sidecar.
+    Blocking, like the model it replaces (called from worker threads); each
+    thread keeps its own connection and reconnects once if the sidecar restarted.
+    Only the tokenizer (for token counting) is loaded locally.
+    """
+
+    def __init__(self, socket_path: str, tokenizer_id: str, timeout: float = 30.0):
+        from transformers import AutoTokenizer
+
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_id, token=settings.HUGGINGFACE_HUB_TOKEN)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.reconnects = 0
+        self.request_seconds = 0.0
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+        buffer = bytearray(n)
+        view = memoryview(buffer)
+        received = 0
+        while received < n:
+            count = sock.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionResetError("Embedding sidecar closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def _request(self, payload: bytes) -> np.ndarray:
+        sock = self._connection()
+        sock.sendall(payload)
+        status = self._recv_exactly(sock, 1)[0]
+        if status != STATUS_OK:
+            (length,) = _U32.unpack(self._recv_exactly(sock, _U32.size))
+            raise SidecarError(self._recv_exactly(sock, length).decode("utf-8"))
+        rows, dim = _SHAPE.unpack(self._recv_exactly(sock, _SHAPE.size))
+        data = self._recv_exactly(sock, rows * dim * 4)
+        return np.frombuffer(data, dtype="<f4").reshape(rows, dim).astype(np.float32, copy=False)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: Optional[int] = None,
+        show_progress_bar: bool = False,
+        **_,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        payload = encode_request(texts)
+        start = time.perf_counter()
+        try:
+            vectors = self._request(payload)
+        except (SidecarError, socket.timeout):
+            self._close()  # the rest of the response may still arrive: never reuse this connection
+            raise
+        except OSError:
+            # Stale connection (sidecar restarted): one retry on a fresh one
+            self._close()
+            with self._lock:
+                self.reconnects += 1
+            vectors = self._request(payload)
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += time.perf_counter() - start
+        return vectors[0] if single else vectors
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "socket": self.socket_path,
+                "requests": self.requests,
+                "reconnects": self.reconnects,
+                "request_seconds_total": round(self.request_seconds, 4),
+            }
+
+
+# ===================================
+# Entry Point
+# ===================================
+async def serve() -> None:
+    from api.service.model_registry import load_local_embedding_model
+
+    model = load_local_embedding_model()
+    model.encode(["warm-up"], show_progress_bar=False)
+    embedder = BatchingEmbedder(
+        lambda texts: model.encode(texts, batch_size=len(texts), show_progress_bar=False),
+        max_batch_size=settings.EMBEDDING_SIDECAR_MAX_BATCH_SIZE,
+        max_wait_ms=settings.EMBEDDING_SIDECAR_MAX_WAIT_MS,
+    )
+    server = EmbeddingSidecarServer(settings.EMBEDDING_SIDECAR_SOCKET, embedder)
+    await server.start()
+    try:
+        while True:
+            await asyncio.sleep(60)
+            logger.info(f"📦 Sidecar: {server.requests} requests, {len(server._writers)} connections, {embedder.snapshot()}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[ %(levelname)s ] %(asctime)s %(name)s %(message)s")
+    if not settings.EMBEDDING_SIDECAR_SOCKET:
+        raise SystemExit("Set EMBEDDING_SIDECAR_SOCKET to the socket path the sidecar should listen on")
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
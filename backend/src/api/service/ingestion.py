@@ -0,0 +1,237 @@
+import uuid
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import delete, select, text
+
+from api.config.core import settings
+from api.database.repository.ingestion_job import IngestionJobRepository
+from api.database.table_models import DocumentChunk, IngestionJob, UploadedPdf
+from api.models.ingestion_job import IngestionStatus
+from api.config.db import async_session_maker
+from api.service.blob_store import blob_store
+from api.service.chunking import TextChunk, iter_chunks
+from api.service.metrics import INGEST_EXTRACT
+from api.service.pdf_extraction import pdf_extractor
+from api.service.rag import count_tokens, store_chunks_in_db
+
+logger = logging.getLogger(__name__)
+
+# Share of the progress bar reserved for extraction + chunking;
+# the rest is filled while embedding batches are stored.
+EXTRACTION_PROGRESS = 0.1
+EMBEDDING_PROGRESS = 0.95
+
+# Oldest pending job, locked so no other worker (of any process) takes it too.
+# A job still "extracting"/"embedding" without a heartbeat for stale_seconds
+# belonged to a process that died (restart, deploy, crash) and is taken over.
+CLAIM_JOB_SQL = text("""
+    UPDATE ingestion_jobs
+    SET status = :claimed_status, progress = 0, error = NULL, updated_at = now()
+    WHERE id = (
+        SELECT id FROM ingestion_jobs
+        WHERE status = :queued_status
+           OR (status IN (:extracting_status, :embedding_status)
+               AND updated_at < now() - make_interval(secs => :stale_seconds))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id
+""")
+
+HEARTBEAT_SQL = text("UPDATE ingestion_jobs SET updated_at = now() WHERE id = :id")
+
+# Jobs interrupted by a shutdown go straight back to the queue
+REQUEUE_SQL = text("""
+    UPDATE ingestion_jobs SET status = :queued_status, progress = 0
+    WHERE id = ANY(:ids) AND status IN (:extracting_status, :embedding_status)
+""")
+
+
+class IngestionQueue:
+    """
+    Worker pool that turns uploaded PDFs into searchable chunks.
+
+    The queue is the ingestion_jobs table itself: uploads commit a "queued"
+    job and only wake the workers (`enqueue` never blocks the request).
+    `worker_count` tasks per process claim the oldest pending job with
+    FOR UPDATE SKIP LOCKED, load the PDF bytes and run extract → chunk →
+    embed → store, recording status and progress on the job row so clients
+    can poll it. Idle workers poll every `poll_seconds`, so jobs left over
+    by a restart, or queued by another process, are picked up as well.
+    A running job refreshes its updated_at; one that stops doing so for
+    `stale_seconds` is re-run by the next free worker.
+    """
+
+    def __init__(self, worker_count: int, poll_seconds: float = 5.0, stale_seconds: float = 300.0):
+        self.worker_count = worker_count
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: list[asyncio.Task] = []
+        self._running: set[uuid.UUID] = set()
+
+    async def start(self) -> None:
+        """Spawn the worker tasks on the running event loop (they start with any pending jobs)."""
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(n), name=f"ingestion-worker-{n}")
+            for n in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} ingestion workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers and put the jobs they were running back to "queued"."""
+        interrupted = list(self._running)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+        if interrupted:
+            try:
+                async with async_session_maker() as db:
+                    await db.execute(REQUEUE_SQL, {
+                        "ids": interrupted,
+                        "queued_status": IngestionStatus.QUEUED.value,
+                        "extracting_status": IngestionStatus.EXTRACTING.value,
+                        "embedding_status": IngestionStatus.EMBEDDING.value,
+                    })
+                    await db.commit()
+                logger.info(f"Re-queued {len(interrupted)} interrupted ingestion jobs")
+            except Exception as e:
+                # Taken over once their heartbeat is stale instead
+                logger.warning(f"⚠️ Could not re-queue interrupted ingestion jobs: {e}")
+
+    def enqueue(self, job_id: uuid.UUID) -> None:
+        """Wake a worker for a committed "queued" IngestionJob (returns immediately)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _claim(self) -> Optional[uuid.UUID]:
+        async with async_session_maker() as db:
+            job_id = (await db.execute(CLAIM_JOB_SQL, {
+                "claimed_status": IngestionStatus.EXTRACTING.value,
+                "queued_status": IngestionStatus.QUEUED.value,
+                "extracting_status": IngestionStatus.EXTRACTING.value,
+                "embedding_status": IngestionStatus.EMBEDDING.value,
+                "stale_seconds": self.stale_seconds,
+            })).scalar_one_or_none()
+            await db.commit()
+        return job_id
+
+    async def _heartbeat(self, job_id: uuid.UUID) -> None:
+        while True:
+            await asyncio.sleep(self.stale_seconds / 3)
+            try:
+                async with async_session_maker() as db:
+                    await db.execute(HEARTBEAT_SQL, {"id": job_id})
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Ingestion heartbeat failed for job {job_id}: {e}")
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            self._wakeup.clear()  # before claiming: an upload committed meanwhile sets it again
+            try:
+                job_id = await self._claim()
+            except Exception as e:
+                logger.warning(f"⚠️ Ingestion worker {n} could not claim a job: {e}")
+                job_id = None
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._running.add(job_id)
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"❌ Ingestion worker {n} crashed on job {job_id}")
+            finally:
+                heartbeat.cancel()
+                self._running.discard(job_id)
+
+    @staticmethod
+    async def _update_job(job_id: uuid.UUID, fields: dict) -> None:
+        """Commit job fields in a short session of their own so pollers see them immediately."""
+        async with async_session_maker() as db:
+            job = await db.get(IngestionJob, job_id)
+            if job is not None:
+                await IngestionJobRepository(db=db).update(job, fields)
+
+    async def _run_job(self, job_id: uuid.UUID) -> None:
+        async with async_session_maker() as db:
+            job = await db.get(IngestionJob, job_id)
+            if job is None:
+                logger.warning(f"⚠️ Ingestion job {job_id} vanished before processing")
+                return
+            document_id = job.document_id
+
+            try:
+                blob_key, user_id = (await db.execute(
+                    select(UploadedPdf.blob_key, UploadedPdf.user_id)
+                    .where(UploadedPdf.id == document_id)
+                )).one()
+                if blob_key:
+                    content_bytes = await blob_store.get(blob_key)
+                else:  # not yet migrated out of the uploaded_pdfs.content column
+                    content_bytes = (await db.execute(
+                        select(UploadedPdf.content).where(UploadedPdf.id == document_id)
+                    )).scalar_one()
+
+                # 1. Extract (page-parallel, process pool)
+                await self._update_job(job_id, {"status": IngestionStatus.EXTRACTING.value})
+                with INGEST_EXTRACT.time():
+                    pages = await pdf_extractor.extract_pages_async(content_bytes)
+                total_chars = sum(len(page) for page in pages)
+
+                # 2. Chunk lazily + embed + store (chunks are committed together at the end)
+                await self._update_job(job_id, {
+                    "status": IngestionStatus.EMBEDDING.value,
+                    "progress": EXTRACTION_PROGRESS,
+                })
+
+                async def on_progress(last_chunk: TextChunk) -> None:
+                    share = (EMBEDDING_PROGRESS - EXTRACTION_PROGRESS) * last_chunk.char_end / total_chars
+                    await self._update_job(job_id, {"progress": EXTRACTION_PROGRESS + share})
+
+                chunks = iter_chunks(
+                    pages,
+                    max_tokens=settings.CHUNK_MAX_TOKENS,
+                    min_tokens=settings.CHUNK_MIN_TOKENS,
+                    token_counter=count_tokens,
+                )
+                # A taken-over job may have stored its chunks before its process died
+                await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+                chunk_count = await store_chunks_in_db(chunks, document_id, user_id, db, on_progress=on_progress)
+
+                await self._update_job(job_id, {
+                    "status": IngestionStatus.READY.value,
+                    "progress": 1.0,
+                    "chunk_count": chunk_count,
+                })
+                logger.info(f"💾 Stored {chunk_count} chunks for PDF {document_id}")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to process chunks for {document_id}: {e}")
+                await db.rollback()
+                await self._update_job(job_id, {"status": IngestionStatus.FAILED.value, "error": str(e)})
+
+
+# Shared by the upload router; started/stopped with the application
+ingestion_queue = IngestionQueue(
+    worker_count=settings.INGESTION_WORKERS,
+    poll_seconds=settings.INGESTION_POLL_SECONDS,
+    stale_seconds=settings.INGESTION_STALE_SECONDS,
+)
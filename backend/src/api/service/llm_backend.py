@@ -0,0 +1,206 @@
+import math
+import random
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Optional, Protocol
+
+from api.config.core import settings
+from api.service.llm_client import ConcurrencyLimiter, LLMError, ReplicateAsyncClient
+
+logger = logging.getLogger(__name__)
+
+
+# ===================================
+# Backend Interface
+# ===================================
+class LLMBackend(Protocol):
+    """What the RAG pipeline needs from a text-generation provider."""
+
+    name: str
+
+    async def complete(self, model: str, prompt: str) -> str:
+        """Generate the full answer for `prompt`."""
+
+    def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        """Yield the answer token by token."""
+
+    async def aclose(self) -> None:
+        """Release connections / background tasks."""
+
+
+class LimitedLLMBackend:
+    """Wraps any backend so every call holds a ConcurrencyLimiter slot."""
+
+    def __init__(self, backend: LLMBackend, limiter: ConcurrencyLimiter):
+        self.backend = backend
+        self.limiter = limiter
+        self.name = backend.name
+
+    async def complete(self, model: str, prompt: str) -> str:
+        async with self.limiter.slot(model):
+            return await self.backend.complete(model, prompt)
+
+    async def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        async with self.limiter.slot(model):
+            async for token in self.backend.stream(model, prompt):
+                yield token
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+
+# ===================================
+# Fake Backend (offline load tests)
+# ===================================
+class LatencyDistribution:
+    """
+    Samples simulated latencies in seconds.
+
+    kind: "constant" (always `mean`), "uniform" (mean ± stddev·√3),
+    "exponential" (mean) or "lognormal" (mean/stddev of the latency itself,
+    the long-tailed shape real LLM APIs tend to have).
+    """
+
+    KINDS = ("constant", "uniform", "exponential", "lognormal")
+
+    def __init__(self, kind: str, mean: float, stddev: float = 0.0, rng: Optional[random.Random] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.mean = mean
+        self.stddev = stddev
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.kind == "constant" or (self.stddev <= 0 and self.kind in ("uniform", "lognormal")):
+            return self.mean
+        if self.kind == "uniform":
+            spread = self.stddev * 3 ** 0.5
+            return max(0.0, self.rng.uniform(self.mean - spread, self.mean + spread))
+        if self.kind == "exponential":
+            return self.rng.expovariate(1 / self.mean)
+        # lognormal parameterised by the mean/stddev of the resulting distribution
+        sigma2 = math.log(1 + (self.stddev / self.mean) ** 2)
+        mu = math.log(self.mean) - sigma2 / 2
+        return self.rng.lognormvariate(mu, sigma2 ** 0.5)
+
+
+class FakeLLMBackend:
+    """
+    Network-free stand-in for a real provider.
+
+    Every call waits a sampled time-to-first-token, then produces
+    `output_tokens` tokens at `tokens_per_second`. The answer text is
+    derived from the prompt, so identical prompts give identical answers.
+    `failure_rate` makes that share of calls raise LLMError (before the
+    first token), to exercise the fallback path.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        ttft: LatencyDistribution,
+        tokens_per_second: float = 50.0,
+        output_tokens: int = 120,
+        failure_rate: float = 0.0,
+        rng: Optional[random.Random] = None,
+    ):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.failure_rate = failure_rate
+        self.rng = rng or random.Random()
+        self.calls = 0
+
+    def _tokens(self, model: str, prompt: str) -> list[str]:
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode()).hexdigest()
+        return [f" tok{digest[i % 60:i % 60 + 4]}" for i in range(self.output_tokens)]
+
+    async def _first_token(self, model: str) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.ttft.sample())
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise LLMError(f"Simulated failure of {model}")
+
+    async def complete(self, model: str, prompt: str) -> str:
+        await self._first_token(model)
+        tokens = self._tokens(model, prompt)
+        if self.tokens_per_second > 0:
+            await asyncio.sleep(len(tokens) / self.tokens_per_second)
+        return "".join(tokens).strip()
+
+    async def stream(self, model: str, prompt: str) -> AsyncIterator[str]:
+        await self._first_token(model)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for token in self._tokens(model, prompt):
+            if delay:
+                await asyncio.sleep(delay)
+            yield token
+
+    async def aclose(self) -> None:
+        pass
+
+
+# ===================================
+# Factory
+# ===================================
+def create_llm_backend() -> LLMBackend:
+    """Backend selected by LLM_BACKEND ("replicate" or "fake")."""
+    backend = settings.LLM_BACKEND
+    if backend == "replicate":
+        if not settings.REPLICATE_API_TOKEN:
+            raise RuntimeError("Missing REPLICATE_API_TOKEN. Please set it in your .env file")
+        return ReplicateAsyncClient(
+            api_token=settings.REPLICATE_API_TOKEN,
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        )
+    if backend == "fake":
+        rng = random.Random(settings.LLM_FAKE_SEED)
+        return FakeLLMBackend(
+            ttft=LatencyDistribution(
+                settings.LLM_FAKE_LATENCY_DISTRIBUTION,
+                settings.LLM_FAKE_TTFT_MEAN_SECONDS,
+                settings.LLM_FAKE_TTFT_STDDEV_SECONDS,
+                rng=rng,
+            ),
+            tokens_per_second=settings.LLM_FAKE_TOKENS_PER_SECOND,
+            output_tokens=settings.LLM_FAKE_OUTPUT_TOKENS,
+            failure_rate=settings.LLM_FAKE_FAILURE_RATE,
+            rng=rng,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+
+llm_limiter = ConcurrencyLimiter(
+    global_limit=settings.LLM_MAX_CONCURRENCY,
+    per_model_limit=settings.LLM_MAX_CONCURRENCY_PER_MODEL,
+)
+
+_llm_backend: Optional[LLMBackend] = None
+
+
+def get_llm_backend() -> LLMBackend:
+    """The process-wide backend, created on first use (a missing API token fails the call, not the import)."""
+    global _llm_backend
+    if _llm_backend is None:
+        _llm_backend = LimitedLLMBackend(create_llm_backend(), llm_limiter)
+        logger.info(f"🤖 LLM backend: {_llm_backend.name}")
+    return _llm_backend
+
+
+def set_llm_backend(backend: LLMBackend) -> None:
+    """Swap the process-wide backend (load tests, benchmarks); it is wrapped in the limiter."""
+    global _llm_backend
+    _llm_backend = LimitedLLMBackend(backend, llm_limiter)
+
+
+async def close_llm_backend() -> None:
+    global _llm_backend
+    if _llm_backend is not None:
+        await _llm_backend.aclose()
+        _llm_backend = None
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+REPLICATE_API_URL = "https://api.replicate.com/v1"
+TERMINAL_STATUSES = {"succeeded", "failed", "canceled"}
+
+
+class LLMError(RuntimeError):
+    """Raised when a prediction fails or is canceled upstream."""
+
+
+# ===================================
+# Concurrency Limiter
+# ===================================
+class ConcurrencyLimiter:
+    """
+    Caps in-flight LLM calls globally and per model.
+
+    Callers wait for a slot instead of piling requests onto the provider;
+    a cancelled waiter simply leaves the queue. The model's slot is taken
+    before the global one, so a backlog on one model (e.g. the primary)
+    never holds global slots the fallback and hedge calls need.
+    """
+
+    def __init__(self, global_limit: int, per_model_limit: int):
+        self.global_limit = global_limit
+        self.per_model_limit = per_model_limit
+        self._global = asyncio.Semaphore(global_limit)
+        self._per_model: dict[str, asyncio.Semaphore] = {}
+        self._in_flight: dict[str, int] = {}
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        per_model = self._per_model.setdefault(model, asyncio.Semaphore(self.per_model_limit))
+        self.waiting += 1
+        try:
+            await per_model.acquire()
+            try:
+                await self._global.acquire()
+            except BaseException:
+                per_model.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self._in_flight[model] = self._in_flight.get(model, 0) + 1
+        try:
+            yield
+        finally:
+            self._in_flight[model] -= 1
+            per_model.release()
+            self._global.release()
+
+    def stats(self) -> dict:
+        return {
+            "global_limit": self.global_limit,
+            "per_model_limit": self.per_model_limit,
+            "in_flight": sum(self._in_flight.values()),
+            "in_flight_per_model": dict(self._in_flight),
+            "waiting": self.waiting,
+        }
+
+
+def normalize_output(output) -> str:
+    """Normalize Replicate prediction output into a clean string."""
+    if output is None:
+        return ""
+    if isinstance(output, str):
+        return output.strip()
+    if isinstance(output, (list, tuple)):
+        return "".join(str(x) for x in output).strip()
+    if isinstance(output, dict):
+        return output.get("text", str(output))
+    return str(output)
+
+
+# ===================================
+# Async Replicate Client
+# ===================================
+class ReplicateAsyncClient:
+    """
+    Native asyncio client for Replicate predictions (an LLMBackend).
+
+    One keep-alive httpx connection pool is shared by every request of the
+    process. Predictions are created without waiting for them and then
+    polled (or streamed), so their cancel URL is known from the start:
+    cancelling the awaiting task (e.g. `asyncio.wait_for` timing out, a
+    hedge loser, a disconnected client) at any point also cancels the
+    prediction upstream, and no remote job is left running and billing.
+    """
+
+    name = "replicate"
+
+    def __init__(
+        self,
+        api_token: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        poll_interval: float = 0.5,
+        base_url: str = REPLICATE_API_URL,
+    ):
+        self.api_token = api_token
+        self.poll_interval = poll_interval
+        self.base_url = base_url
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_token}"},
+                limits=self._limits,
+                # No read timeout: callers bound the whole call with asyncio timeouts
+                timeout=httpx.Timeout(10.0, read=None),
+            )
+        return self._client
+
+    async def _post_prediction(self, model_slug: str, payload: dict, stream: bool) -> dict:
+        model, _, version = model_slug.partition(":")
+        body = {"input": payload, "stream": stream}
+        if version:
+            url = "/predictions"
+            body["version"] = version
+        else:
+            url = f"/models/{model}/predictions"
+        # No "Prefer: wait": the response (with the cancel URL) comes back right away
+        response = await self.http.post(url, json=body)
+        response.raise_for_status()
+        return response.json()
+
+    async def _create(self, model_slug: str, payload: dict, stream: bool = False) -> dict:
+        """Start a prediction. Cancelled while the POST is in flight, it is canceled upstream once created."""
+        post = asyncio.ensure_future(self._post_prediction(model_slug, payload, stream))
+        try:
+            return await asyncio.shield(post)
+        except asyncio.CancelledError:
+            def cancel_when_created(done: asyncio.Future) -> None:
+                if not done.cancelled() and done.exception() is None:
+                    self._cancel_in_background(done.result())
+            post.add_done_callback(cancel_when_created)
+            raise
+
+    def _cancel_in_background(self, prediction: dict) -> None:
+        cancel_url = prediction.get("urls", {}).get("cancel")
+        if not cancel_url or prediction.get("status") in TERMINAL_STATUSES:
+            return
+
+        async def cancel():
+            try:
+                await self.http.post(cancel_url)
+                logger.info(f"🛑 Canceled prediction {prediction.get('id')}")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not cancel prediction {prediction.get('id')}: {e}")
+
+        task = asyncio.create_task(cancel())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def complete(self, model_slug: str, prompt: str) -> str:
+        """Run one prediction to completion and return its normalized output."""
+        prediction = await self._create(model_slug, {"prompt": prompt})
+        try:
+            while prediction["status"] not in TERMINAL_STATUSES:
+                await asyncio.sleep(self.poll_interval)
+                response = await self.http.get(prediction["urls"]["get"])
+                response.raise_for_status()
+                prediction = response.json()
+        except asyncio.CancelledError:
+            self._cancel_in_background(prediction)
+            raise
+
+        if prediction["status"] != "succeeded":
+            raise LLMError(f"Prediction {prediction.get('id')} {prediction['status']}: {prediction.get('error')}")
+        return normalize_output(prediction.get("output"))
+
+    async def stream(self, model_slug: str, prompt: str) -> AsyncIterator[str]:
+        """Yield output tokens from the prediction's server-sent event stream."""
+        prediction = await self._create(model_slug, {"prompt": prompt}, stream=True)
+        finished = False
+        try:
+            headers = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+            async with self.http.stream("GET", prediction["urls"]["stream"], headers=headers) as response:
+                response.raise_for_status()
+                event, data = "message", []
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[len("data:"):].removeprefix(" "))
+                    elif not line:
+                        payload = "\n".join(data)
+                        if event == "output":
+                            yield payload
+                        elif event == "error":
+                            raise LLMError(payload)
+                        elif event == "done":
+                            finished = True
+                            return
+                        event, data = "message", []
+            finished = True
+        finally:
+            if not finished:
+                self._cancel_in_background(prediction)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
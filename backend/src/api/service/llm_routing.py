@@ -0,0 +1,307 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from api.config.core import settings
+from api.service.llm_backend import LLMBackend, get_llm_backend
+from api.service.metrics import llm_fallbacks_total, llm_timeouts_total
+
+logger = logging.getLogger(__name__)
+
+
+# ===================================
+# Latency Tracking
+# ===================================
+class LatencyTracker:
+    """Rolling window of recent latencies (seconds) with percentile lookup."""
+
+    def __init__(self, window: int):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ===================================
+# Circuit Breaker
+# ===================================
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures; while open
+    every call is refused. After `reset_seconds` one probe call is let
+    through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"⚠️ Circuit breaker opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """The call was cancelled without an outcome (e.g. it lost a hedge)."""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+# ===================================
+# Hedged Primary → Fallback Routing
+# ===================================
+class HedgedLLMRouter:
+    """
+    Routes a prompt to the primary model with a hedge on the fallback model.
+
+    - The whole call gets a latency budget (deadline); past it every
+      outstanding request is cancelled and asyncio.TimeoutError is raised.
+    - If the primary has not answered (or produced its first token, when
+      streaming) by the `hedge_percentile` of its recent latencies, the
+      fallback is started as well; the first success wins and the other
+      request is cancelled (which cancels the prediction upstream).
+      A primary that loses the race (or the budget) still records its
+      elapsed time as a lower bound of its latency.
+    - A primary failure starts the fallback right away.
+    - While the circuit breaker is open (the primary keeps failing or
+      timing out) calls go straight to the fallback.
+    """
+
+    def __init__(
+        self,
+        primary: str,
+        fallback: str,
+        backend: Callable[[], LLMBackend] = get_llm_backend,
+        budget_seconds: float = 180.0,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 2.0,
+        hedge_default_delay: float = 20.0,
+        min_samples: int = 20,
+        window: int = 200,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.backend = backend
+        self.budget_seconds = budget_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.min_samples = min_samples
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_seconds=30.0)
+        self.completion_latency = LatencyTracker(window)
+        self.first_token_latency = LatencyTracker(window)
+        self.counters = {
+            "calls": 0,
+            "primary_wins": 0,
+            "fallback_wins": 0,
+            "hedged": 0,
+            "primary_failures": 0,
+            "breaker_short_circuits": 0,
+            "timeouts": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        self.counters[name] += 1
+
+    def hedge_delay(self, tracker: LatencyTracker) -> float:
+        """Seconds to wait for the primary before hedging."""
+        if len(tracker) < self.min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, tracker.percentile(self.hedge_percentile))
+
+    async def _race(
+        self,
+        start: Callable[[str], Awaitable],
+        tracker: LatencyTracker,
+        budget: Optional[float],
+    ):
+        """
+        Run `start(model)` for the primary (hedged with the fallback) and
+        return (result, model) of the first successful one.
+        """
+        self._count("calls")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + (budget if budget is not None else self.budget_seconds)
+
+        use_primary = self.breaker.allow()
+        if not use_primary:
+            self._count("breaker_short_circuits")
+            llm_fallbacks_total.labels("breaker_open").inc()
+        first = self.primary if use_primary else self.fallback
+        tasks: dict[asyncio.Future, str] = {asyncio.ensure_future(start(first)): first}
+        fallback_started = not use_primary
+        hedge_at = started + self.hedge_delay(tracker) if self.hedge_enabled else deadline
+        last_error: Optional[BaseException] = None
+
+        try:
+            while tasks:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                wake_at = deadline if fallback_started else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=max(0.0, wake_at - now), return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    model = tasks.pop(task)
+                    if task.exception() is None:
+                        if model == self.primary:
+                            tracker.add(loop.time() - started)
+                            self.breaker.record_success()
+                            self._count("primary_wins")
+                        else:
+                            self._count("fallback_wins")
+                            if self.primary in tasks.values():
+                                # Censored sample: the primary took at least this long. Without it the
+                                # slow primaries that lose to the hedge never enter the window, the
+                                # percentile drifts down and the hedge fires on almost every call.
+                                tracker.add(loop.time() - started)
+                        return task.result(), model
+                    last_error = task.exception()
+                    if model == self.primary:
+                        self._count("primary_failures")
+                        self.breaker.record_failure()
+                        logger.warning(f"⚠️ Primary model failed, using fallback: {last_error}")
+
+                if not fallback_started and (not tasks or loop.time() >= hedge_at):
+                    if tasks:
+                        self._count("hedged")
+                        llm_fallbacks_total.labels("hedge").inc()
+                        logger.info(f"🏁 Primary model slow, hedging with fallback after {loop.time() - started:.1f}s")
+                    else:
+                        llm_fallbacks_total.labels("primary_error").inc()
+                    tasks[asyncio.ensure_future(start(self.fallback))] = self.fallback
+                    fallback_started = True
+
+            if tasks:
+                # Budget exhausted with requests still running
+                self._count("timeouts")
+                llm_timeouts_total.inc()
+                if self.primary in tasks.values():
+                    tracker.add(loop.time() - started)  # censored, as above
+                    self.breaker.record_failure()
+                raise asyncio.TimeoutError(f"LLM budget of {deadline - started:.1f}s exhausted")
+            raise last_error
+        finally:
+            for task, model in tasks.items():
+                task.cancel()
+                if model == self.primary:
+                    self.breaker.abandon()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def complete(self, prompt: str, budget: Optional[float] = None) -> tuple[str, str]:
+        """Full answer and the model that produced it."""
+        return await self._race(
+            lambda model: self.backend().complete(model, prompt), self.completion_latency, budget
+        )
+
+    async def stream(self, prompt: str, budget: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Tokens of whichever model produces its first token first. The budget
+        and the hedge apply to the time to first token; once a model has
+        started answering, the rest of its stream is passed through.
+        """
+        streams = []
+
+        async def first_token(model: str):
+            tokens = self.backend().stream(model, prompt)
+            streams.append(tokens)
+            try:
+                return await tokens.__anext__(), tokens
+            except StopAsyncIteration:
+                return None, tokens
+
+        try:
+            (token, tokens), _ = await self._race(first_token, self.first_token_latency, budget)
+            for other in streams:
+                if other is not tokens:
+                    await other.aclose()
+            if token is None:
+                return
+            yield token
+            async for token in tokens:
+                yield token
+        finally:
+            for tokens in streams:
+                await tokens.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "primary": self.primary,
+            "fallback": self.fallback,
+            "budget_seconds": self.budget_seconds,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_delay_seconds": self.hedge_delay(self.completion_latency),
+            "hedge_delay_first_token_seconds": self.hedge_delay(self.first_token_latency),
+            "breaker": self.breaker.stats(),
+            **self.counters,
+        }
+
+
+llm_router = HedgedLLMRouter(
+    primary=settings.LLM_PRIMARY_MODEL,
+    fallback=settings.LLM_FALLBACK_MODEL,
+    budget_seconds=settings.LLM_TIMEOUT_SECONDS,
+    hedge_enabled=settings.LLM_HEDGE_ENABLED,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+    hedge_default_delay=settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    window=settings.LLM_HEDGE_WINDOW,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+    ),
+)
@@ -0,0 +1,58 @@
+from api.shared.metrics import MetricsRegistry
+
+# ===================================
+# Hot-Path Metrics (GET /metrics)
+# ===================================
+# Per process: with several workers, scrape each one (or aggregate in Prometheus)
+metrics = MetricsRegistry()
+
+rag_stage_seconds = metrics.histogram(
+    "rag_stage_seconds",
+    "Seconds spent in each stage of answering a question "
+    "(llm_first_token: streamed answers only; llm_total: every answer, general chat included)",
+    ["stage"],  # embed, answer_cache, search, rerank, llm_first_token, llm_total, persist, total
+)
+ingestion_stage_seconds = metrics.histogram(
+    "ingestion_stage_seconds",
+    "Seconds spent in each stage of ingesting one PDF",
+    ["stage"],  # extract, chunk, embed, insert
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0),
+)
+rag_questions_total = metrics.counter(
+    "rag_questions_total",
+    "Document questions by outcome",
+    ["outcome"],  # answered, cached, timeout
+)
+llm_fallbacks_total = metrics.counter(
+    "llm_fallbacks_total",
+    "LLM calls that started the fallback model",
+    ["reason"],  # hedge, primary_error, breaker_open
+)
+llm_timeouts_total = metrics.counter(
+    "llm_timeouts_total",
+    "LLM calls that exhausted their latency budget",
+)
+rerank_timeouts_total = metrics.counter(
+    "rerank_timeouts_total",
+    "Rerank calls that fell back to retrieval order after their budget",
+)
+
+# Label children resolved once, so the hot paths skip the lookup
+EMBED = rag_stage_seconds.labels("embed")
+ANSWER_CACHE = rag_stage_seconds.labels("answer_cache")
+SEARCH = rag_stage_seconds.labels("search")
+RERANK = rag_stage_seconds.labels("rerank")
+LLM_FIRST_TOKEN = rag_stage_seconds.labels("llm_first_token")
+LLM_TOTAL = rag_stage_seconds.labels("llm_total")
+PERSIST = rag_stage_seconds.labels("persist")
+QUESTION_TOTAL = rag_stage_seconds.labels("total")
+
+INGEST_EXTRACT = ingestion_stage_seconds.labels("extract")
+INGEST_CHUNK = ingestion_stage_seconds.labels("chunk")
+INGEST_EMBED = ingestion_stage_seconds.labels("embed")
+INGEST_INSERT = ingestion_stage_seconds.labels("insert")
+
+for reason in ("hedge", "primary_error", "breaker_open"):
+    llm_fallbacks_total.labels(reason)
+for outcome in ("answered", "cached", "timeout"):
+    rag_questions_total.labels(outcome)
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from api.config.core import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+@dataclass
+class _Entry:
+    load: Callable[[], Any]
+    warm_up: Optional[Callable[[Any], Any]] = None
+    eager: bool = True  # loaded (and warmed up) at startup, otherwise on first use
+    model: Any = None
+    load_seconds: Optional[float] = None
+    warm_up_seconds: Optional[float] = None
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+    """
+    Lazily constructed models and tokenizers, shared by the whole process.
+
+    Importing a service no longer pulls in torch / transformers: a model is
+    built by its loader on first `get()` (from any thread; concurrent
+    callers wait for the one load). `warm_up()` runs at startup (see
+    api.main) and loads every eager entry plus one warm-up call, so the
+    first request does not pay for it; the worker reports ready
+    (`ready`, GET /health/ready) only once that is done.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    def register(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        warm_up: Optional[Callable[[Any], Any]] = None,
+        eager: bool = True,
+    ) -> None:
+        self._entries[name] = _Entry(load=load, warm_up=warm_up, eager=eager)
+
+    def get(self, name: str) -> Any:
+        """The model, loaded on first use (blocking: call it off the event loop)."""
+        entry = self._entries[name]
+        if entry.model is None:
+            with entry.lock:
+                if entry.model is None:
+                    start = time.perf_counter()
+                    try:
+                        model = entry.load()
+                    except Exception as e:
+                        entry.error = str(e)
+                        raise
+                    entry.load_seconds = time.perf_counter() - start
+                    entry.error = None
+                    entry.model = model
+                    logger.info(f"📦 Loaded model '{name}' in {entry.load_seconds:.1f}s")
+        return entry.model
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].model is not None
+
+    def _load_and_warm_up(self, name: str) -> None:
+        entry = self._entries[name]
+        model = self.get(name)
+        if entry.warm_up is not None and entry.warm_up_seconds is None:
+            start = time.perf_counter()
+            entry.warm_up(model)
+            entry.warm_up_seconds = time.perf_counter() - start
+
+    async def warm_up(self, retry_seconds: float = 5.0) -> None:
+        """Load and warm up every eager model (one at a time, off the event loop), then mark ready.
+
+        A failed warm-up (e.g. the embedding sidecar is not up yet) is retried
+        every `retry_seconds`; the worker stays not ready meanwhile.
+        """
+        for name, entry in self._entries.items():
+            if not entry.eager:
+                continue
+            while True:
+                try:
+                    await asyncio.to_thread(self._load_and_warm_up, name)
+                    break
+                except Exception as e:
+                    entry.error = str(e)
+                    logger.warning(f"⚠️ Warm-up of model '{name}' failed, retrying in {retry_seconds:.0f}s: {e}")
+                    await asyncio.sleep(retry_seconds)
+            entry.error = None
+        self.ready = True
+        logger.info("🔥 Models warmed up, worker ready")
+
+    def start_warm_up(self) -> None:
+        """Warm up in the background (the app already serves liveness / DB routes meanwhile)."""
+        self._warm_up_task = asyncio.get_running_loop().create_task(self.warm_up())
+
+    async def stop(self) -> None:
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+            await asyncio.gather(self._warm_up_task, return_exceptions=True)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "models": {
+                name: {
+                    "eager": entry.eager,
+                    "loaded": entry.model is not None,
+                    "load_seconds": round(entry.load_seconds, 3) if entry.load_seconds is not None else None,
+                    "warm_up_seconds": round(entry.warm_up_seconds, 3) if entry.warm_up_seconds is not None else None,
+                    "error": entry.error,
+                }
+                for name, entry in self._entries.items()
+            },
+        }
+
+
+# ===================================
+# Registered Models
+# ===================================
+def load_local_embedding_model():
+    """MiniLM on PyTorch, or its int8 ONNX export (EMBEDDING_BACKEND); both return the same 384-d normalized vectors."""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        from api.service.onnx_embedding import load_onnx_encoder
+        return load_onnx_encoder(EMBEDDING_MODEL_ID, settings.EMBEDDING_ONNX_DIR, threads=settings.EMBEDDING_ONNX_THREADS)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_ID, token=settings.HUGGINGFACE_HUB_TOKEN)
+
+
+def _load_embedding_model():
+    """The shared embedding sidecar when EMBEDDING_SIDECAR_SOCKET is set, else the model in this process."""
+    if settings.EMBEDDING_SIDECAR_SOCKET:
+        from api.service.embedding_sidecar import SidecarEncoder
+        return SidecarEncoder(
+            settings.EMBEDDING_SIDECAR_SOCKET, EMBEDDING_MODEL_ID, timeout=settings.EMBEDDING_SIDECAR_TIMEOUT_SECONDS
+        )
+    return load_local_embedding_model()
+
+
+def _load_prompt_tokenizer():
+    """LLM_TOKENIZER_ID via transformers; the embedding tokenizer if it cannot be loaded (e.g. gated model)."""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(settings.LLM_TOKENIZER_ID, token=settings.HUGGINGFACE_HUB_TOKEN)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load tokenizer {settings.LLM_TOKENIZER_ID}, counting with the embedding tokenizer: {e}")
+        return models.get("embedding").tokenizer
+
+
+models = ModelRegistry()
+models.register(
+    "embedding",
+    _load_embedding_model,
+    warm_up=lambda model: model.encode(["warm-up"], show_progress_bar=False),
+)
+models.register(
+    "prompt_tokenizer",
+    _load_prompt_tokenizer,
+    warm_up=lambda tokenizer: tokenizer.encode("warm-up", add_special_tokens=False),
+)
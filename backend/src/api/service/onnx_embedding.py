@@ -0,0 +1,162 @@
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+ONNX_INPUTS = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError:
+        raise RuntimeError("EMBEDDING_BACKEND=onnx requires onnxruntime (poetry install --extras onnx)")
+    return onnxruntime
+
+
+def export_onnx_int8(model_id: str, model_dir: Union[str, Path]) -> Path:
+    """
+    Export the transformer of a sentence-transformers model to ONNX and
+    quantize its weights to int8 (dynamic quantization: activations are
+    quantized per batch at run time, no calibration data needed).
+    Writes model.onnx, model_int8.onnx and the tokenizer files to `model_dir`.
+    Needs torch + transformers (installed with sentence-transformers) and onnxruntime.
+
+    The files are written to a staging directory next to `model_dir` and
+    renamed into place, model_int8.onnx last: workers exporting at the same
+    time each publish complete files, and a reader that finds model_int8.onnx
+    also finds the tokenizer.
+    """
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{model_dir.name}-", dir=model_dir.parent))
+    try:
+        _export_onnx_int8(model_id, staging)
+        files = sorted(staging.iterdir(), key=lambda path: path.name == ONNX_INT8_FILE)
+        for path in files:
+            os.replace(path, model_dir / path.name)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info(f"📦 Exported {model_id} to {model_dir / ONNX_INT8_FILE}")
+    return model_dir / ONNX_INT8_FILE
+
+
+def _export_onnx_int8(model_id: str, model_dir: Path) -> None:
+    _import_onnxruntime()
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    dummy = tokenizer(["Wie entkalke ich die Maschine?"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model),
+            tuple(dummy[name] for name in ONNX_INPUTS),
+            str(model_dir / ONNX_FP32_FILE),
+            input_names=ONNX_INPUTS,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in ONNX_INPUTS + ["last_hidden_state"]},
+            opset_version=14,
+        )
+    quantize_dynamic(
+        str(model_dir / ONNX_FP32_FILE), str(model_dir / ONNX_INT8_FILE), weight_type=QuantType.QInt8
+    )
+    tokenizer.save_pretrained(str(model_dir))
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for SentenceTransformer.encode of all-MiniLM-L6-v2 on onnxruntime
+    (CPU, int8-quantized weights).
+
+    Reproduces the sentence-transformers pipeline of that model: tokenize
+    (truncated to `max_seq_length`), transformer, mean pooling over the
+    attention mask, L2 normalization, so the 384-d vectors can be compared
+    with the ones already stored by the PyTorch backend. Texts are encoded
+    in length-sorted batches to keep padding small.
+    """
+
+    def __init__(self, model_dir: Union[str, Path], max_seq_length: int = 256, threads: int = 0):
+        ort = _import_onnxruntime()
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(model_dir / ONNX_INT8_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        **_,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        dim = None
+        out: List[np.ndarray] = [None] * len(texts)
+
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {
+                name: encoded[name].astype(np.int64)
+                for name in ONNX_INPUTS if name in self._input_names and name in encoded
+            }
+            hidden = self.session.run(None, feeds)[0]
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            dim = pooled.shape[1]
+            for row, i in zip(pooled, idx):
+                out[i] = row
+
+        if not texts:
+            return np.zeros((0, dim or 0), dtype=np.float32)
+        embeddings = np.stack(out).astype(np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def load_onnx_encoder(model_id: str, model_dir: Union[str, Path], threads: int = 0) -> OnnxSentenceEncoder:
+    """The int8 encoder from `model_dir`, exported there first if it is not yet."""
+    if not (Path(model_dir) / ONNX_INT8_FILE).exists():
+        logger.info(f"No ONNX export in {model_dir}, exporting {model_id}")
+        export_onnx_int8(model_id, model_dir)
+    return OnnxSentenceEncoder(model_dir, threads=threads)
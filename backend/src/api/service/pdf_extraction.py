@@ -0,0 +1,116 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from api.config.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ===================================
+# Worker-side helpers (run in child processes)
+# ===================================
+def _page_count(file_bytes: bytes) -> int:
+    with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def _extract_page_range(file_bytes: bytes, start: int, stop: int) -> List[str]:
+    """Open the PDF bytes in this process and return the text of pages [start, stop)."""
+    with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
+        return [pdf[i].get_text() for i in range(start, stop)]
+
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into at most `parts` contiguous, near-equal ranges."""
+    parts = max(1, min(parts, page_count))
+    size, rest = divmod(page_count, parts)
+    ranges, start = [], 0
+    for i in range(parts):
+        stop = start + size + (1 if i < rest else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+# ===================================
+# Extraction Engine
+# ===================================
+class PdfTextExtractor:
+    """
+    Page-parallel PDF text extraction.
+
+    Page ranges are spread over a ProcessPoolExecutor; every worker opens the
+    PDF bytes itself and returns the text of its pages. Results are
+    page-indexed: `pages[i]` is the text of page i. Documents too small to
+    amortize the process hop are extracted serially.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_pages_per_worker: int = 16):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_pages_per_worker = min_pages_per_worker
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn": never fork a process that already holds torch/asyncio threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _plan(self, page_count: int) -> List[Tuple[int, int]]:
+        parts = min(self.workers, page_count // self.min_pages_per_worker)
+        return split_page_ranges(page_count, parts) if parts > 1 else [(0, page_count)]
+
+    def extract_pages(self, file_bytes: bytes) -> List[str]:
+        """Blocking variant for scripts and worker threads."""
+        ranges = self._plan(_page_count(file_bytes))
+        if len(ranges) == 1:
+            return _extract_page_range(file_bytes, *ranges[0])
+
+        executor = self._get_executor()
+        futures = [executor.submit(_extract_page_range, file_bytes, start, stop) for start, stop in ranges]
+        pages: List[str] = []
+        for future in futures:
+            pages.extend(future.result())
+        return pages
+
+    async def extract_pages_async(self, file_bytes: bytes) -> List[str]:
+        """Extract page texts without blocking the event loop."""
+        page_count = await asyncio.to_thread(_page_count, file_bytes)
+        ranges = self._plan(page_count)
+        if len(ranges) == 1:
+            return await asyncio.to_thread(_extract_page_range, file_bytes, *ranges[0])
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_page_range, file_bytes, start, stop)
+            for start, stop in ranges
+        ))
+        logger.info(f"PDF text extracted from {page_count} pages across {len(ranges)} processes")
+        return [page for part in results for page in part]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def join_pages(pages: List[str]) -> str:
+    """Concatenate page texts once (no quadratic `+=`)."""
+    return "".join(pages)
+
+
+# Shared engine; worker processes are started on first parallel extraction
+pdf_extractor = PdfTextExtractor(
+    workers=settings.PDF_EXTRACT_WORKERS,
+    min_pages_per_worker=settings.PDF_EXTRACT_MIN_PAGES_PER_WORKER,
+)
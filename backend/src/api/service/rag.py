@@ -1,16 +1,30 @@
+import sys
 import uuid
-import fitz  # PyMuPDF
 import logging
 import asyncio
 import time
-from typing import List
+from dataclasses import dataclass
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Literal, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from sentence_transformers import SentenceTransformer
-from api.database.table_models import DocumentChunk, ChatMessage
-import replicate
-import os
-from dotenv import load_dotenv
+from api.database.table_models import ChatMessage
+from api.database.bulk import DocumentChunkCopyWriter, document_chunk_record
+from api.service.chunking import TextChunk
+from api.service.context_packing import RetrievedChunk, pack_context, parse_vector
+from api.service.reranking import reranker
+from api.service.embedding import BatchingEmbedder
+from api.service.model_registry import EMBEDDING_MODEL_ID, models
+from api.service.llm_routing import llm_router
+from api.service.answer_cache import answer_cache
+from api.service.conversation_memory import ConversationMemory
+from api.service import metrics
+from api.service.user_level import apply_user_level, user_level_name
+from api.shared.lru_cache import LRUCache
+from api.shared.single_flight import SingleFlight
+from api.shared.stream_flight import StreamFlight
+from api.config.db import async_session_maker
+from api.config.core import settings
 
 # ===================================
 # Logging
@@ -18,32 +32,70 @@ from dotenv import load_dotenv
 logger = logging.getLogger(__name__)
 logging.getLogger("httpx").setLevel(logging.WARNING)  # suppress verbose logs
 
-# Load environment variables
-load_dotenv()
-
 # ===================================
 # Embedding Model
 # ===================================
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Loaded by the model registry (warmed up at startup, see api.main)
+def _encode_queries(queries: List[str]):
+    return models.get("embedding").encode(queries, batch_size=len(queries), show_progress_bar=False)
+
+# Shared by all chat requests: concurrent questions are encoded as one batch
+query_embedder = BatchingEmbedder(
+    _encode_queries,
+    max_batch_size=settings.QUERY_EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=settings.QUERY_EMBED_MAX_WAIT_MS,
+)
+
+# Repeated questions skip the encoder entirely: (model id, normalized text) → vector
+query_embedding_cache: Optional[LRUCache] = (
+    LRUCache(
+        max_entries=settings.QUERY_EMBED_CACHE_MAX_ENTRIES,
+        max_bytes=settings.QUERY_EMBED_CACHE_MAX_BYTES,
+        ttl_seconds=settings.QUERY_EMBED_CACHE_TTL_SECONDS,
+        size_of=lambda obj: obj.nbytes if hasattr(obj, "nbytes") else sys.getsizeof(obj),
+    )
+    if settings.QUERY_EMBED_CACHE_ENABLED else None
+)
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace/trailing punctuation (MiniLM is uncased anyway)."""
+    return " ".join(query.casefold().split()).strip(" ?!.")
+
+def vector_literal(embedding) -> str:
+    """pgvector text form of an embedding, bound as `(:param)::vector`."""
+    return "[" + ",".join(str(x) for x in embedding.tolist()) + "]"
+
+async def embed_query(query: str):
+    """Embedding of a user question, served from the LRU cache when possible."""
+    normalized = normalize_query(query)
+    if query_embedding_cache is None:
+        with metrics.EMBED.time():
+            return await query_embedder.encode(normalized)
+
+    key = (EMBEDDING_MODEL_ID, normalized)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        with metrics.EMBED.time():
+            vector = await query_embedder.encode(normalized)
+        query_embedding_cache.put(key, vector)
+    return vector
 
 # ===================================
 # PDF Extractors
 # ===================================
 def extract_text_from_pdf(file_path: str) -> str:
     """Extract text from PDF file path."""
-    text = ""
+    import fitz  # PyMuPDF
     with fitz.open(file_path) as pdf:
-        for page in pdf:
-            text += page.get_text()
+        text = "".join(page.get_text() for page in pdf)
     logger.info("PDF text extracted from file")
     return text
 
 def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
-    """Extract text from PDF bytes."""
-    text = ""
+    """Extract text from PDF bytes (serial; see pdf_extraction for the page-parallel engine)."""
+    import fitz  # PyMuPDF
     with fitz.open(stream=file_bytes, filetype="pdf") as pdf:
-        for page in pdf:
-            text += page.get_text()
+        text = "".join(page.get_text() for page in pdf)
     logger.info("PDF text extracted from bytes")
     return text
 
@@ -51,7 +103,11 @@ def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
 # Text Splitter
 # =================================
 def chunk_text(text: str, chunk_size=800, chunk_overlap=200) -> List[str]:
-    """Split long text into overlapping chunks for embedding/RAG."""
+    """Split long text into overlapping chunks for embedding/RAG.
+
+    Fixed character windows; ingestion uses the structure-aware
+    `api.service.chunking.iter_chunks` instead.
+    """
     chunks = []
     start = 0
     while start < len(text):
@@ -61,133 +117,425 @@ def chunk_text(text: str, chunk_size=800, chunk_overlap=200) -> List[str]:
     logger.info(f"Text split into {len(chunks)} chunks")
     return chunks
 
+def count_tokens(text: str) -> int:
+    """Number of embedding-tokenizer tokens in `text` (without special tokens)."""
+    return len(models.get("embedding").tokenizer.encode(text, add_special_tokens=False))
+
 # ==========================================
 # Store Chunks in DB with Embeddings
 # ==========================================
-async def store_chunks_in_db(chunks: List[str], document_id: uuid.UUID, user_id: uuid.UUID, db: AsyncSession):
-    """Store text chunks + embeddings into DB."""
-    embeddings = embedding_model.encode(chunks, batch_size=32, show_progress_bar=False)
-    for chunk, vector in zip(chunks, embeddings):
-        db.add(DocumentChunk(
-            document_id=document_id,
-            user_id=user_id,
-            content=chunk,
-            embedding=vector.tolist()
-        ))
+EMBED_BATCH_CHUNKS = 256  # chunks pulled + encoded per worker-thread call
+
+def _take_and_encode(chunks: Iterator[TextChunk], n: int):
+    """Pull the next `n` chunks from a (lazy) chunker and encode them.
+
+    Returns (chunks, embeddings, chunking seconds, encoding seconds).
+    """
+    start = time.perf_counter()
+    batch = list(islice(chunks, n))
+    chunked = time.perf_counter()
+    if not batch:
+        return batch, [], chunked - start, 0.0
+    embeddings = models.get("embedding").encode(
+        [chunk.content for chunk in batch], batch_size=32, show_progress_bar=False
+    )
+    return batch, embeddings, chunked - start, time.perf_counter() - chunked
+
+async def store_chunks_in_db(
+    chunks: Iterable[TextChunk],
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    db: AsyncSession,
+    on_progress: Optional[Callable[[TextChunk], Awaitable[None]]] = None,
+) -> int:
+    """Store text chunks + embeddings into DB and return how many were stored.
+
+    Chunking and encoding run batch by batch in a worker thread so the event
+    loop stays responsive; each batch is streamed to Postgres with binary
+    COPY (no ORM objects) and `on_progress(last_chunk)` is awaited after it.
+    All batches are committed together. Chunking, encoding and insert
+    times are summed over the batches and observed once per document.
+    """
+    iterator = iter(chunks)
+    chunk_seconds = embed_seconds = insert_seconds = 0.0
+    async with DocumentChunkCopyWriter(db) as writer:
+        while True:
+            batch, embeddings, chunk_time, embed_time = await asyncio.to_thread(
+                _take_and_encode, iterator, EMBED_BATCH_CHUNKS
+            )
+            chunk_seconds += chunk_time
+            embed_seconds += embed_time
+            if not batch:
+                break
+            start = time.perf_counter()
+            await writer.write([
+                document_chunk_record(
+                    document_id, user_id, chunk.content,
+                    chunk.ordinal, chunk.page_number, chunk.char_start, chunk.char_end,
+                    vector,
+                )
+                for chunk, vector in zip(batch, embeddings)
+            ])
+            insert_seconds += time.perf_counter() - start
+            if on_progress is not None:
+                await on_progress(batch[-1])
+        start = time.perf_counter()
     await db.commit()
-    logger.info(f"Stored {len(chunks)} chunks in DB")
+    insert_seconds += time.perf_counter() - start
+    metrics.INGEST_CHUNK.observe(chunk_seconds)
+    metrics.INGEST_EMBED.observe(embed_seconds)
+    metrics.INGEST_INSERT.observe(insert_seconds)
+    logger.info(f"Stored {writer.rows_written} chunks in DB")
+    return writer.rows_written
 
 # ==============================
 # Similarity Search
 # ==============================
-async def search_similar_chunks(
+# Upload → document that owns its chunks (itself, or the source of a duplicate)
+_chunk_source_cache = LRUCache(max_entries=10_000, ttl_seconds=300)
+# Chunk counts per source document; chunks only change when a PDF is ingested
+_chunk_count_cache = LRUCache(max_entries=10_000, ttl_seconds=300)
+
+async def resolve_chunk_source(db: AsyncSession, document_id: uuid.UUID, user_id: uuid.UUID) -> Optional[uuid.UUID]:
+    """Id of the document whose chunks serve `document_id`, or None if this user does not own it.
+
+    Access control happens here: duplicates share the chunks of their source
+    upload, so chunks are no longer filtered by their own user_id.
+    """
+    key = (document_id, user_id)
+    source_id = _chunk_source_cache.get(key)
+    if source_id is None:
+        result = await db.execute(
+            text("""
+                SELECT COALESCE(source_document_id, id)
+                FROM uploaded_pdfs
+                WHERE id = :document_id
+                  AND user_id = :user_id
+            """),
+            {"document_id": str(document_id), "user_id": str(user_id)},
+        )
+        source_id = result.scalar_one_or_none()
+        if source_id is not None:
+            _chunk_source_cache.put(key, source_id)
+    return source_id
+
+async def count_document_chunks(db: AsyncSession, source_id: uuid.UUID) -> int:
+    """Chunks stored for one source document (served by the document_id btree)."""
+    count = _chunk_count_cache.get(source_id)
+    if count is None:
+        result = await db.execute(
+            text("SELECT count(*) FROM document_chunks WHERE document_id = :document_id"),
+            {"document_id": str(source_id)},
+        )
+        count = result.scalar_one()
+        _chunk_count_cache.put(source_id, count)
+    return count
+
+async def _set_ann_search_params(db: AsyncSession, ef_search: Optional[int], probes: Optional[int]) -> None:
+    """Tune the vector index for the current transaction only (SET LOCAL)."""
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or settings.VECTOR_SEARCH_EF_SEARCH)}"))
+        if settings.VECTOR_SEARCH_ITERATIVE_SCAN:
+            # pgvector >= 0.8: keep scanning the graph until enough rows pass the document filter
+            await db.execute(text(f"SET LOCAL hnsw.iterative_scan = {settings.VECTOR_SEARCH_ITERATIVE_SCAN}"))
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        await db.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or settings.VECTOR_SEARCH_PROBES)}"))
+        if settings.VECTOR_SEARCH_ITERATIVE_SCAN:
+            await db.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+
+# Exact: materialize the document's rows via the btree, then sort them all
+EXACT_SEARCH_SQL = text("""
+    WITH candidates AS MATERIALIZED (
+        SELECT id, content, ordinal, page_number, embedding
+        FROM document_chunks
+        WHERE document_id = :source_id
+    )
+    SELECT id, content, ordinal, page_number, embedding, embedding <-> (:query_embedding)::vector AS distance
+    FROM candidates
+    ORDER BY distance
+    LIMIT :top_k
+""")
+
+# Approximate: let the planner walk the ANN index on embedding
+APPROXIMATE_SEARCH_SQL = text("""
+    SELECT id, content, ordinal, page_number, embedding, embedding <-> (:query_embedding)::vector AS distance
+    FROM document_chunks
+    WHERE document_id = :source_id
+    ORDER BY embedding <-> (:query_embedding)::vector
+    LIMIT :top_k
+""")
+
+def _hybrid_search_sql(exact: bool):
+    """
+    Vector and full-text search of one document in a single statement,
+    fused with reciprocal rank fusion: score = Σ 1 / (rrf_k + rank).
+    Question words are OR-ed (any matching error code / part number
+    counts) in both the German and the English configuration.
+    """
+    if exact:
+        vector_source = """
+            candidates AS MATERIALIZED (
+                SELECT id, embedding FROM document_chunks WHERE document_id = :source_id
+            ),
+            vector_hits AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT id, embedding <-> (:query_embedding)::vector AS distance
+                    FROM candidates
+                    ORDER BY distance
+                    LIMIT :depth
+                ) nearest
+            ),"""
+    else:
+        vector_source = """
+            vector_hits AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT id, embedding <-> (:query_embedding)::vector AS distance
+                    FROM document_chunks
+                    WHERE document_id = :source_id
+                    ORDER BY embedding <-> (:query_embedding)::vector
+                    LIMIT :depth
+                ) nearest
+            ),"""
+    return text(f"""
+        WITH {vector_source}
+        lexical_query AS (
+            SELECT replace(plainto_tsquery('german', :query_text)::text, ' & ', ' | ')::tsquery
+                || replace(plainto_tsquery('english', :query_text)::text, ' & ', ' | ')::tsquery AS q
+        ),
+        lexical_hits AS (
+            SELECT id, row_number() OVER (ORDER BY lexical_rank DESC) AS rank
+            FROM (
+                SELECT c.id, ts_rank_cd(c.content_tsv, lq.q) AS lexical_rank
+                FROM document_chunks c, lexical_query lq
+                WHERE c.document_id = :source_id
+                  AND c.content_tsv @@ lq.q
+                ORDER BY lexical_rank DESC
+                LIMIT :depth
+            ) matches
+        ),
+        fused AS (
+            SELECT coalesce(v.id, l.id) AS id,
+                   coalesce(1.0 / (:rrf_k + v.rank), 0)::float8 + coalesce(1.0 / (:rrf_k + l.rank), 0)::float8 AS score
+            FROM vector_hits v
+            FULL OUTER JOIN lexical_hits l ON v.id = l.id
+        )
+        SELECT c.id, c.content, c.ordinal, c.page_number, c.embedding,
+               c.embedding <-> (:query_embedding)::vector AS distance, f.score
+        FROM fused f
+        JOIN document_chunks c ON c.id = f.id
+        ORDER BY f.score DESC
+        LIMIT :top_k
+    """)
+
+HYBRID_EXACT_SEARCH_SQL = _hybrid_search_sql(exact=True)
+HYBRID_APPROXIMATE_SEARCH_SQL = _hybrid_search_sql(exact=False)
+
+SearchMode = Literal["vector", "hybrid"]
+
+async def search_chunk_candidates(
     query: str,
     db: AsyncSession,
     document_id: uuid.UUID,
     user_id: uuid.UUID,
-    top_k=5
-) -> List[str]:
-    """Find most relevant chunks for a query inside a specific document for this user."""
-    query_embedding = embedding_model.encode([query])[0].tolist()
-    embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-
-    sql = text("""
-        SELECT content
-        FROM document_chunks
-        WHERE document_id = :document_id
-          AND user_id = :user_id
-        ORDER BY embedding <-> (:query_embedding)::vector
-        LIMIT :top_k
-    """)
+    top_k=5,
+    exact: Optional[bool] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    mode: Optional[SearchMode] = None,
+) -> List[RetrievedChunk]:
+    """Find most relevant chunks for a query inside a specific document for this user.
+
+    The document must belong to `user_id`; duplicates of an already processed
+    PDF are answered from the chunks of their source upload.
+
+    Documents with at most VECTOR_EXACT_SEARCH_MAX_CHUNKS chunks are searched
+    exactly; larger ones use the ANN index with `ef_search` / `probes`
+    (defaults from Settings). Pass `exact` to force either path.
+
+    `mode` (default SEARCH_MODE): "vector", or "hybrid" = vector + full-text
+    search fused with reciprocal rank fusion in the same query.
+    """
+    mode = mode or settings.SEARCH_MODE
+    source_id = await resolve_chunk_source(db, document_id, user_id)
+    if source_id is None:
+        logger.warning(f"⚠️ Document {document_id} not found for user {user_id}")
+        return []
+
+    embedding_str = vector_literal(await embed_query(query))
+
+    if exact is None:
+        exact = (
+            settings.VECTOR_INDEX_TYPE == "none"
+            or await count_document_chunks(db, source_id) <= settings.VECTOR_EXACT_SEARCH_MAX_CHUNKS
+        )
+    if not exact:
+        await _set_ann_search_params(db, ef_search, probes)
 
-    result = await db.execute(
-        sql, {
-            "document_id": str(document_id),
-            "user_id": str(user_id),
-            "query_embedding": embedding_str,
-            "top_k": top_k
-        }
+    params = {
+        "source_id": str(source_id),
+        "query_embedding": embedding_str,
+        "top_k": top_k
+    }
+    if mode == "hybrid":
+        params.update(
+            query_text=query,
+            depth=max(top_k, settings.SEARCH_HYBRID_DEPTH),
+            rrf_k=settings.SEARCH_RRF_K,
+        )
+        statement = HYBRID_EXACT_SEARCH_SQL if exact else HYBRID_APPROXIMATE_SEARCH_SQL
+    else:
+        statement = EXACT_SEARCH_SQL if exact else APPROXIMATE_SEARCH_SQL
+    with metrics.SEARCH.time():
+        result = await db.execute(statement, params)
+    chunks = [
+        RetrievedChunk(
+            id=row.id,
+            content=row.content,
+            embedding=parse_vector(row.embedding),
+            ordinal=row.ordinal,
+            page_number=row.page_number,
+            distance=row.distance,
+            score=getattr(row, "score", None),
+        )
+        for row in result
+    ]
+    logger.info(
+        f"🔍 Retrieved {len(chunks)} relevant chunks ({mode}, {'exact' if exact else 'ann'}) for user {user_id}"
     )
-    rows = [row[0] for row in result]
-    logger.info(f"🔍 Retrieved {len(rows)} relevant chunks for user {user_id}")
-    return rows
+    return chunks
+
+async def search_similar_chunks(
+    query: str,
+    db: AsyncSession,
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    top_k=5,
+    exact: Optional[bool] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    mode: Optional[SearchMode] = None,
+) -> List[str]:
+    """Contents of the `top_k` most relevant chunks (see search_chunk_candidates)."""
+    chunks = await search_chunk_candidates(query, db, document_id, user_id, top_k, exact, ef_search, probes, mode)
+    return [chunk.content for chunk in chunks]
 
 # ====================================
-# Replicate API Setup
+# LLM Backend Setup
 # ====================================
-REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN")
-if not REPLICATE_API_TOKEN:
-    raise RuntimeError("Missing REPLICATE_API_TOKEN. Please set it in your .env file")
-
-replicate_client = replicate.Client(api_token=REPLICATE_API_TOKEN)
-
-# Model slugs
-GEMMA_MODEL_27B = "google-deepmind/gemma-3-27b-it:c0f0aebe8e578c15a7531e08a62cf01206f5870e9d0a67804b8152822db58c54"
-GEMMA_MODEL_7B = "google-deepmind/gemma-3-7b-it"  # fallback
+# The backend (Replicate or the offline fake) is chosen by LLM_BACKEND and
+# created on first use, see api.service.llm_backend. Calls are routed
+# primary → fallback (LLM_PRIMARY_MODEL / LLM_FALLBACK_MODEL) by llm_router.
 
 # ====================================
-# Replicate Helpers
+# Gemma Helpers
 # ====================================
-def _normalize_replicate_output(output) -> str:
-    """Normalize Replicate API output into a clean string."""
-    if output is None:
-        return ""
-    if isinstance(output, str):
-        return output.strip()
-    if isinstance(output, (list, tuple)):
-        return "".join(str(x) for x in output).strip()
-    if isinstance(output, dict):
-        return output.get("text", str(output))
-    return str(output)
-
-def _call_gemma(prompt: str, model_slug: str) -> str:
-    """Run Gemma model on Replicate and normalize output."""
-    output = replicate_client.run(model_slug, input={"prompt": prompt})
-    return _normalize_replicate_output(output)
-
-def ask_gemma3(question: str, context: str = "", stream: bool = False) -> dict:
-    """Ask Gemma-3 a question with optional context. Falls back to smaller model if 27B fails."""
-    MAX_CONTEXT_CHARS = 4000
-    if len(context) > MAX_CONTEXT_CHARS:
-        context = context[:MAX_CONTEXT_CHARS]
-
-    prompt = f"Context:\n{context}\n\nQuestion: {question}\nAnswer:"
+# Context is measured in tokens of the generating model's tokenizer ("prompt_tokenizer" in the registry)
+_prompt_token_cache = LRUCache(max_entries=50_000, ttl_seconds=3600)
+
+def count_prompt_tokens(text: str) -> int:
+    """Number of LLM tokens in `text` (cached per text; chunks repeat across questions)."""
+    count = _prompt_token_cache.get(text)
+    if count is None:
+        count = len(models.get("prompt_tokenizer").encode(text, add_special_tokens=False))
+        _prompt_token_cache.put(text, count)
+    return count
+
+def truncate_prompt_tokens(text: str, max_tokens: int) -> str:
+    """`text` cut to at most `max_tokens` LLM tokens."""
+    if count_prompt_tokens(text) <= max_tokens:
+        return text
+    tokenizer = models.get("prompt_tokenizer")
+    ids = tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+    return tokenizer.decode(ids).rstrip() + " …"
+
+def build_prompt(question: str, context: str = "", conversation: str = "") -> str:
+    """Prompt sent to Gemma; the context is already packed into CONTEXT_MAX_TOKENS,
+    the conversation (see ConversationMemory) is bounded as well."""
+    if conversation:
+        return f"{conversation}\n\nContext:\n{context}\n\nQuestion: {question}\nAnswer:"
+    return f"Context:\n{context}\n\nQuestion: {question}\nAnswer:"
+
+def clean_answer(answer: str) -> str:
+    return answer.replace("<end_of_turn>", "").strip()
+
+async def ask_gemma3(
+    question: str, context: str = "", budget: Optional[float] = None, conversation: str = ""
+) -> dict:
+    """Ask Gemma-3 a question with optional context.
+
+    The primary model is hedged with the fallback model and guarded by a
+    circuit breaker (see llm_routing); raises asyncio.TimeoutError once the
+    latency budget is spent.
+    """
+    prompt = build_prompt(question, context, conversation)
 
     try:
-        if stream:
-            answer_chunks = []
-            for event in replicate.stream(GEMMA_MODEL_27B, input={"prompt": prompt}):
-                if event.event == "output":
-                    answer_chunks.append(str(event.data))
-            answer_text = "".join(answer_chunks).strip()
-            return {"answer": answer_text, "raw_response": answer_chunks}
-
-        # Blocking mode with fallback
-        try:
-            answer_text = _call_gemma(prompt, GEMMA_MODEL_27B)
-        except Exception as e:
-            logger.warning(f"⚠️ Gemma-27B failed, retrying with 7B: {e}")
-            answer_text = _call_gemma(prompt, GEMMA_MODEL_7B)
+        with metrics.LLM_TOTAL.time():
+            answer_text, model = await llm_router.complete(prompt, budget=budget)
 
         if answer_text:
-            return {"answer": answer_text.strip(), "raw_response": answer_text}
+            return {"answer": answer_text.strip(), "raw_response": answer_text, "model": model}
 
         return {"answer": "⚠️ Sorry, I could not get an answer.", "raw_response": ""}
 
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        raise
     except Exception as e:
         logger.error(f"❌ Gemma API failed: {str(e)}")
         return {"answer": "⚠️ Error contacting Gemma API.", "raw_response": str(e)}
 
-async def ask_gemma3_async(question: str, context: str = "", timeout: int = 500) -> dict:
-    """Async wrapper with timeout + error handling."""
+async def stream_gemma3(
+    question: str, context: str = "", budget: Optional[float] = None, conversation: str = ""
+) -> AsyncIterator[str]:
+    """Yield Gemma-3 output tokens as the backend produces them.
+
+    Streams whichever of primary / hedged fallback produces its first token
+    first. The budget (default LLM_TIMEOUT_SECONDS) bounds the whole stream,
+    not just the time to first token: raises asyncio.TimeoutError once it
+    is spent, the tokens already yielded stay with the caller.
+    """
+    prompt = build_prompt(question, context, conversation)
+    start = time.perf_counter()
+    budget = settings.LLM_TIMEOUT_SECONDS if budget is None else budget
+    deadline = start + budget
+    first_token = True
+    tokens = llm_router.stream(prompt, budget=budget)
     try:
-        return await asyncio.wait_for(
-            asyncio.to_thread(ask_gemma3, question, context),
-            timeout=timeout
-        )
+        while True:
+            try:
+                # The router bounds the first token (hedging, breaker); the deadline the rest
+                remaining = None if first_token else deadline - time.perf_counter()
+                token = await asyncio.wait_for(tokens.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                if not first_token:
+                    metrics.llm_timeouts_total.inc()
+                raise
+            if first_token:
+                metrics.LLM_FIRST_TOKEN.observe(time.perf_counter() - start)
+                first_token = False
+            token = token.replace("<end_of_turn>", "")
+            if token:
+                yield token
+    finally:
+        await tokens.aclose()
+        metrics.LLM_TOTAL.observe(time.perf_counter() - start)
+
+async def ask_gemma3_async(
+    question: str, context: str = "", timeout: Optional[float] = None, conversation: str = ""
+) -> dict:
+    """ask_gemma3 within a latency budget (default LLM_TIMEOUT_SECONDS); on timeout in-flight predictions are cancelled.
+
+    Never raises: a timeout returns a "⚠️" answer with `timed_out` set.
+    """
+    try:
+        return await ask_gemma3(question, context, budget=timeout, conversation=conversation)
     except asyncio.TimeoutError:
         logger.error("⏳ Gemma API request timed out")
-        return {"answer": "⚠️ Request timed out.", "raw_response": None}
+        return {"answer": "⚠️ Request timed out.", "raw_response": None, "timed_out": True}
     except Exception as e:
         logger.exception(f"❌ Unexpected error in ask_gemma3_async: {e}")
         return {"answer": "⚠️ Error contacting Gemma API.", "raw_response": str(e)}
@@ -195,59 +543,285 @@ async def ask_gemma3_async(question: str, context: str = "", timeout: int = 500)
 # ===================================================
 # Full RAG Pipeline + Save Chat History
 # ===================================================
-async def process_question(
+NO_CONTEXT = "No relevant content found in the document."
+
+async def build_context(
     question: str,
     db: AsyncSession,
     document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    search_mode: Optional[SearchMode] = None,
+    rerank: Optional[bool] = None,
+) -> str:
+    """Retrieval + context assembly: CONTEXT_CANDIDATES chunks of this document,
+    overlap removed, MMR-diversified and packed into CONTEXT_MAX_TOKENS prompt tokens.
+
+    With reranking (RERANK_ENABLED, or `rerank`), RERANK_CANDIDATES chunks are
+    retrieved and the cross-encoder's best RERANK_TOP_K are packed instead.
+    """
+    rerank = settings.RERANK_ENABLED if rerank is None else rerank
+    candidates = await search_chunk_candidates(
+        question, db, document_id=document_id, user_id=user_id,
+        top_k=settings.RERANK_CANDIDATES if rerank else settings.CONTEXT_CANDIDATES, mode=search_mode,
+    )
+    if not candidates:
+        return NO_CONTEXT
+    if rerank:
+        with metrics.RERANK.time():
+            candidates = await reranker.rerank(
+                question, candidates, top_k=settings.RERANK_TOP_K, budget_seconds=settings.RERANK_BUDGET_MS / 1000
+            )
+    pieces = await asyncio.to_thread(
+        pack_context,
+        await embed_query(question),
+        candidates,
+        max_tokens=settings.CONTEXT_MAX_TOKENS,
+        count_tokens=count_prompt_tokens,
+        lambda_mult=settings.CONTEXT_MMR_LAMBDA,
+        min_overlap_chars=settings.CONTEXT_MIN_OVERLAP_CHARS,
+    )
+    context = "\n\n".join(pieces) if pieces else NO_CONTEXT
+    logger.info(f"📨 Context sent to Gemma (first 200 chars): {context[:200]}...")
+    return context
+
+async def save_chat_messages(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    document_id: Optional[uuid.UUID],
+    question: str,
+    answer: str
+) -> None:
+    """Persist one question/answer pair of the chat history."""
+    user_msg = ChatMessage(
+        user_id=user_id, document_id=document_id, role="user", message=question
+    )
+    assistant_msg = ChatMessage(
+        user_id=user_id, document_id=document_id, role="assistant", message=answer
+    )
+    db.add_all([user_msg, assistant_msg])
+    with metrics.PERSIST.time():
+        await db.commit()
+    logger.info("Chat messages saved")
+
+# Identical questions in flight at the same time share one pipeline run (or one answer stream)
+question_flights = SingleFlight()
+question_streams = StreamFlight()
+
+# Bounded context of earlier turns of an active conversation about a document
+conversation_memory: Optional[ConversationMemory] = (
+    ConversationMemory(
+        truncate_prompt_tokens,
+        recent_turns=settings.CONVERSATION_RECENT_TURNS,
+        turn_max_tokens=settings.CONVERSATION_TURN_MAX_TOKENS,
+        summary_max_tokens=settings.CONVERSATION_SUMMARY_MAX_TOKENS,
+        batch_messages=settings.CONVERSATION_SUMMARY_BATCH_MESSAGES,
+        budget_seconds=settings.CONVERSATION_SUMMARY_BUDGET_SECONDS,
+        model=settings.CONVERSATION_SUMMARY_MODEL,
+        active_seconds=settings.CONVERSATION_ACTIVE_SECONDS,
+    )
+    if settings.CONVERSATION_MEMORY_ENABLED else None
+)
+
+async def load_conversation(db: AsyncSession, user_id: uuid.UUID, document_id: uuid.UUID) -> str:
+    """Prompt component of the earlier conversation about this document.
+
+    "" when disabled, unavailable, or when there is no active conversation
+    (no message within CONVERSATION_ACTIVE_SECONDS): those questions stay
+    shareable through the answer cache and in-flight coalescing.
+    """
+    if conversation_memory is None:
+        return ""
+    try:
+        return await conversation_memory.load(db, user_id, document_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load the conversation memory, answering without it: {e}")
+        await db.rollback()
+        return ""
+
+@dataclass(frozen=True)
+class DocumentQuestion:
+    """A question about a document, resolved for answering (access, scope, level, conversation)."""
+    question: str  # the user's own text: retrieval, answer cache and coalescing
+    prompt_question: str  # with the level instructions: sent to Gemma and saved in the chat
+    document_id: uuid.UUID
     user_id: uuid.UUID
-):
-    """RAG pipeline: search chunks → send to Gemma → save chat → return answer."""
+    source_id: Optional[uuid.UUID]
+    user_level: str
+    search_mode: SearchMode
+    conversation: str
+
+    @property
+    def key(self) -> tuple:
+        """Coalescing key: question + scope (+ the conversation, which is "" outside one)."""
+        scope = self.source_id if self.source_id is not None else (self.document_id, self.user_id)
+        return ("document", scope, self.user_level, self.search_mode, self.conversation, normalize_query(self.question))
+
+async def resolve_document_question(
+    db: AsyncSession,
+    question: str,
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    user_level_rate: Optional[int] = None,
+    search_mode: Optional[SearchMode] = None,
+) -> DocumentQuestion:
+    """Access check + the document that owns the chunks (duplicates share their source's),
+    user level, search mode and the conversation memory of an active conversation."""
+    return DocumentQuestion(
+        question=question,
+        prompt_question=apply_user_level(question, user_level_rate) if user_level_rate is not None else question,
+        document_id=document_id,
+        user_id=user_id,
+        source_id=await resolve_chunk_source(db, document_id, user_id),
+        user_level=user_level_name(user_level_rate) if user_level_rate is not None else "none",
+        search_mode=search_mode or settings.SEARCH_MODE,
+        conversation=await load_conversation(db, user_id, document_id),
+    )
 
-    start_time = time.time()
+async def _lookup_cached_answer(q: DocumentQuestion) -> tuple[Optional[str], Optional[str]]:
+    """Answer cache step: (cached answer or None, embedding to store a new answer under or None).
+
+    Questions of an active conversation bypass the answer cache: their
+    answer depends on it.
+    """
+    if answer_cache is None or q.source_id is None or q.conversation:
+        return None, None
+    embedding_str = vector_literal(await embed_query(q.question))
+    with metrics.ANSWER_CACHE.time():
+        async with async_session_maker() as db:
+            cached = await answer_cache.lookup(db, q.source_id, q.user_level, embedding_str)
+    return (cached.answer if cached is not None else None), embedding_str
+
+async def _store_cached_answer(q: DocumentQuestion, embedding_str: Optional[str], context: str, answer: str) -> None:
+    """Cache store step: only real answers grounded in the document are worth reusing."""
+    if embedding_str is None or context == NO_CONTEXT or not answer or answer.startswith("⚠️"):
+        return
+    async with async_session_maker() as db:
+        await answer_cache.store(db, q.source_id, q.user_level, normalize_query(q.question), embedding_str, answer)
+
+async def _answer_document_question(q: DocumentQuestion) -> dict:
+    """Answer cache → retrieval → Gemma → cache store, shared by coalesced callers.
+
+    Runs on its own sessions (never the caller's): any waiting caller may
+    disconnect while the others still need the result.
+    """
+    cached, embedding_str = await _lookup_cached_answer(q)
+    if cached is not None:
+        return {"answer": cached, "raw_response": cached, "cached": True, "timed_out": False}
 
     # Search chunks only for this document
-    chunks = await search_similar_chunks(question, db, document_id=document_id, user_id=user_id)
-    context = "\n".join(chunks) if chunks else "No relevant content found in the document."
-
-    logger.info(f"📨 Context sent to Gemma (first 200 chars): {context[:200]}...")
+    async with async_session_maker() as db:
+        context = await build_context(q.question, db, q.document_id, q.user_id, q.search_mode)
 
     # Call Gemma with timeout
-    try:
-        response = await ask_gemma3_async(question, context, timeout=180)
-    except asyncio.TimeoutError:
-        logger.error("⚠️ Gemma request timed out")
-        return {
-            "question": question,
-            "answer": "⚠️ Request timed out. Please try again.",
-            "raw_response": None,
-        }
+    response = await ask_gemma3_async(q.prompt_question, context, conversation=q.conversation)
 
     # Clean up the answer
-    answer = response.get("answer", "⚠️ No answer")
-    answer = answer.replace("<end_of_turn>", "").strip()
+    answer = clean_answer(response.get("answer", "⚠️ No answer"))
     raw_response = response.get("raw_response")
+    if raw_response:
+        await _store_cached_answer(q, embedding_str, context, answer)
 
-    # Save chat history
-    user_msg = ChatMessage(
-        user_id=user_id, document_id=document_id, role="user", message=question
-    )
-    assistant_msg = ChatMessage(
-        user_id=user_id, document_id=document_id, role="assistant", message=answer
-    )
+    return {
+        "answer": answer,
+        "raw_response": raw_response,
+        "cached": False,
+        "timed_out": response.get("timed_out", False),
+    }
+
+async def _stream_document_answer(q: DocumentQuestion) -> AsyncIterator[tuple[str, str]]:
+    """Streaming counterpart of _answer_document_question, shared by coalesced subscribers.
+
+    A cached answer is one ("cached", answer) item; otherwise ("token", text)
+    items follow as Gemma produces them (within LLM_TIMEOUT_SECONDS), and the
+    complete answer is stored in the answer cache.
+    """
+    cached, embedding_str = await _lookup_cached_answer(q)
+    if cached is not None:
+        yield "cached", cached
+        return
+
+    async with async_session_maker() as db:
+        context = await build_context(q.question, db, q.document_id, q.user_id, q.search_mode)
+
+    parts: List[str] = []
+    async for token in stream_gemma3(q.prompt_question, context, conversation=q.conversation):
+        parts.append(token)
+        yield "token", token
+    await _store_cached_answer(q, embedding_str, context, clean_answer("".join(parts)))
+
+def stream_document_question(q: DocumentQuestion) -> AsyncIterator[tuple[str, str]]:
+    """Answer items of `q` (see _stream_document_answer); identical questions
+    streamed at the same time share one pipeline run and one Gemma stream."""
+    return question_streams.subscribe(q.key, lambda: _stream_document_answer(q))
+
+def record_question(elapsed: float, outcome: str) -> None:
+    """Question metrics of a finished document question (outcome: answered, cached or timeout)."""
+    metrics.QUESTION_TOTAL.observe(elapsed)
+    metrics.rag_questions_total.labels(outcome).inc()
+
+async def process_question(
+    question: str,
+    db: AsyncSession,
+    document_id: uuid.UUID,
+    user_id: uuid.UUID,
+    user_level_rate: Optional[int] = None,
+    search_mode: Optional[SearchMode] = None,
+):
+    """RAG pipeline: answer cache → search chunks → send to Gemma → save chat → return answer.
+
+    `question` is the user's own text; with `user_level_rate` the level
+    instructions are added to the prompt (not to retrieval), and cached
+    answers are only shared between users of the same level.
+
+    Concurrent calls with the same normalized question, document and level
+    share one pipeline run; each caller still saves its own chat messages.
+    `search_mode` selects vector or hybrid retrieval (default SEARCH_MODE).
+
+    Questions in an active conversation (a message about this document
+    within CONVERSATION_ACTIVE_SECONDS) also carry the conversation memory
+    of this user and document (bounded in size) and are neither cached nor
+    coalesced with other users' questions; the first question of a
+    conversation is answered without it. The memory is updated in the
+    background once the new question/answer pair is saved.
+    """
 
+    start_time = time.perf_counter()
+    q = await resolve_document_question(db, question, document_id, user_id, user_level_rate, search_mode)
+    result = await question_flights.do(q.key, lambda: _answer_document_question(q))
+
+    # Save chat history
     try:
-        db.add_all([user_msg, assistant_msg])
-        await db.commit()
-        logger.info("Chat messages saved")
+        await save_chat_messages(db, user_id, document_id, q.prompt_question, result["answer"])
+        if conversation_memory is not None:
+            conversation_memory.schedule_update(user_id, document_id)
     except Exception as e:
         logger.exception(f"❌ Failed to save chat messages: {e}")
 
-    elapsed = time.time() - start_time
-    logger.info(f"⏱️ Total time to get answer: {elapsed:.2f} seconds")
+    elapsed = time.perf_counter() - start_time
+    record_question(elapsed, "timeout" if result["timed_out"] else "cached" if result["cached"] else "answered")
+    logger.info(f"⏱️ Total time to get answer: {elapsed:.2f} seconds{' (cached)' if result['cached'] else ''}")
 
     return {
-        "question": question,
-        "answer": answer,
-        "raw_response": raw_response,
+        "question": q.prompt_question,
+        "answer": result["answer"],
+        "raw_response": result["raw_response"],
         "elapsed_time": elapsed,
+        "cached": result["cached"],
     }
+
+async def ask_general_question(question: str, user_level_rate: int) -> dict:
+    """General chat (no document): concurrent identical questions of the same level share one Gemma call."""
+    prompt_question = apply_user_level(question, user_level_rate)
+    key = ("general", user_level_name(user_level_rate), normalize_query(question))
+    return await question_flights.do(key, lambda: ask_gemma3_async(prompt_question))
+
+async def _stream_general_answer(prompt_question: str) -> AsyncIterator[tuple[str, str]]:
+    async for token in stream_gemma3(prompt_question):
+        yield "token", token
+
+def stream_general_question(question: str, user_level_rate: int) -> AsyncIterator[tuple[str, str]]:
+    """Streaming ask_general_question: ("token", text) items of one Gemma stream
+    shared by concurrent identical questions of the same level."""
+    key = ("general", user_level_name(user_level_rate), normalize_query(question))
+    prompt_question = apply_user_level(question, user_level_rate)
+    return question_streams.subscribe(key, lambda: _stream_general_answer(prompt_question))
@@ -0,0 +1,187 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from api.config.core import settings
+from api.service.context_packing import RetrievedChunk
+from api.service.metrics import rerank_timeouts_total
+from api.service.model_registry import models
+from api.shared.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage ranking of retrieval candidates with a small cross-encoder
+    (question, chunk) scorer on CPU.
+
+    All uncached pairs of one question are scored as one batch on a single
+    dedicated thread; scores are cached per (question hash, chunk id).
+    `rerank` never waits longer than its time budget: when scoring does
+    not finish in time the candidates keep their retrieval order (a job
+    that already started still lands its scores in the cache for the next
+    identical question; one still queued is dropped). At most
+    `max_pending` jobs are running or queued on the thread; past that,
+    `rerank` keeps the retrieval order right away instead of queueing
+    work that could only miss its budget.
+    The model comes from the model registry ("reranker"): warmed up at
+    startup when RERANK_ENABLED, otherwise loaded on the scoring thread.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_length: int = 256,
+        batch_size: int = 32,
+        cache: Optional[LRUCache] = None,
+        max_pending: int = 2,
+    ):
+        self.model_id = model_id
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache = cache
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.calls = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.pairs_scored = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.score_seconds = 0.0
+
+    def load_model(self):
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(self.model_id, max_length=self.max_length, device="cpu")
+
+    def _score(self, question: str, contents: List[str]) -> List[float]:
+        model = models.get("reranker")
+        start = time.perf_counter()
+        scores = model.predict(
+            [(question, content) for content in contents],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        with self._lock:
+            self.pairs_scored += len(contents)
+            self.score_seconds += time.perf_counter() - start
+        return [float(score) for score in scores]
+
+    @staticmethod
+    def question_hash(question: str) -> str:
+        return hashlib.sha256(question.encode("utf-8")).hexdigest()[:32]
+
+    async def rerank(
+        self,
+        question: str,
+        chunks: Sequence[RetrievedChunk],
+        top_k: int,
+        budget_seconds: float,
+    ) -> List[RetrievedChunk]:
+        """Best `top_k` chunks by cross-encoder score, or the first `top_k` in retrieval order on timeout/error."""
+        self.calls += 1
+        if len(chunks) <= 1:
+            return list(chunks)[:top_k]
+
+        qhash = self.question_hash(question)
+        scores: dict = {}
+        missing: List[RetrievedChunk] = []
+        for chunk in chunks:
+            cached = self.cache.get((qhash, chunk.id)) if self.cache is not None else None
+            if cached is None:
+                missing.append(chunk)
+            else:
+                scores[chunk.id] = cached
+        self.cache_hits += len(chunks) - len(missing)
+
+        if missing:
+            with self._lock:
+                saturated = self._pending >= self.max_pending
+                if not saturated:
+                    self._pending += 1
+            if saturated:
+                self.skipped += 1
+                return list(chunks)[:top_k]
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+            job = self._executor.submit(self._score, question, [c.content for c in missing])
+
+            def finished(done: Future, ids=[c.id for c in missing]):
+                # Scoring thread (or the loop, for a dropped job)
+                with self._lock:
+                    self._pending -= 1
+                if self.cache is not None and not done.cancelled() and done.exception() is None:
+                    for chunk_id, score in zip(ids, done.result()):
+                        self.cache.put((qhash, chunk_id), score)
+            job.add_done_callback(finished)
+
+            try:
+                # shield: a timeout stops the wait; the job itself is handled below
+                new_scores = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout=budget_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                rerank_timeouts_total.inc()
+                if job.cancel():  # still queued behind another job: drop it
+                    self.dropped += 1
+                logger.warning(f"⚠️ Rerank exceeded {budget_seconds * 1000:.0f} ms, keeping retrieval order")
+                return list(chunks)[:top_k]
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ Rerank failed, keeping retrieval order: {e}")
+                return list(chunks)[:top_k]
+            scores.update(zip([c.id for c in missing], new_scores))
+
+        for chunk in chunks:
+            chunk.score = chunk.rerank_score = scores[chunk.id]
+        return sorted(chunks, key=lambda c: c.score, reverse=True)[:top_k]
+
+    def stats(self) -> dict:
+        return {
+            "enabled_by_default": settings.RERANK_ENABLED,
+            "model": self.model_id,
+            "loaded": models.is_loaded("reranker"),
+            "calls": self.calls,
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "timeouts": self.timeouts,
+            "skipped_saturated": self.skipped,
+            "dropped_queued": self.dropped,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "errors": self.errors,
+            "score_seconds_total": round(self.score_seconds, 4),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Cheap to construct: the model is loaded by the registry (at startup only when enabled by default)
+reranker = CrossEncoderReranker(
+    settings.RERANK_MODEL_ID,
+    max_length=settings.RERANK_MAX_LENGTH,
+    max_pending=settings.RERANK_MAX_PENDING,
+    cache=LRUCache(
+        max_entries=settings.RERANK_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RERANK_CACHE_TTL_SECONDS,
+    ),
+)
+
+models.register(
+    "reranker",
+    reranker.load_model,
+    warm_up=lambda model: model.predict([("warm-up", "warm-up")], show_progress_bar=False),
+    eager=settings.RERANK_ENABLED,
+)
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class UserLevelQuestionPrefix:
+    BASE_PREFIX = """
+    (if applicable) Also think about what tools should be used in the answer you give me 
+    and their current prices 
+    and what companies are providing them in germany with links to them
+    and give me brief comparison, if i repair it myself and if get a help from professionals, in terms of costs and time
+    """
+    BEGINNER: str = f"{BASE_PREFIX}, I am a beginner user with little to no prior knowledge of the subject."
+    INTERMEDIATE: str = f"{BASE_PREFIX}, I am an intermediate user with some knowledge of the subject."
+    EXPERT: str = f"{BASE_PREFIX}, I am an expert user with extensive knowledge of the subject."
+
+
+def user_level_name(user_level_rate: int) -> str:
+    """Expertise level (1..5) → the prefix it selects: "beginner", "intermediate" or "expert"."""
+    if user_level_rate == 3 or user_level_rate == 4:
+        return "intermediate"
+    elif user_level_rate == 5:
+        return "expert"
+    return "beginner"
+
+
+def apply_user_level(question: str, user_level_rate: int) -> str:
+    """Prefix the question with the instructions for the user's expertise level."""
+    question_prefix = getattr(UserLevelQuestionPrefix, user_level_name(user_level_rate).upper())
+    return f"{question_prefix}, {question}"
+
+
+def strip_user_level(message: str) -> str:
+    """The user's own question of a stored chat message (apply_user_level undone)."""
+    for level in ("BEGINNER", "INTERMEDIATE", "EXPERT"):
+        prefix = getattr(UserLevelQuestionPrefix, level) + ", "
+        if message.startswith(prefix):
+            return message[len(prefix):]
+    return message
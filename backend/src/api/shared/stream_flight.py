@@ -0,0 +1,86 @@
+import asyncio
+from typing import AsyncIterator, Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "items", "changed", "subscribers")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.items: list = []
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+
+
+class StreamFlight(Generic[T]):
+    """
+    Coalesces concurrent streams with the same key into one execution,
+    the streaming counterpart of SingleFlight.
+
+    The first subscriber of a key starts iterating `fn()` in a task; every
+    subscriber (also one arriving while it runs) gets all items from the
+    first one on, then follows the live stream, and the same exception if
+    it fails. Nothing is kept once the stream ends. A subscriber that goes
+    away only stops following; the shared stream is cancelled when its
+    last subscriber goes away.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    @staticmethod
+    def _wake(flight: _Flight) -> None:
+        flight.changed.set()
+        flight.changed = asyncio.Event()
+
+    async def _pump(self, key: Hashable, flight: _Flight, items: AsyncIterator[T]) -> None:
+        try:
+            async for item in items:
+                flight.items.append(item)
+                self._wake(flight)
+        finally:
+            self._forget(key, flight)
+            self._wake(flight)
+
+    async def subscribe(self, key: Hashable, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, fn()))
+            self._flights[key] = flight
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                if position < len(flight.items):
+                    position += 1
+                    yield flight.items[position - 1]
+                elif flight.task.done():
+                    flight.task.result()  # the stream's exception, if any
+                    return
+                else:
+                    await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
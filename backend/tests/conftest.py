@@ -0,0 +1,10 @@
+import os
+
+# api.config.core reads its settings at import time; the unit tests need no database
+for name, value in {
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
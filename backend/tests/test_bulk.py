@@ -0,0 +1,153 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from api.database.bulk import DOCUMENT_CHUNK_COLUMNS, DocumentChunkCopyWriter, document_chunk_record
+
+
+class FakeTransaction:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def start(self):
+        self.calls.append("begin")
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+
+class FakeConnection:
+    """The parts of asyncpg.Connection the writer uses, recording every call."""
+
+    def __init__(self):
+        self.calls: list = []
+
+    def transaction(self):
+        return FakeTransaction(self.calls)
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.calls.append(("copy", table, list(records), columns))
+
+    async def executemany(self, sql, args):
+        self.calls.append(("executemany", sql, list(args)))
+
+    async def reset_type_codec(self, typename):
+        self.calls.append(("reset_codec", typename))
+
+
+class FakeSession:
+    def __init__(self, conn: FakeConnection):
+        self.conn = conn
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self.conn
+
+
+@pytest.fixture
+def binary_codec(monkeypatch):
+    registered = []
+
+    async def register_vector(conn):
+        registered.append(conn)
+
+    monkeypatch.setattr("pgvector.asyncpg.register_vector", register_vector)
+    return registered
+
+
+@pytest.fixture
+def no_binary_codec(monkeypatch):
+    async def register_vector(conn):
+        raise ValueError("unknown type: public.vector")
+
+    monkeypatch.setattr("pgvector.asyncpg.register_vector", register_vector)
+
+
+def record(content="Filter reinigen", ordinal=0):
+    return document_chunk_record(
+        uuid.UUID(int=1), uuid.UUID(int=2), content, ordinal, 1, 0, len(content), np.array([0.5, -1.0, 2.0])
+    )
+
+
+def test_record_follows_the_column_order():
+    row = record()
+
+    assert len(row) == len(DOCUMENT_CHUNK_COLUMNS)
+    values = dict(zip(DOCUMENT_CHUNK_COLUMNS, row))
+    assert values["document_id"] == uuid.UUID(int=1)
+    assert values["user_id"] == uuid.UUID(int=2)
+    assert values["content"] == "Filter reinigen"
+    assert (values["ordinal"], values["page_number"], values["char_start"], values["char_end"]) == (0, 1, 0, 15)
+    assert values["embedding"].tolist() == [0.5, -1.0, 2.0]
+
+
+def test_records_get_their_own_ids():
+    assert isinstance(record()[0], uuid.UUID)
+    assert record()[0] != record()[0]
+
+
+async def test_binary_copy_inside_a_transaction(binary_codec):
+    conn = FakeConnection()
+    rows = [record(ordinal=i) for i in range(3)]
+
+    async with DocumentChunkCopyWriter(FakeSession(conn)) as writer:
+        await writer.write(rows)
+        await writer.write([])
+
+    assert binary_codec == [conn]
+    assert conn.calls[0] == "begin"
+    assert conn.calls[1] == ("copy", "document_chunks", rows, DOCUMENT_CHUNK_COLUMNS)
+    assert conn.calls[2] == "commit"
+    assert writer.rows_written == 3
+
+
+async def test_binary_codec_is_removed_afterwards(binary_codec):
+    conn = FakeConnection()
+
+    async with DocumentChunkCopyWriter(FakeSession(conn)) as writer:
+        await writer.write([record()])
+
+    assert [call for call in conn.calls if call[0] == "reset_codec"] == [
+        ("reset_codec", "vector"), ("reset_codec", "halfvec"), ("reset_codec", "sparsevec"),
+    ]
+
+
+async def test_error_rolls_back_and_still_removes_the_codec(binary_codec):
+    conn = FakeConnection()
+
+    with pytest.raises(RuntimeError):
+        async with DocumentChunkCopyWriter(FakeSession(conn)) as writer:
+            await writer.write([record()])
+            raise RuntimeError("embedding failed")
+
+    assert "rollback" in conn.calls and "commit" not in conn.calls
+    assert ("reset_codec", "vector") in conn.calls
+
+
+async def test_text_fallback_without_the_binary_codec(no_binary_codec):
+    conn = FakeConnection()
+    row = record()
+
+    async with DocumentChunkCopyWriter(FakeSession(conn)) as writer:
+        await writer.write([row])
+
+    assert conn.calls[0] == "begin"
+    _, sql, args = conn.calls[1]
+    assert sql == (
+        f"INSERT INTO document_chunks ({', '.join(DOCUMENT_CHUNK_COLUMNS)}) "
+        "VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9::vector)"
+    )
+    assert args == [row[:-1] + ("[0.5,-1.0,2.0]",)]
+    assert conn.calls[2] == "commit"
+    assert not any(call[0] == "reset_codec" for call in conn.calls[3:])
+    assert writer.rows_written == 1
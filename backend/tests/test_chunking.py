@@ -0,0 +1,66 @@
+from api.service.chunking import iter_chunks
+
+PAGES = [
+    "SICHERHEITSHINWEISE\n"
+    "Vor der Reinigung den Netzstecker ziehen. Das Gerät abkühlen lassen.\n"
+    "\n"
+    "1. Filter herausnehmen.\n"
+    "2. Filter unter fließendem Wasser spülen.\n",
+    "\n"
+    "3.2 Laugenpumpe\n"
+    "Die Pumpe befindet sich unten rechts. "
+    + "Ein sehr langer Satz ohne Punkt " * 20
+    + ".\n"
+    "• Deckel öffnen\n"
+    "• Fremdkörper entfernen\n",
+]
+TEXT = "".join(PAGES)
+
+
+def test_offsets_point_at_the_chunk_text():
+    chunks = list(iter_chunks(PAGES, max_tokens=20, min_tokens=5))
+
+    assert len(chunks) > 2
+    for chunk in chunks:
+        assert TEXT[chunk.char_start:chunk.char_end] == chunk.content
+
+
+def test_chunks_are_ordered_and_do_not_overlap():
+    chunks = list(iter_chunks(PAGES, max_tokens=20, min_tokens=5))
+
+    assert [chunk.ordinal for chunk in chunks] == list(range(len(chunks)))
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.char_end <= chunk.char_start
+
+
+def test_page_number_is_the_page_the_chunk_starts_on():
+    page_starts = [0, len(PAGES[0])]
+
+    for chunk in iter_chunks(PAGES, max_tokens=20, min_tokens=5):
+        expected = 2 if chunk.char_start >= page_starts[1] else 1
+        assert chunk.page_number == expected
+
+
+def test_offsets_with_a_custom_token_counter():
+    chunks = list(iter_chunks(PAGES, max_tokens=60, min_tokens=10, token_counter=len))
+
+    for chunk in chunks:
+        assert TEXT[chunk.char_start:chunk.char_end] == chunk.content
+        assert len(chunk.content) <= 60
+
+
+def test_long_sentence_is_split_at_words():
+    chunks = list(iter_chunks(["wort " * 50], max_tokens=10, min_tokens=1))
+
+    assert [len(chunk.content.split()) for chunk in chunks] == [10] * 5
+    assert all(chunk.content.startswith("wort") for chunk in chunks)
+
+
+def test_blank_lines_opening_a_page_stay_in_the_chunk():
+    pages = ["Intro text here.\n", "\nNext para words.\n"]
+    text = "".join(pages)
+
+    chunks = list(iter_chunks(pages))
+
+    assert [chunk.content for chunk in chunks] == ["Intro text here.\n\nNext para words."]
+    assert text[chunks[0].char_start:chunks[0].char_end] == chunks[0].content
@@ -0,0 +1,26 @@
+import asyncio
+
+import numpy as np
+
+from api.service.embedding import BatchingEmbedder
+
+
+async def test_concurrent_texts_share_a_batch_but_not_its_array():
+    batches = []
+
+    def encode(texts):
+        batch = np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4)
+        batches.append(batch)
+        return batch
+
+    embedder = BatchingEmbedder(encode, max_batch_size=8, max_wait_ms=50)
+    try:
+        vectors = await asyncio.gather(*(embedder.encode(f"frage {i}") for i in range(3)))
+    finally:
+        await embedder.stop()
+
+    assert len(batches) == 1
+    assert [vector.tolist() for vector in vectors] == batches[0].tolist()
+    for vector in vectors:
+        assert vector.base is None  # owns its data, not a view of the batch
+        assert vector.nbytes == 4 * 4
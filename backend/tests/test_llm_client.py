@@ -0,0 +1,54 @@
+import asyncio
+
+from api.service.llm_client import ConcurrencyLimiter
+
+
+async def hold(limiter: ConcurrencyLimiter, model: str, release: asyncio.Event) -> None:
+    async with limiter.slot(model):
+        await release.wait()
+
+
+async def test_saturated_model_leaves_global_slots_to_other_models():
+    limiter = ConcurrencyLimiter(global_limit=3, per_model_limit=2)
+    release = asyncio.Event()
+
+    # Two primary calls run, a backlog of five waits for the primary's slots
+    primary = [asyncio.create_task(hold(limiter, "primary", release)) for _ in range(7)]
+    await asyncio.sleep(0)
+    assert limiter.stats()["in_flight_per_model"] == {"primary": 2}
+
+    async def fallback_call():
+        async with limiter.slot("fallback"):
+            return limiter.stats()["in_flight_per_model"]
+
+    assert await asyncio.wait_for(fallback_call(), timeout=1.0) == {"primary": 2, "fallback": 1}
+
+    release.set()
+    await asyncio.gather(*primary)
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_cancelled_waiter_gives_back_nothing_it_did_not_take():
+    limiter = ConcurrencyLimiter(global_limit=1, per_model_limit=1)
+    release = asyncio.Event()
+
+    running = asyncio.create_task(hold(limiter, "primary", release))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(hold(limiter, "fallback", release))
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 1
+
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    release.set()
+    await running
+
+    async with limiter.slot("fallback"):
+        assert limiter.stats()["in_flight"] == 1
+    assert limiter.stats() == {
+        "global_limit": 1,
+        "per_model_limit": 1,
+        "in_flight": 0,
+        "in_flight_per_model": {"primary": 0, "fallback": 0},
+        "waiting": 0,
+    }
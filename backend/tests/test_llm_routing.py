@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+
+from api.service.llm_routing import CircuitBreaker, HedgedLLMRouter, LatencyTracker
+
+
+class FakeBackend:
+    """LLM backend whose models answer (or fail) after a fixed delay."""
+
+    def __init__(self, delays: dict[str, float], failing: tuple[str, ...] = ()):
+        self.delays = delays
+        self.failing = failing
+        self.started: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def complete(self, model: str, prompt: str) -> str:
+        self.started.append(model)
+        try:
+            await asyncio.sleep(self.delays[model])
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if model in self.failing:
+            raise RuntimeError(f"{model} failed")
+        return f"{model}: {prompt}"
+
+
+def make_router(backend: FakeBackend, **kwargs) -> HedgedLLMRouter:
+    options = dict(
+        budget_seconds=1.0,
+        hedge_default_delay=0.05,
+        hedge_min_delay=0.01,
+        min_samples=3,
+        window=10,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60.0),
+    )
+    options.update(kwargs)
+    return HedgedLLMRouter("primary", "fallback", backend=lambda: backend, **options)
+
+
+# ===================================
+# Hedge Delay
+# ===================================
+def test_hedge_delay_uses_the_default_until_enough_samples():
+    router = make_router(FakeBackend({}))
+    tracker = LatencyTracker(window=10)
+    tracker.add(0.5)
+    tracker.add(0.5)
+
+    assert router.hedge_delay(tracker) == 0.05
+
+
+def test_hedge_delay_follows_the_latency_percentile():
+    router = make_router(FakeBackend({}), hedge_percentile=0.9)
+    tracker = LatencyTracker(window=10)
+    for seconds in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+        tracker.add(seconds)
+
+    assert router.hedge_delay(tracker) == 1.0
+
+
+def test_hedge_delay_is_at_least_the_minimum():
+    router = make_router(FakeBackend({}))
+    tracker = LatencyTracker(window=10)
+    for _ in range(5):
+        tracker.add(0.001)
+
+    assert router.hedge_delay(tracker) == 0.01
+
+
+# ===================================
+# Racing
+# ===================================
+async def test_fast_primary_is_not_hedged():
+    backend = FakeBackend({"primary": 0.0, "fallback": 0.0})
+    router = make_router(backend)
+
+    assert await router.complete("hi") == ("primary: hi", "primary")
+    assert backend.started == ["primary"]
+    assert len(router.completion_latency) == 1
+    assert router.counters["hedged"] == 0
+
+
+async def test_slow_primary_loses_to_the_hedge_and_is_cancelled():
+    backend = FakeBackend({"primary": 5.0, "fallback": 0.0})
+    router = make_router(backend)
+
+    assert await router.complete("hi") == ("fallback: hi", "fallback")
+    assert backend.started == ["primary", "fallback"]
+    assert backend.cancelled == ["primary"]
+    assert router.counters["hedged"] == 1
+    assert router.counters["fallback_wins"] == 1
+    # Censored sample: the losing primary ran at least until the hedge fired
+    assert len(router.completion_latency) == 1
+    assert router.completion_latency.percentile(0.5) >= 0.05
+
+
+async def test_primary_failure_starts_the_fallback_right_away():
+    backend = FakeBackend({"primary": 0.0, "fallback": 0.0}, failing=("primary",))
+    router = make_router(backend, hedge_default_delay=5.0)
+
+    assert await router.complete("hi") == ("fallback: hi", "fallback")
+    assert router.counters["primary_failures"] == 1
+    assert router.breaker.consecutive_failures == 1
+
+
+async def test_budget_exhausted_cancels_every_request():
+    backend = FakeBackend({"primary": 5.0, "fallback": 5.0})
+    router = make_router(backend, budget_seconds=0.1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await router.complete("hi")
+    assert sorted(backend.cancelled) == ["fallback", "primary"]
+    assert router.counters["timeouts"] == 1
+
+
+async def test_open_breaker_goes_straight_to_the_fallback():
+    backend = FakeBackend({"primary": 0.0, "fallback": 0.0}, failing=("primary",))
+    router = make_router(backend)
+    for _ in range(2):
+        await router.complete("hi")
+    assert router.breaker.state == "open"
+
+    backend.started.clear()
+    assert await router.complete("hi") == ("fallback: hi", "fallback")
+    assert backend.started == ["fallback"]
+    assert router.counters["breaker_short_circuits"] == 1
+
+
+# ===================================
+# Circuit Breaker
+# ===================================
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60.0)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60.0)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_time():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_reopens_when_the_probe_fails():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.0)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+
+
+def test_abandoned_probe_frees_the_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.abandon()
+    assert breaker.allow()
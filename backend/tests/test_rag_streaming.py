@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+
+import pytest
+
+from api.service import metrics, rag
+from api.service.llm_routing import CircuitBreaker, HedgedLLMRouter
+
+
+class StallingBackend:
+    """LLM backend that streams its first tokens, then stalls."""
+
+    def __init__(self, tokens=("Filter ", "reinigen")):
+        self.tokens = tokens
+        self.closed = False
+
+    async def stream(self, model: str, prompt: str):
+        try:
+            for token in self.tokens:
+                yield token
+            await asyncio.sleep(60)
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = StallingBackend()
+    router = HedgedLLMRouter(
+        "primary", "fallback", backend=lambda: backend, budget_seconds=1.0,
+        hedge_enabled=False, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60.0),
+    )
+    monkeypatch.setattr(rag, "llm_router", router)
+    return backend
+
+
+async def test_stream_stops_at_the_total_deadline(backend):
+    timeouts = metrics.llm_timeouts_total.labels().value
+    received = []
+
+    with pytest.raises(asyncio.TimeoutError):
+        async for token in rag.stream_gemma3("Wie reinige ich den Filter?", budget=0.1):
+            received.append(token)
+
+    assert received == ["Filter ", "reinigen"]
+    assert backend.closed
+    assert metrics.llm_timeouts_total.labels().value == timeouts + 1
+
+
+def question(**overrides) -> rag.DocumentQuestion:
+    fields = dict(
+        question="Wie reinige ich den Filter?",
+        prompt_question="Wie reinige ich den Filter?",
+        document_id=uuid.UUID(int=1),
+        user_id=uuid.UUID(int=2),
+        source_id=uuid.UUID(int=1),
+        user_level="none",
+        search_mode="vector",
+        conversation="",
+    )
+    fields.update(overrides)
+    return rag.DocumentQuestion(**fields)
+
+
+async def test_cached_answer_is_one_item_without_retrieval(monkeypatch):
+    async def lookup(q):
+        return "Den Filter unter Wasser spülen.", "[0.1,0.2]"
+
+    async def build_context(*args, **kwargs):
+        raise AssertionError("a cached answer needs no retrieval")
+
+    monkeypatch.setattr(rag, "_lookup_cached_answer", lookup)
+    monkeypatch.setattr(rag, "build_context", build_context)
+
+    items = [item async for item in rag._stream_document_answer(question())]
+
+    assert items == [("cached", "Den Filter unter Wasser spülen.")]
+
+
+def test_conversation_is_part_of_the_coalescing_key():
+    assert question().key == question(user_id=uuid.UUID(int=3)).key  # same source, shared
+    assert question().key != question(conversation="User: Hallo").key
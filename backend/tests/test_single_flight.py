@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from api.shared.single_flight import SingleFlight
+
+
+class Call:
+    """An fn() for SingleFlight.do that runs until released."""
+
+    def __init__(self, result="answer", error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    call = Call()
+
+    waiters = [asyncio.create_task(flight.do("key", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*waiters) == ["answer"] * 5
+    assert call.started == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+async def test_key_is_free_again_after_the_call():
+    flight = SingleFlight()
+    call = Call()
+    call.release.set()
+
+    assert await flight.do("key", call) == "answer"
+    assert await flight.do("key", call) == "answer"
+    assert call.started == 2
+
+
+async def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    first, second = Call("first"), Call("second")
+
+    waiters = [asyncio.create_task(flight.do("a", first)), asyncio.create_task(flight.do("b", second))]
+    await asyncio.sleep(0)
+    first.release.set()
+    second.release.set()
+
+    assert await asyncio.gather(*waiters) == ["first", "second"]
+    assert flight.stats()["coalesced"] == 0
+
+
+async def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+    call = Call(error=ValueError("model failed"))
+
+    waiters = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [type(r) for r in results] == [ValueError] * 3
+    assert call.started == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_cancelled_waiter_leaves_the_others_running():
+    flight = SingleFlight()
+    call = Call()
+
+    leaving = asyncio.create_task(flight.do("key", call))
+    staying = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+    call.release.set()
+
+    assert await staying == "answer"
+    assert not call.cancelled
+
+
+async def test_last_cancelled_waiter_cancels_the_call():
+    flight = SingleFlight()
+    call = Call()
+
+    waiter = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.sleep(0)
+
+    assert call.cancelled
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from api.shared.stream_flight import StreamFlight
+
+
+class Stream:
+    """An fn() for StreamFlight.subscribe that yields each item once released."""
+
+    def __init__(self, items=("a", "b", "c"), error: Exception | None = None):
+        self.items = list(items)
+        self.error = error
+        self.started = 0
+        self.cancelled = False
+        self.released = asyncio.Semaphore(0)
+
+    def release(self, n: int = 1) -> None:
+        for _ in range(n):
+            self.released.release()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            for item in self.items:
+                await self.released.acquire()
+                yield item
+            await self.released.acquire()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+
+
+async def collect(flight: StreamFlight, key, stream: Stream) -> list:
+    return [item async for item in flight.subscribe(key, stream)]
+
+
+async def test_concurrent_subscribers_share_one_stream():
+    flight = StreamFlight()
+    stream = Stream()
+
+    subscribers = [asyncio.create_task(collect(flight, "key", stream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    stream.release(4)
+
+    assert await asyncio.gather(*subscribers) == [["a", "b", "c"]] * 3
+    assert stream.started == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 2, "in_flight": 0}
+
+
+async def test_late_subscriber_gets_the_items_already_streamed():
+    flight = StreamFlight()
+    stream = Stream()
+
+    early = asyncio.create_task(collect(flight, "key", stream))
+    await asyncio.sleep(0)
+    stream.release(2)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    late = asyncio.create_task(collect(flight, "key", stream))
+    await asyncio.sleep(0)
+    stream.release(2)
+
+    assert await early == ["a", "b", "c"]
+    assert await late == ["a", "b", "c"]
+    assert stream.started == 1
+
+
+async def test_key_is_free_again_after_the_stream():
+    flight = StreamFlight()
+    stream = Stream()
+    stream.release(8)
+
+    assert await collect(flight, "key", stream) == ["a", "b", "c"]
+    assert await collect(flight, "key", stream) == ["a", "b", "c"]
+    assert stream.started == 2
+
+
+async def test_error_reaches_every_subscriber_after_the_items():
+    flight = StreamFlight()
+    stream = Stream(items=["a"], error=TimeoutError("budget spent"))
+
+    async def until_error():
+        received = []
+        with pytest.raises(TimeoutError):
+            async for item in flight.subscribe("key", stream):
+                received.append(item)
+        return received
+
+    subscribers = [asyncio.create_task(until_error()) for _ in range(2)]
+    await asyncio.sleep(0)
+    stream.release(2)
+
+    assert await asyncio.gather(*subscribers) == [["a"], ["a"]]
+    assert flight.stats()["in_flight"] == 0
+
+
+async def test_leaving_subscriber_leaves_the_others_streaming():
+    flight = StreamFlight()
+    stream = Stream()
+
+    leaving = asyncio.create_task(collect(flight, "key", stream))
+    staying = asyncio.create_task(collect(flight, "key", stream))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+    stream.release(4)
+
+    assert await staying == ["a", "b", "c"]
+    assert not stream.cancelled
+
+
+async def test_last_leaving_subscriber_cancels_the_stream():
+    flight = StreamFlight()
+    stream = Stream()
+
+    subscriber = asyncio.create_task(collect(flight, "key", stream))
+    await asyncio.sleep(0)
+    subscriber.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await subscriber
+    await asyncio.sleep(0)
+
+    assert stream.cancelled
+    assert flight.stats()["in_flight"] == 0